@@ -0,0 +1,192 @@
+"""
+LinkedIn Candidate Scoring and Validation
+
+Deterministic replacement for Enrichment SOP steps 5-6 ("compare location
+and name by eye"). Candidates from the direct search or the search fan-out
+are first ranked locally from what the search already returned:
+
+- name overlap: email username pieces / name variations found in the slug
+  or result title
+- slug similarity: character similarity of username and slug
+- geo: PostHog city/state mentioned in the result snippet
+- company: company name or corporate email domain mentioned
+
+Signals the caller can't provide (no email username, no PostHog location,
+webmail and no company) are left out and the remaining weights
+renormalized.
+
+Only the top MAX_PROFILE_FETCHES candidates are fetched with
+`get_linkedin_person_data`, and stop as soon as one validates. The fetched
+profile is scored on the same signals (name fields, location, company and
+its website), and the final confidence mixes both scores. classify() maps
+confidence + search path to enrich_source, so every script writes the same
+method strings with a numeric `enrich_confidence` (migrations/005).
+"""
+
+import re
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Sequence
+
+from company_resolver import company_domain, domain_root
+from name_segmentation import name_candidates
+
+
+MAX_PROFILE_FETCHES = 2  # Profiles fetched per email at most
+ACCEPT_CONFIDENCE = 0.6  # Minimum confidence to store a match
+PRESCORE_WEIGHT = 0.35  # Share of the search-time score in the final confidence
+DIRECT_SEARCH_PRIOR = 0.4  # Datagen matched on the email itself
+
+PRESCORE_WEIGHTS = {"name": 0.4, "slug": 0.25, "geo": 0.2, "company": 0.15}
+PROFILE_WEIGHTS = {"name": 0.5, "geo": 0.3, "company": 0.2}
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    return [t for t in re.findall(r"[a-z]+", (text or "").lower()) if len(t) > 1]
+
+
+def match_context(email: Optional[str], names: Sequence[str] = (), geo: Optional[Dict] = None,
+                  company: Optional[str] = None) -> Dict:
+    """
+    Everything the scorers compare against, computed once per email
+
+    Returns:
+        Dict with username, name token sets (from names and the email
+        username segmentation), geo, company tokens and domain root
+    """
+    username = re.sub(r"[^a-z]", "", (email or "").split('@')[0].lower())
+    full_names = [n for n in names if n]
+    full_names += [" ".join(filter(None, [c['first_name'], c['last_name']])) for c in name_candidates(email, 3)]
+    return {
+        "username": username,
+        "name_sets": [set(_tokens(n)) for n in dict.fromkeys(full_names) if _tokens(n)],
+        "geo": geo or {},
+        "company_tokens": set(_tokens(company)) - {"inc", "llc", "ltd", "the", "co"},
+        "domain_root": domain_root(company_domain(email)),
+    }
+
+
+def _name_overlap(ctx: Dict, text_tokens: Sequence[str], squashed: str = "") -> float:
+    """Best share of a name variation's tokens found among the text tokens (or inside `squashed`)"""
+    best = 0.0
+    tokens = set(text_tokens)
+    for name_set in ctx["name_sets"]:
+        hits = sum(1 for t in name_set if t in tokens or (squashed and t in squashed))
+        best = max(best, hits / len(name_set))
+    return best
+
+
+def _geo_match(ctx: Dict, text: str) -> float:
+    geo = ctx["geo"]
+    text = text.lower()
+    if geo.get('city') and geo['city'].lower() in text:
+        return 1.0
+    if geo.get('state') and geo['state'].lower() in text:
+        return 0.6
+    if geo.get('country') and geo['country'].lower() in text:
+        return 0.2
+    return 0.0
+
+
+def _company_match(ctx: Dict, text: str) -> float:
+    text_tokens = set(_tokens(text))
+    if ctx["domain_root"] and (ctx["domain_root"] in text_tokens or ctx["domain_root"] in text.lower().replace(" ", "")):
+        return 1.0
+    if ctx["company_tokens"] and ctx["company_tokens"] <= text_tokens:
+        return 1.0
+    return 0.0
+
+
+def _weighted(signals: Dict[str, float], weights: Dict[str, float], ctx: Dict) -> float:
+    """Weighted signal average over the signals the context can provide (no username/geo/company -> renormalized)"""
+    available = {k: w for k, w in weights.items()
+                 if not (k == "slug" and not ctx["username"])
+                 and not (k == "geo" and not any(ctx["geo"].values()))
+                 and not (k == "company" and not (ctx["domain_root"] or ctx["company_tokens"]))}
+    total = sum(available.values())
+    return round(sum(w * signals[k] for k, w in available.items()) / total, 3) if total else 0.0
+
+
+def prescore(candidate: Dict, ctx: Dict) -> float:
+    """0-1 score of a search candidate before fetching its profile"""
+    slug = candidate.get('slug') or ""
+    squashed_slug = re.sub(r"[^a-z]", "", slug)
+    text = candidate.get('text') or ""
+    signals = {
+        "name": _name_overlap(ctx, _tokens(text) + _tokens(slug), squashed_slug),
+        "slug": SequenceMatcher(None, ctx["username"], squashed_slug).ratio() if ctx["username"] else 0.0,
+        "geo": _geo_match(ctx, text),
+        "company": _company_match(ctx, f"{text} {slug}"),
+    }
+    return _weighted(signals, PRESCORE_WEIGHTS, ctx)
+
+
+def profile_score(person: Dict, ctx: Dict) -> float:
+    """0-1 score of a fetched get_linkedin_person_data profile"""
+    person = person or {}
+    name = person.get('fullName') or person.get('name') or \
+        f"{person.get('firstName') or ''} {person.get('lastName') or ''}"
+    company_info = person.get('company')
+    if isinstance(company_info, dict):
+        company_text = " ".join(str(company_info.get(k) or '') for k in ('name', 'websiteUrl', 'website', 'domain'))
+    else:
+        company_text = str(company_info or '')
+    history = (person.get('positions') or {}).get('positionHistory') or []
+    if history and isinstance(history[0], dict):
+        company_text += f" {history[0].get('companyName') or ''}"
+
+    signals = {
+        "name": _name_overlap(ctx, _tokens(name)),
+        "geo": _geo_match(ctx, str(person.get('location') or '')),
+        "company": _company_match(ctx, f"{company_text} {person.get('headline') or ''}"),
+    }
+    return _weighted(signals, PROFILE_WEIGHTS, ctx)
+
+
+def direct_match_confidence(person: Dict, ctx: Dict) -> float:
+    """Confidence of a search_linkedin_person hit, which already matched on the email"""
+    return round(DIRECT_SEARCH_PRIOR + (1 - DIRECT_SEARCH_PRIOR) * profile_score(person, ctx), 3)
+
+
+def classify(confidence: Optional[float], via_direct_search: bool) -> str:
+    """enrich_source for a match: direct_search_validated, web_search_validated or not_found"""
+    if confidence is None or confidence < ACCEPT_CONFIDENCE:
+        return "not_found"
+    return "direct_search_validated" if via_direct_search else "web_search_validated"
+
+
+def validate_candidates(client, candidates: List[Dict], ctx: Dict,
+                        max_fetches: int = MAX_PROFILE_FETCHES) -> Dict:
+    """
+    Rank candidates locally, then fetch and validate only the top ones
+
+    Args:
+        client: DatagenClient instance
+        candidates: Search candidates (url, slug, text) from search_fanout
+        ctx: match_context() for the email
+        max_fetches: Profiles to fetch at most
+
+    Returns:
+        Dict with url, person (fetched payload), confidence and fetched
+        count; url/person are None if nothing reached ACCEPT_CONFIDENCE
+    """
+    ranked = sorted(candidates, key=lambda c: prescore(c, ctx), reverse=True)
+    best = {"url": None, "person": None, "confidence": None, "fetched": 0}
+
+    for candidate in ranked[:max_fetches]:
+        try:
+            profile = client.execute_tool("get_linkedin_person_data", {"linkedin_url": candidate['url']})
+        except Exception:
+            continue
+        best["fetched"] += 1
+        person = profile.get('person') if isinstance(profile, dict) and 'person' in profile else profile
+
+        confidence = round(PRESCORE_WEIGHT * prescore(candidate, ctx)
+                           + (1 - PRESCORE_WEIGHT) * profile_score(person, ctx), 3)
+        if best["confidence"] is None or confidence > best["confidence"]:
+            best.update(url=candidate['url'], person=person, confidence=confidence)
+        if confidence >= ACCEPT_CONFIDENCE:
+            break
+
+    if best["confidence"] is not None and best["confidence"] < ACCEPT_CONFIDENCE:
+        best.update(url=None, person=None)
+    return best
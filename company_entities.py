@@ -0,0 +1,271 @@
+"""
+Company Entities
+
+Company-level fields (industry, headcount, website, LinkedIn page) live
+once per company in the `companies` table (migrations/006) instead of
+being copied from every employee's profile. Rows are keyed by the
+lowercased normalized company name, so "Acme, Inc." and "acme" share one.
+
+The enrichment scripts collect the company part of each profile they
+fetch into a CompanyBatch. At the end of a batch, flush() writes:
+1. one upsert of the unique companies (known fields are kept, missing
+   ones filled in)
+2. one UPDATE ... FROM that points each enriched contact at its company
+   and fills its missing industry / company_size from it
+
+So per-company work is O(unique companies), not O(contacts), and a
+contact whose profile lacks the industry still gets it from a coworker.
+
+Usage:
+    python company_entities.py --backfill            # Build companies from existing CRM rows
+    python company_entities.py --backfill --dry-run  # Show what would change
+"""
+
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from crm_sql import run_sql, run_sql_transaction, sql_literal
+from normalization import normalize_company
+
+
+COMPANY_COLUMNS = ['name', 'domain', 'industry', 'company_size', 'linkedin_url']
+
+
+def company_key(name: Optional[str]) -> Optional[str]:
+    """Entity key of a raw company name ("Acme, Inc." -> "acme")"""
+    normalized = normalize_company(name)
+    return normalized.lower() if normalized else None
+
+
+def website_domain(url: Optional[str]) -> Optional[str]:
+    """"https://www.acme.com/about" -> "acme.com\""""
+    if not url:
+        return None
+    host = urlparse(url if '//' in url else f"//{url}").hostname
+    if host and host.startswith('www.'):
+        host = host[4:]
+    return host or None
+
+
+def company_from_person(person: Dict) -> Optional[Dict]:
+    """
+    Company fields from a search_linkedin_person / get_linkedin_person_data payload
+
+    Returns:
+        Dict with company_key plus COMPANY_COLUMNS, or None if the profile
+        names no company
+    """
+    person = person or {}
+    info = person.get('company')
+    if not isinstance(info, dict):
+        info = {"name": info} if info else {}
+
+    name = info.get('name')
+    if not name:
+        # Fallback to current position, same as the enrichment scripts
+        history = (person.get('positions') or {}).get('positionHistory') or []
+        if history and isinstance(history[0], dict):
+            name = history[0].get('companyName')
+
+    key = company_key(name)
+    if not key:
+        return None
+
+    try:
+        size = int(info.get('staffCount') or info.get('employeeCount'))
+    except (TypeError, ValueError):
+        size = None
+
+    return {
+        "company_key": key,
+        "name": normalize_company(name),
+        "domain": website_domain(info.get('websiteUrl') or info.get('website')),
+        "industry": info.get('industry') or person.get('industry'),
+        "company_size": size,
+        "linkedin_url": info.get('linkedInUrl') or info.get('url'),
+    }
+
+
+class CompanyBatch:
+    """
+    Unique companies seen during one enrichment run, and which contact works where
+
+    Thread-safe, so concurrent enrichment workers can share one batch.
+    """
+
+    def __init__(self):
+        self.companies: Dict[str, Dict] = {}
+        self.members: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def add(self, crm_id: int, person: Dict) -> Optional[str]:
+        """
+        Record a contact's company from their profile payload
+
+        Returns:
+            The company key, or None if the profile names no company
+        """
+        company = company_from_person(person)
+        if not company:
+            return None
+
+        with self._lock:
+            merged = self.companies.setdefault(company['company_key'], dict(company))
+            for column in COMPANY_COLUMNS:
+                if merged.get(column) is None:
+                    merged[column] = company[column]
+            self.members[int(crm_id)] = company['company_key']
+        return company['company_key']
+
+    def __len__(self):
+        return len(self.members)
+
+    def statements(self) -> List[str]:
+        """Company upsert + contact link/backfill statements for the batch"""
+        if not self.members:
+            return []
+
+        columns = ['company_key'] + COMPANY_COLUMNS
+        values = ", ".join(
+            f"({', '.join(sql_literal(company.get(c)) for c in columns)})"
+            for company in self.companies.values()
+        )
+        # Known values are kept and only missing ones filled in (as in backfill());
+        # companies / contacts with nothing to fill aren't rewritten
+        kept = [c for c in COMPANY_COLUMNS if c != 'name']
+        keep_known = ", ".join(f"{c} = COALESCE(companies.{c}, EXCLUDED.{c})" for c in kept)
+        changed = " OR ".join(f"(companies.{c} IS NULL AND EXCLUDED.{c} IS NOT NULL)" for c in kept)
+        upsert = (
+            f"INSERT INTO companies ({', '.join(columns)}) VALUES {values} "
+            f"ON CONFLICT (company_key) DO UPDATE SET {keep_known}, updated_at = NOW() "
+            f"WHERE {changed}"
+        )
+
+        members = ", ".join(f"({int(crm_id)}, {sql_literal(key)})" for crm_id, key in self.members.items())
+        link = (
+            "UPDATE crm AS t SET company_id = c.id, "
+            "industry = COALESCE(t.industry, c.industry), "
+            "company_size = COALESCE(t.company_size, c.company_size) "
+            f"FROM (VALUES {members}) AS v(id, company_key) "
+            "JOIN companies c ON c.company_key = v.company_key "
+            "WHERE t.id = v.id AND (t.company_id IS DISTINCT FROM c.id "
+            "OR (t.industry IS NULL AND c.industry IS NOT NULL) "
+            "OR (t.company_size IS NULL AND c.company_size IS NOT NULL))"
+        )
+        return [upsert, link]
+
+    def flush(self, client) -> Dict:
+        """
+        Upsert the batch's companies and link/backfill its contacts in one transaction
+
+        Returns:
+            Dict with companies and contacts counts written
+        """
+        with self._lock:
+            stats = {"companies": len(self.companies), "contacts": len(self.members)}
+            statements = self.statements()
+            if statements:
+                run_sql_transaction(client, statements)
+            self.companies.clear()
+            self.members.clear()
+        return stats
+
+
+def backfill(client, dry_run: bool = False) -> Dict:
+    """
+    Build companies from the CRM's existing company_normalized values
+
+    Each company takes the most common industry and the largest headcount
+    among its contacts; every contact is then linked and has missing
+    industry / company_size filled from its company in one UPDATE ... FROM.
+
+    Returns:
+        Dict with companies and contacts counts
+    """
+    counts = run_sql(client, """
+        SELECT COUNT(DISTINCT lower(company_normalized)) AS companies, COUNT(*) AS contacts
+        FROM crm
+        WHERE company_normalized IS NOT NULL AND company_normalized != ''
+    """)
+    stats = {
+        "companies": int(counts[0]['companies']) if counts else 0,
+        "contacts": int(counts[0]['contacts']) if counts else 0,
+    }
+    if dry_run:
+        return stats
+
+    run_sql_transaction(client, [
+        """
+        INSERT INTO companies (company_key, name, industry, company_size)
+        SELECT lower(company_normalized), MIN(company_normalized),
+               mode() WITHIN GROUP (ORDER BY industry), MAX(company_size)
+        FROM crm
+        WHERE company_normalized IS NOT NULL AND company_normalized != ''
+        GROUP BY 1
+        ON CONFLICT (company_key) DO UPDATE SET
+            industry = COALESCE(companies.industry, EXCLUDED.industry),
+            company_size = COALESCE(companies.company_size, EXCLUDED.company_size)
+        """,
+        """
+        UPDATE crm SET
+            company_id = c.id,
+            industry = COALESCE(crm.industry, c.industry),
+            company_size = COALESCE(crm.company_size, c.company_size)
+        FROM companies c
+        WHERE lower(crm.company_normalized) = c.company_key
+          AND (crm.company_id IS DISTINCT FROM c.id
+               OR (crm.industry IS NULL AND c.industry IS NOT NULL)
+               OR (crm.company_size IS NULL AND c.company_size IS NOT NULL))
+        """,
+    ])
+    return stats
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Company entity table')
+    parser.add_argument('--backfill', action='store_true',
+                        help='Create companies from existing CRM rows and link contacts')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='With --backfill, count companies without writing')
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.print_help()
+        sys.exit(0)
+
+    from datagen_sdk import DatagenClient
+    from run_migration import migrate
+
+    # Load environment variables
+    try:
+        with open('.env') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    if (value.startswith('"') and value.endswith('"')) or \
+                       (value.startswith("'") and value.endswith("'")):
+                        value = value[1:-1]
+                    os.environ[key] = value
+    except FileNotFoundError:
+        print("Warning: .env file not found")
+
+    if not os.getenv('DATAGEN_API_KEY'):
+        print("Error: DATAGEN_API_KEY not set")
+        sys.exit(1)
+
+    client = DatagenClient()
+    if not args.dry_run:
+        result = migrate(client)
+        if result["error"]:
+            print(f"❌ Schema migration failed: {result['error']}")
+            sys.exit(1)
+
+    stats = backfill(client, dry_run=args.dry_run)
+    prefix = "[DRY RUN] Would link" if args.dry_run else "✅ Linked"
+    print(f"{prefix} {stats['contacts']} CRM rows to {stats['companies']} companies")
@@ -0,0 +1,183 @@
+"""
+Email Domain -> Company Resolver
+
+Corporate signups (jane@acme.io) tell us their company even when
+crm.company is empty. This resolves each email domain to a company name
+once and caches it in DOMAIN_CACHE_FILE, so the enrichment cascade can
+pass `companyName` to search_linkedin_person and the search fan-out.
+
+Resolution for domains not in the cache, in one batch:
+1. CRM: the most common company among enriched contacts on the same
+   domain (one grouped query per DOMAIN_BATCH_SIZE domains)
+2. Otherwise the domain name itself ("acme-labs.io" -> "Acme-labs"),
+   marked source="domain"
+
+Webmail domains (FREE_MAIL_DOMAINS) are skipped. Unresolvable domains
+are cached too, so they aren't looked up again until the TTL expires.
+
+Usage:
+    python company_resolver.py                  # Resolve domains of contacts without a company
+    python company_resolver.py jane@acme.io     # Resolve specific emails
+"""
+
+import os
+import sys
+from typing import Dict, Iterable, Optional
+
+from crm_sql import run_sql, sql_literal
+from json_cache import JsonTTLCache
+from normalization import normalize_company
+
+
+DOMAIN_CACHE_FILE = ".company_domain_cache.json"
+DOMAIN_CACHE_TTL_DAYS = 30
+DOMAIN_BATCH_SIZE = 500  # Domains per CRM lookup
+
+# Webmail / ISP / disposable domains that say nothing about the employer
+FREE_MAIL_DOMAINS = {
+    "gmail.com", "googlemail.com", "yahoo.com", "yahoo.co.uk", "yahoo.co.in", "yahoo.fr",
+    "ymail.com", "rocketmail.com", "hotmail.com", "hotmail.co.uk", "hotmail.fr", "outlook.com",
+    "live.com", "msn.com", "icloud.com", "me.com", "mac.com", "aol.com", "proton.me",
+    "protonmail.com", "pm.me", "tutanota.com", "gmx.com", "gmx.de", "gmx.net", "web.de",
+    "mail.com", "email.com", "zoho.com", "yandex.com", "yandex.ru", "mail.ru", "qq.com",
+    "163.com", "126.com", "sina.com", "naver.com", "daum.net", "hanmail.net", "rediffmail.com",
+    "fastmail.com", "hey.com", "comcast.net", "verizon.net", "att.net", "sbcglobal.net",
+    "btinternet.com", "orange.fr", "free.fr", "libero.it", "t-online.de", "mailinator.com",
+    "guerrillamail.com", "10minutemail.com", "duck.com", "passmail.net",
+}
+
+# Second-level labels that are part of the public suffix ("co" in acme.co.uk)
+PUBLIC_SUFFIX_LABELS = {"com", "co", "org", "net", "ac", "gov", "edu"}
+
+
+def email_domain(email: Optional[str]) -> Optional[str]:
+    """Lowercase domain of an email address"""
+    if not email or '@' not in email:
+        return None
+    return email.rsplit('@', 1)[1].strip().lower() or None
+
+
+def company_domain(email: Optional[str]) -> Optional[str]:
+    """Corporate email domain, or None for webmail / missing emails"""
+    domain = email_domain(email)
+    return None if domain in FREE_MAIL_DOMAINS else domain
+
+
+def domain_root(domain: Optional[str]) -> Optional[str]:
+    """"acme.co.uk" -> "acme", "mail.acme.com" -> "acme\""""
+    if not domain:
+        return None
+    labels = [label for label in domain.lower().split('.') if label]
+    if len(labels) > 1:
+        labels = labels[:-1]  # TLD
+    while len(labels) > 1 and labels[-1] in PUBLIC_SUFFIX_LABELS:
+        labels = labels[:-1]
+    return labels[-1] if labels else None
+
+
+class DomainCache(JsonTTLCache):
+    """
+    Local JSON cache of domain -> {company, source, resolved_at}.
+
+    Entries expire after ttl_days; domains that didn't resolve are stored
+    with company None.
+    """
+
+    stamp_field = "resolved_at"
+
+    def __init__(self, path: str = DOMAIN_CACHE_FILE, ttl_days: int = DOMAIN_CACHE_TTL_DAYS):
+        super().__init__(path, ttl_days)
+
+    def put(self, domain: str, company: Optional[str], source: Optional[str]):
+        self._store(domain, {"company": company, "source": source})
+
+
+def crm_companies_sql(domains: Iterable[str]) -> str:
+    """Company counts per email domain among contacts that already have a company"""
+    in_list = ", ".join(sql_literal(domain) for domain in domains)
+    return f"""
+        SELECT lower(split_part(email, '@', 2)) AS domain, company, COUNT(*) AS contacts
+        FROM crm
+        WHERE company IS NOT NULL AND company != ''
+          AND lower(split_part(email, '@', 2)) = ANY(ARRAY[{in_list}])
+        GROUP BY 1, 2
+    """
+
+
+def resolve_companies(client, emails: Iterable[str], cache: Optional[DomainCache] = None) -> Dict[str, Dict]:
+    """
+    Company for each corporate email domain, looking up only uncached domains
+
+    Args:
+        client: DatagenClient instance
+        emails: Email addresses (webmail and invalid ones are ignored)
+        cache: DomainCache to use (defaults to DOMAIN_CACHE_FILE)
+
+    Returns:
+        Dict of domain -> {company, source}; source is "crm" or "domain"
+    """
+    cache = cache or DomainCache()
+    domains = sorted({d for d in (company_domain(email) for email in emails) if d})
+    missing = [domain for domain in domains if not cache.get(domain)]
+
+    try:
+        for start in range(0, len(missing), DOMAIN_BATCH_SIZE):
+            batch = missing[start:start + DOMAIN_BATCH_SIZE]
+
+            # Majority company per domain among already-enriched contacts
+            best: Dict[str, Dict] = {}
+            for row in run_sql(client, crm_companies_sql(batch)):
+                contacts = int(row['contacts'])
+                if row['domain'] not in best or contacts > best[row['domain']]['contacts']:
+                    best[row['domain']] = {"company": row['company'], "contacts": contacts}
+
+            for domain in batch:
+                if domain in best:
+                    cache.put(domain, normalize_company(best[domain]['company']), "crm")
+                else:
+                    root = domain_root(domain)
+                    cache.put(domain, normalize_company(root) if root else None, "domain" if root else None)
+    finally:
+        if missing:
+            cache.save()
+
+    return {domain: {k: cache.get(domain)[k] for k in ("company", "source")} for domain in domains}
+
+
+def company_for_email(resolved: Dict[str, Dict], email: Optional[str]) -> Optional[str]:
+    """Look up an email's company in resolve_companies() output"""
+    entry = resolved.get(company_domain(email) or "")
+    return entry['company'] if entry else None
+
+
+if __name__ == "__main__":
+    from datagen_sdk import DatagenClient
+
+    # Load environment variables
+    try:
+        with open('.env') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    if (value.startswith('"') and value.endswith('"')) or \
+                       (value.startswith("'") and value.endswith("'")):
+                        value = value[1:-1]
+                    os.environ[key] = value
+    except FileNotFoundError:
+        print("Warning: .env file not found")
+
+    if not os.getenv('DATAGEN_API_KEY'):
+        print("Error: DATAGEN_API_KEY not set")
+        sys.exit(1)
+
+    client = DatagenClient()
+    emails = sys.argv[1:] or [row['email'] for row in run_sql(client, """
+        SELECT email FROM crm WHERE company IS NULL AND email IS NOT NULL
+    """)]
+
+    resolved = resolve_companies(client, emails)
+    for domain, entry in sorted(resolved.items()):
+        print(f"  {domain:<30} {entry['company'] or '-':<30} ({entry['source'] or 'unresolved'})")
+    print(f"\n✅ {len(resolved)} corporate domains resolved "
+          f"({sum(1 for e in resolved.values() if e['source'] == 'crm')} from CRM)")
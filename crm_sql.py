@@ -0,0 +1,127 @@
+"""
+CRM SQL helpers
+
+Small helpers shared by the scripts that talk to the Neon CRM database
+through `mcp_Neon_run_sql`: running a statement (or a transaction of
+statements via `mcp_Neon_run_sql_transaction`), quoting literals, and
+building multi-row UPDATE statements so a batch goes out in one call.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Sequence
+
+PROJECT_ID = "rough-base-02149126"
+DATABASE_NAME = "datagen"
+
+
+def run_sql(client, sql: str) -> List[Dict]:
+    """
+    Run one SQL statement and return its rows
+
+    Args:
+        client: DatagenClient instance
+        sql: SQL text
+
+    Returns:
+        List of row dicts (empty for statements without a result set)
+    """
+    result = client.execute_tool(
+        "mcp_Neon_run_sql",
+        {
+            "params": {
+                "sql": sql,
+                "projectId": PROJECT_ID,
+                "databaseName": DATABASE_NAME
+            }
+        }
+    )
+
+    # Result is double-wrapped: [[{...}, {...}]]
+    if result and isinstance(result, list) and isinstance(result[0], list):
+        return result[0]
+    return []
+
+
+def run_sql_transaction(client, statements: Sequence[str]):
+    """
+    Run several statements in one transaction with a single round trip
+
+    The whole batch is rolled back if any statement fails; the tool raises
+    in that case.
+
+    Args:
+        client: DatagenClient instance
+        statements: SQL statements, in order
+
+    Returns:
+        The tool's raw result (one entry per statement)
+    """
+    return client.execute_tool(
+        "mcp_Neon_run_sql_transaction",
+        {
+            "params": {
+                "sqlStatements": list(statements),
+                "projectId": PROJECT_ID,
+                "databaseName": DATABASE_NAME
+            }
+        }
+    )
+
+
+def sql_literal(value) -> str:
+    """Render a Python value as a SQL literal (strings are quote-escaped)"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (datetime, date)):
+        return f"'{value.isoformat()}'"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def build_values_update(
+    table: str,
+    key: str,
+    columns: Sequence[str],
+    rows: Iterable[Dict],
+    casts: Dict[str, str] = None
+) -> str:
+    """
+    Build one `UPDATE ... FROM (VALUES ...)` statement for many rows
+
+    Args:
+        table: Table to update
+        key: Key column matched between the table and the VALUES list
+        columns: Columns to set from each row dict
+        rows: Row dicts containing `key` and `columns`
+        casts: Optional SQL type per column (e.g. {"email_draft": "jsonb"}),
+            needed when the literal's type can't be inferred
+
+    Returns:
+        SQL text, or "" if there are no rows
+    """
+    casts = casts or {}
+    values = []
+    for row in rows:
+        literals = [sql_literal(row[key])]
+        for column in columns:
+            literal = sql_literal(row.get(column))
+            if column in casts:
+                literal = f"{literal}::{casts[column]}"
+            literals.append(literal)
+        values.append(f"({', '.join(literals)})")
+
+    if not values:
+        return ""
+
+    assignments = ", ".join(f"{column} = v.{column}" for column in columns)
+    return (
+        f"UPDATE {table} AS t SET {assignments} "
+        f"FROM (VALUES {', '.join(values)}) AS v({key}, {', '.join(columns)}) "
+        f"WHERE t.{key} = v.{key}"
+    )
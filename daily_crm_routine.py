@@ -4,7 +4,8 @@ Daily CRM Routine
 Orchestrates daily workflow:
 1. Recalculate priority scores
 2. Sync email tracking for top contacts
-3. Generate daily contact report
+3. Refresh the daily priority queue (priority_queue.py)
+4. Generate daily contact report
 
 Run manually: python daily_crm_routine.py
 Add to crontab: 0 8 * * * cd /path/to/signup-enrichment && source venv/bin/activate && python daily_crm_routine.py >> logs/daily_routine.log 2>&1
@@ -100,7 +101,15 @@ def main():
     )
     results.append(("Email Tracking", success))
 
-    # Step 3: Generate daily report
+    # Step 3: Re-rank the daily priority queue with fresh scores and statuses
+    success = run_command(
+        "Refresh Daily Priority Queue",
+        "python priority_queue.py --refresh",
+        timeout=120
+    )
+    results.append(("Priority Queue", success))
+
+    # Step 4: Generate daily report
     success = run_command(
         "Generate Daily Contact Report",
         "python get_daily_contacts.py",
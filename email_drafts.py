@@ -0,0 +1,169 @@
+"""
+Email Drafts
+
+Versioned outreach drafts stored in the `email_drafts` table (see
+migrations/004_email_drafts.sql). Saving a draft adds a new version
+instead of overwriting; readers take the latest version per contact, and
+load many contacts' drafts with one query.
+
+Also parses the legacy outreach_emails/*.md drafts, indexed once per scan
+so lookups don't probe the file system per contact.
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from crm_sql import run_sql, sql_literal
+
+
+DRAFTS_DIR = "outreach_emails"
+
+
+def parse_email_draft(filepath: str) -> Tuple[str, str]:
+    """Parse .md file to extract subject and body"""
+    with open(filepath, 'r') as f:
+        content = f.read()
+
+    subject = ""
+    body = ""
+
+    # Extract subject
+    if "**Subject:**" in content:
+        subject_start = content.find("**Subject:**") + len("**Subject:**")
+        subject_end = content.find("\n", subject_start)
+        subject = content[subject_start:subject_end].strip()
+
+    # Extract body
+    if "**Body:**" in content:
+        body_start = content.find("**Body:**") + len("**Body:**")
+        # Find the end of the email draft section (next --- or ## section)
+        body_end = content.find("\n---", body_start)
+        if body_end == -1:
+            body_end = content.find("\n##", body_start)
+        if body_end == -1:
+            body_end = len(content)
+
+        body = content[body_start:body_end].strip()
+
+    return subject, body
+
+
+def load_file_drafts(drafts_dir: str = DRAFTS_DIR) -> Dict[str, Dict]:
+    """
+    Parse every .md draft once
+
+    Returns:
+        Dict keyed by lowercase filename stem (e.g. "jane_doe", "jdoe")
+        with subject, body and file
+    """
+    if not os.path.isdir(drafts_dir):
+        return {}
+
+    drafts = {}
+    for filename in os.listdir(drafts_dir):
+        if not filename.endswith('.md'):
+            continue
+        try:
+            subject, body = parse_email_draft(os.path.join(drafts_dir, filename))
+        except OSError:
+            continue
+        drafts[filename[:-len('.md')].lower()] = {"subject": subject, "body": body, "file": filename}
+    return drafts
+
+
+def find_file_draft(file_drafts: Dict[str, Dict], first_name: str, last_name: str, email: str) -> Optional[Dict]:
+    """Look up a contact's .md draft by first_last name, then email local-part"""
+    first_name = (first_name or '').strip().lower()
+    last_name = (last_name or '').strip().lower()
+    keys = []
+    if first_name and last_name:
+        keys.append(f"{first_name}_{last_name}")
+    if email:
+        keys.append(email.split('@')[0].lower())
+
+    for key in keys:
+        if key in file_drafts:
+            return file_drafts[key]
+    return None
+
+
+def build_draft_insert(rows: Iterable[Dict]) -> str:
+    """
+    One INSERT adding a new version for each row whose draft changed
+
+    Each row needs contact_id, subject, body and source. A row identical to
+    the contact's latest version is skipped, so re-running a migration or
+    saving without edits doesn't pile up versions.
+
+    Returns:
+        SQL text, or "" if there are no rows
+    """
+    values = [
+        f"({int(row['contact_id'])}, {sql_literal(row.get('subject') or '')}, "
+        f"{sql_literal(row.get('body') or '')}, {sql_literal(row.get('source'))})"
+        for row in rows
+    ]
+    if not values:
+        return ""
+
+    return f"""
+        INSERT INTO email_drafts (contact_id, version, subject, body, source)
+        SELECT v.contact_id, COALESCE(latest.version, 0) + 1, v.subject, v.body, v.source
+        FROM (VALUES {', '.join(values)}) AS v(contact_id, subject, body, source)
+        LEFT JOIN LATERAL (
+            SELECT d.version, d.subject, d.body
+            FROM email_drafts d
+            WHERE d.contact_id = v.contact_id
+            ORDER BY d.version DESC
+            LIMIT 1
+        ) latest ON TRUE
+        WHERE latest.version IS NULL
+           OR latest.subject IS DISTINCT FROM v.subject
+           OR latest.body IS DISTINCT FROM v.body
+    """
+
+
+def save_draft(client, contact_id: int, subject: str, body: str, source: str = "dashboard"):
+    """Store a new draft version for one contact"""
+    run_sql(client, build_draft_insert([{
+        "contact_id": contact_id, "subject": subject, "body": body, "source": source
+    }]))
+
+
+def latest_drafts_sql(contact_ids: Iterable[int]) -> str:
+    """SQL for the latest draft of each contact (sorted ids keep the text stable for caching)"""
+    ids = sorted({int(i) for i in contact_ids})
+    if not ids:
+        return ""
+    return f"""
+        SELECT DISTINCT ON (contact_id) contact_id, version, subject, body, source, created_at
+        FROM email_drafts
+        WHERE contact_id = ANY(ARRAY[{', '.join(str(i) for i in ids)}])
+        ORDER BY contact_id, version DESC
+    """
+
+
+def drafts_by_contact(rows: List[Dict]) -> Dict[int, Dict]:
+    """Key latest-draft rows by contact id"""
+    return {int(row['contact_id']): row for row in rows}
+
+
+def load_latest_drafts(client, contact_ids: Iterable[int]) -> Dict[int, Dict]:
+    """
+    Latest draft for many contacts in one query
+
+    Returns:
+        Dict of contact_id -> row with version, subject, body, source, created_at
+    """
+    sql = latest_drafts_sql(contact_ids)
+    return drafts_by_contact(run_sql(client, sql)) if sql else {}
+
+
+def draft_history(client, contact_id: int) -> List[Dict]:
+    """All versions of a contact's draft, newest first"""
+    return run_sql(client, f"""
+        SELECT version, subject, body, source, created_at
+        FROM email_drafts
+        WHERE contact_id = {int(contact_id)}
+        ORDER BY version DESC
+    """)
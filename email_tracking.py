@@ -5,11 +5,16 @@ Syncs email interactions with Gmail API and updates CRM database with:
 - Email status (not_contacted, contacted, replied, needs_followup)
 - Sent/received counts and timestamps
 - Follow-up flags based on 3-day rule
+
+EmailSyncJob runs a batch sync on a background thread so the dashboard
+can show progress and partial results without blocking.
 """
 
 import os
+import uuid
+import threading
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from datagen_sdk import DatagenClient
 
 
@@ -68,9 +73,13 @@ class EmailTrackingService:
                 return {
                     'success': True,
                     'email': email,
+                    'contact_id': contact_id,
                     'status': 'not_contacted',
                     'sent': 0,
-                    'received': 0
+                    'received': 0,
+                    'needs_followup': False,
+                    'last_sent': None,
+                    'last_received': None
                 }
 
             # Separate sent vs received and get timestamps
@@ -107,10 +116,13 @@ class EmailTrackingService:
             return {
                 'success': True,
                 'email': email,
+                'contact_id': contact_id,
                 'status': status,
                 'sent': len(sent_emails),
                 'received': len(received_emails),
-                'needs_followup': needs_followup
+                'needs_followup': needs_followup,
+                'last_sent': last_sent,
+                'last_received': last_received
             }
 
         except Exception as e:
@@ -118,6 +130,7 @@ class EmailTrackingService:
             return {
                 'success': False,
                 'email': email,
+                'contact_id': contact_id,
                 'error': str(e)
             }
 
@@ -178,12 +191,18 @@ class EmailTrackingService:
                 'error': str(e)
             }
 
-    def sync_all_contacts(self, limit: int = 50) -> Dict:
+    def sync_all_contacts(
+        self,
+        limit: int = 50,
+        on_result: Optional[Callable[[int, int, Dict], None]] = None
+    ) -> Dict:
         """
         Sync email tracking for multiple contacts
 
         Args:
             limit: Maximum number of contacts to sync
+            on_result: Optional callback(index, total, result) called after
+                each contact is synced
 
         Returns:
             Dict with batch sync results
@@ -214,6 +233,8 @@ class EmailTrackingService:
                 print(f"[{i}/{len(contacts)}] {name} <{email}>")
 
                 result = self.sync_contact_emails(email, contact_id)
+                if on_result:
+                    on_result(i, len(contacts), result)
 
                 if result.get('success'):
                     results['synced'] += 1
@@ -456,3 +477,108 @@ class EmailTrackingService:
                 "databaseName": self.database_name
             }
         })
+
+
+class EmailSyncJob:
+    """
+    Batch email sync running on a background thread
+
+    Only one job runs per process: start() returns the running job instead
+    of starting a second one. Results are recorded as each contact finishes,
+    so callers can poll snapshot() for progress and partial results.
+    """
+
+    _lock = threading.Lock()
+    _current: Optional['EmailSyncJob'] = None
+
+    def __init__(self, limit: int = 20, client: Optional[DatagenClient] = None):
+        """
+        Args:
+            limit: Number of top priority contacts to sync
+            client: DatagenClient instance (creates new one if not provided)
+        """
+        self.id = uuid.uuid4().hex[:8]
+        self.limit = limit
+        self.client = client
+        self.status = 'pending'  # pending, running, done, failed
+        self.total = 0
+        self.results: List[Dict] = []
+        self.error: Optional[str] = None
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._results_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"email-sync-{self.id}", daemon=True)
+
+    @classmethod
+    def start(cls, limit: int = 20, client: Optional[DatagenClient] = None) -> Tuple['EmailSyncJob', bool]:
+        """
+        Start a sync job unless one is already running
+
+        Returns:
+            (job, started) - the running job and False if one was already active
+        """
+        with cls._lock:
+            if cls._current is not None and cls._current.running:
+                return cls._current, False
+            job = cls(limit=limit, client=client)
+            cls._current = job
+            job._thread.start()
+            return job, True
+
+    @classmethod
+    def current(cls) -> Optional['EmailSyncJob']:
+        """Most recently started job (running or finished), if any"""
+        return cls._current
+
+    @property
+    def running(self) -> bool:
+        return self.status in ('pending', 'running')
+
+    def _run(self):
+        self.status = 'running'
+        self.started_at = datetime.now(timezone.utc)
+        try:
+            # Without a client, the service creates its own instead of sharing the caller's
+            service = EmailTrackingService(self.client)
+            summary = service.sync_all_contacts(limit=self.limit, on_result=self._record)
+            if summary.get('success') is False:
+                self.error = summary.get('error')
+                self.status = 'failed'
+            else:
+                self.status = 'done'
+        except Exception as e:
+            self.error = str(e)
+            self.status = 'failed'
+        finally:
+            self.finished_at = datetime.now(timezone.utc)
+
+    def _record(self, index: int, total: int, result: Dict):
+        with self._results_lock:
+            self.total = total
+            self.results.append(result)
+
+    def snapshot(self, since: int = 0) -> Dict:
+        """
+        Current progress plus the results recorded after the first `since`
+
+        Args:
+            since: Number of results the caller has already seen
+
+        Returns:
+            Dict with id, status, total, done, synced, failed, error and
+            new_results
+        """
+        with self._results_lock:
+            results = list(self.results)
+            total = self.total
+
+        return {
+            'id': self.id,
+            'status': self.status,
+            'total': total,
+            'done': len(results),
+            'synced': sum(1 for r in results if r.get('success')),
+            'failed': sum(1 for r in results if not r.get('success')),
+            'error': self.error,
+            'new_results': results[since:]
+        }
@@ -1,10 +1,35 @@
+"""
+Parallel CRM Enrichment
+
+Enriches CRM rows missing a company or title (and not checked in the last
+RECHECK_DAYS, stalest first) with `search_linkedin_person`, running many
+records at once. Runs the light pipeline of
+enrichment_engine.py (direct search + write-back) on its threaded executor:
+
+- Up to --max-in-flight records are in progress together, on a thread
+  pool of that size
+- The engine's ToolLimiter caps concurrent calls per tool and spaces calls
+  to rate-limited tools, so hundreds of in-flight records stay within the
+  provider limits
+- Every record returns an EnrichResult (found / not_found / error,
+  latency, tool calls, updated columns); a progress bar shows live counts
+  and a JSON summary is printed (and optionally written) at the end
+
+Usage:
+    python enrich_crm_parallel.py                                # 20 records
+    python enrich_crm_parallel.py --limit 500 --max-in-flight 200
+    python enrich_crm_parallel.py --summary-file enrich_summary.json
+    python enrich_crm_parallel.py --refresh-older-than 30 --limit 500  # Stale rows first
+"""
+
 import os
 import sys
 import json
-import time
-import random
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Optional
 from datagen_sdk import DatagenClient
+from crm_sql import run_sql
+from enrichment_engine import EnrichmentEngine, EXECUTORS, LIGHT_STAGES, MAX_WORKERS, pending_records_sql, refresh_records_sql
+from run_migration import migrate
 
 # Simple .env loader
 try:
@@ -27,165 +52,58 @@ if not api_key:
 
 client = DatagenClient()
 
-def infer_name_from_email(email):
-    if not email or '@' not in email:
-        return None, None
-    user_part = email.split('@')[0]
-    # Handle "first.last"
-    if '.' in user_part:
-        parts = user_part.split('.')
-        if len(parts) >= 2:
-            return parts[0].capitalize(), parts[1].capitalize()
-    # Handle "firstlast" (harder, maybe just return user_part as first name)
-    # Or "first_last"
-    if '_' in user_part:
-        parts = user_part.split('_')
-        if len(parts) >= 2:
-            return parts[0].capitalize(), parts[1].capitalize()
-            
-    return user_part.capitalize(), None
-
-def process_record(record):
-    """
-    Process a single record: search LinkedIn and update DB.
-    """
-    record_id = record['id']
-    email = record.get('email')
-    
-    # Random sleep to avoid burstiness and respect rate limits
-    time.sleep(random.uniform(0.5, 2.0))
-    
-    print(f"[Thread-{record_id}] Processing ID {record_id} ({email})...")
-    
-    params = {}
-    if email:
-        params['email'] = email
-    
-    first_name = record.get('first_name')
-    last_name = record.get('last_name')
-    
-    # If names are missing, try to infer
-    if not first_name and not last_name and email:
-        first_name, last_name = infer_name_from_email(email)
-        print(f"[Thread-{record_id}]   Inferring name: {first_name} {last_name}")
-    
-    if first_name:
-        params['firstName'] = first_name
-    if last_name:
-        params['lastName'] = last_name
-
-    # print(f"[Thread-{record_id}]   Searching LinkedIn with params: {params}")
-    try:
-        result = client.execute_tool("search_linkedin_person", params)
-        
-        person = result.get('person')
-        if not person:
-            print(f"[Thread-{record_id}]   No person found.")
-            return
-        
-        updates = []
-        
-        # Extract fields
-        headline = person.get('headline')
-        if headline:
-            safe_headline = headline.replace("'", "''")
-            updates.append(f"title = '{safe_headline}'")
-            # print(f"[Thread-{record_id}]   Found Title: {headline}")
-        
-        location = person.get('location')
-        if location:
-            safe_loc = location.replace("'", "''")
-            updates.append(f"location = '{safe_loc}'")
-            # print(f"[Thread-{record_id}]   Found Location: {location}")
-
-        # Company info
-        company_info = person.get('company')
-        company_name = None
-        industry = None
-        
-        if company_info:
-            company_name = company_info.get('name')
-            industry = company_info.get('industry')
-        
-        # Fallback to current position
-        if not company_name and person.get('positions'):
-            positions = person.get('positions', {}).get('positionHistory', [])
-            if positions:
-                # Assuming first is current
-                current = positions[0]
-                company_name = current.get('companyName')
-                if not headline: # Fallback title
-                    title_val = current.get('title')
-                    if title_val:
-                        safe_title = title_val.replace("'", "''")
-                        updates.append(f"title = '{safe_title}'")
-
-        if company_name:
-            safe_company = company_name.replace("'", "''")
-            updates.append(f"company = '{safe_company}'")
-            # print(f"[Thread-{record_id}]   Found Company: {company_name}")
-        
-        if industry:
-            safe_industry = industry.replace("'", "''")
-            updates.append(f"industry = '{safe_industry}'")
-            # print(f"[Thread-{record_id}]   Found Industry: {industry}")
-
-        if updates:
-            sql = f"UPDATE crm SET {', '.join(updates)} WHERE id = {record_id}"
-            
-            client.execute_tool(
-                "mcp_Neon_run_sql",
-                {
-                    "params": {
-                        "sql": sql,
-                        "projectId": "rough-base-02149126",
-                        "databaseName": "datagen"
-                    }
-                }
-            )
-            print(f"[Thread-{record_id}]   ✅ Updated record.")
-        else:
-            print(f"[Thread-{record_id}]   No relevant updates found.")
+MAX_IN_FLIGHT = MAX_WORKERS  # Records enriched concurrently
 
-    except Exception as e:
-        print(f"[Thread-{record_id}]   ❌ Error: {e}")
 
-def run():
+def run(limit: int = 20, max_in_flight: int = MAX_IN_FLIGHT, summary_file: Optional[str] = None,
+        executor: str = "threaded", refresh_older_than: Optional[float] = None) -> Optional[Dict]:
+    # companies table, crm.company_id (migrations/006), every column the engine writes (007),
+    # enriched_at / enrich_updated_at (008)
+    result = migrate(client)
+    if result["error"]:
+        print(f"❌ Schema migration failed: {result['error']}")
+        return None
+
     print("Fetching records to enrich...")
     try:
-        # Fetch records that need enrichment
-        # Increased LIMIT to 20 for parallel processing demo
-        rows = client.execute_tool(
-            "mcp_Neon_run_sql", 
-            {
-                "params": {
-                    "sql": "SELECT id, first_name, last_name, email, linkedin_url FROM crm WHERE company IS NULL OR title IS NULL LIMIT 20",
-                    "projectId": "rough-base-02149126",
-                    "databaseName": "datagen"
-                }
-            }
-        )
-        
-        if not rows or not rows[0]:
-            print("No records found.")
-            return
-
-        records = rows[0]
-        print(f"Found {len(records)} records. Starting parallel processing...")
-
-        # Parallel execution
-        max_workers = 3 # Conservative limit for rate limiting
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(process_record, record) for record in records]
-            
-            for future in as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    print(f"Task failed: {e}")
-                    
+        records = run_sql(client, refresh_records_sql(refresh_older_than, limit)
+                          if refresh_older_than is not None
+                          else pending_records_sql("company IS NULL OR title IS NULL", limit))
     except Exception as e:
         print(f"❌ Script Error: {e}")
+        return None
+
+    if not records:
+        print("No records found.")
+        return None
+
+    print(f"Found {len(records)} records. Enriching up to {max_in_flight} at a time...")
+    engine = EnrichmentEngine(client, LIGHT_STAGES, executor=executor, max_workers=max_in_flight)
+    summary = engine.run(records)
+
+    if summary_file:
+        with open(summary_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    print(json.dumps({k: v for k, v in summary.items() if k != "results"}, indent=2))
+    return summary
+
 
 if __name__ == "__main__":
-    run()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Enrich CRM rows missing company/title concurrently')
+    parser.add_argument('--limit', type=int, default=20,
+                        help='Records to enrich (default: 20)')
+    parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT,
+                        help=f'Records enriched concurrently (default: {MAX_IN_FLIGHT})')
+    parser.add_argument('--executor', choices=list(EXECUTORS), default='threaded',
+                        help='How records are scheduled (default: threaded)')
+    parser.add_argument('--summary-file',
+                        help='Also write the JSON summary with per-record results here')
+    parser.add_argument('--refresh-older-than', type=float, metavar='DAYS',
+                        help='Re-enrich rows last checked more than DAYS ago, highest priority first')
+    args = parser.parse_args()
+
+    run(limit=args.limit, max_in_flight=args.max_in_flight, summary_file=args.summary_file,
+        executor=args.executor, refresh_older_than=args.refresh_older_than)
@@ -0,0 +1,757 @@
+"""
+Enrichment Engine
+
+One implementation of the signup enrichment cascade shared by
+enrich_crm.py, enrich_crm_parallel.py and full_enrichment.py. The scripts
+only pick their records, stages and executor; everything else (name
+inference, search, validation, field extraction, SQL, company linking,
+summary) lives here, so throughput work lands once.
+
+Stages run in order for each record and share a RecordState:
+- known_profile: reuse the stored linkedin_url of an earlier match
+                 (refresh runs skip the searches)
+- direct_search: Datagen `search_linkedin_person` (email, name, company)
+- web_search:    Linkup/Exa fan-out + local candidate validation
+                 (search_fanout.py, candidate_scoring.py)
+- deep_profile:  `get_linkedin_person_data` for the accepted URL
+- write_back:    diff the extracted fields against the record's current
+                 values (select RECORD_COLUMNS) and queue only changed
+                 columns; queued rows go out as batched UPDATE ... FROM
+                 (VALUES ...) statements, so re-enriching an enriched CRM
+                 writes almost nothing. Company-level fields go to the
+                 companies table (company_entities.py)
+Any callable `stage(engine, state)` can be used in place of a name.
+
+Executors (EXECUTORS) decide how records are scheduled: serial or threaded
+(bounded pool of max_workers threads). The stages call the blocking SDK,
+so an event loop would only wrap the same threads. Whatever the executor,
+every tool call (stages, batch prefetches, CRM and company writes) goes
+through one ToolLimiter, which caps concurrent calls per tool
+(TOOL_LIMITS) and spaces calls to rate-limited tools (TOOL_RATES).
+
+Every path records provenance (enrich_source) and freshness: rows are
+stamped with enriched_at when processed and enrich_updated_at when a
+column changed (migrations/008). pending_records_sql() selects the rows a
+default run should look at, skipping ones checked in the last RECHECK_DAYS;
+refresh_records_sql() selects rows not checked for N days, highest
+priority first, for `--refresh-older-than`.
+
+Every record produces an EnrichResult; run() returns a summary with
+counts, throughput, latency percentiles, errors and per-record results.
+"""
+
+import sys
+import time
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from candidate_scoring import classify, direct_match_confidence, match_context, validate_candidates
+from company_entities import CompanyBatch
+from company_resolver import resolve_companies, company_for_email
+from crm_sql import run_sql_transaction, build_values_update
+from geo_prefetch import prefetch_geo, format_location
+from name_segmentation import infer_name_from_email, name_candidates
+from normalization import normalize_title, normalize_company
+from search_fanout import search_linkedin_candidates
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    print("Installing tqdm for progress bar...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "tqdm"])
+    from tqdm import tqdm
+
+
+MAX_WORKERS = 100  # Records in flight for the threaded executor
+DEFAULT_TOOL_LIMIT = 10  # Concurrent calls for tools not in TOOL_LIMITS
+TOOL_LIMITS = {
+    "search_linkedin_person": 50,
+    "get_linkedin_person_data": 20,
+    "mcp_Linkup_search": 10,
+    "mcp_Exa_web_search_exa": 10,
+    "mcp_Neon_run_sql": 10,
+    "mcp_Neon_run_sql_transaction": 2,
+}
+TOOL_RATES = {
+    "search_linkedin_person": 20.0,  # Calls per second
+}
+
+WRITE_FLUSH_EVERY = 200  # Changed rows per batched write round trip
+WRITE_RETRY_SECONDS = 5.0  # Backoff after a failed write, doubled per consecutive failure
+WRITE_RETRY_MAX_SECONDS = 120.0
+# Columns the write-back stage may set; select them with the records so it can diff
+WRITE_COLUMNS = [
+    "title", "location", "company", "title_normalized", "role_family", "seniority",
+    "company_normalized", "linkedin_url", "enrich_source", "enrich_confidence",
+]
+RECORD_COLUMNS = ["id", "email", "first_name", "last_name"] + WRITE_COLUMNS
+WRITE_CASTS = {"enrich_confidence": "numeric", "enriched_at": "timestamptz", "enrich_updated_at": "timestamptz"}
+# Sources that mean an earlier run found the person; a later miss keeps them
+MATCH_SOURCES = ("direct_search", "direct_search_validated", "web_search_validated", "known_url")
+RECHECK_DAYS = 30  # Default runs skip rows checked (found or not) more recently than this
+
+LIGHT_STAGES = ("direct_search", "write_back")
+FULL_STAGES = ("known_profile", "direct_search", "web_search", "deep_profile", "write_back")
+
+
+@dataclass
+class EnrichResult:
+    """Outcome of enriching one CRM record"""
+
+    id: int
+    email: Optional[str]
+    status: str = "not_found"  # found / not_found / error
+    source: Optional[str] = None  # Stage that found the person
+    linkedin_url: Optional[str] = None
+    confidence: Optional[float] = None
+    latency: float = 0.0  # Seconds
+    tool_calls: int = 0
+    updated: List[str] = field(default_factory=list)  # Columns written
+    error: Optional[str] = None
+
+
+@dataclass
+class RecordState:
+    """Per-record working state passed from stage to stage"""
+
+    record: Dict
+    result: EnrichResult
+    client: "CountingClient"
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    company: Optional[str] = None  # Search seed (CRM company or resolved from the email domain)
+    geo: Dict = field(default_factory=dict)
+    ctx: Optional[Dict] = None  # candidate_scoring.match_context
+    person: Optional[Dict] = None  # Best person payload so far
+    accepted: bool = False  # A stage found the person
+    profile_fetched: bool = False  # `person` is a get_linkedin_person_data payload
+    via_direct_search: bool = False
+
+
+class ToolLimiter:
+    """Per-tool concurrency and rate limits shared by every worker thread"""
+
+    def __init__(self, limits: Dict[str, int] = None, rates: Dict[str, float] = None):
+        self.limits = TOOL_LIMITS if limits is None else limits
+        self.rates = TOOL_RATES if rates is None else rates
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, tool: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if tool not in self._semaphores:
+                self._semaphores[tool] = threading.BoundedSemaphore(self.limits.get(tool, DEFAULT_TOOL_LIMIT))
+            return self._semaphores[tool]
+
+    def _throttle(self, tool: str):
+        """Space calls to a rate-limited tool 1/rate seconds apart"""
+        rate = self.rates.get(tool)
+        if not rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(tool, 0.0))
+            self._next_slot[tool] = slot + 1.0 / rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def execute(self, client, tool: str, params: Dict):
+        with self._semaphore(tool):
+            self._throttle(tool)
+            return client.execute_tool(tool, params)
+
+
+class LimitedClient:
+    """
+    DatagenClient stand-in that sends every call through a ToolLimiter
+
+    Passed to run_sql, search_fanout, candidate_scoring and the batch
+    writers like a client.
+    """
+
+    def __init__(self, client, limiter: ToolLimiter):
+        self.client = client
+        self.limiter = limiter
+
+    def execute_tool(self, tool: str, params: Dict):
+        return self.limiter.execute(self.client, tool, params)
+
+
+class CountingClient(LimitedClient):
+    """LimitedClient for one record that also counts its calls on the record's result"""
+
+    def __init__(self, client, limiter: ToolLimiter, result: EnrichResult):
+        super().__init__(client, limiter)
+        self.result = result
+        self._lock = threading.Lock()
+
+    def execute_tool(self, tool: str, params: Dict):
+        with self._lock:
+            self.result.tool_calls += 1
+        return super().execute_tool(tool, params)
+
+
+def extract_person_fields(person: Dict) -> Dict[str, Optional[str]]:
+    """
+    CRM columns from a search_linkedin_person / get_linkedin_person_data payload
+
+    Company falls back to the current position, and so does the title when
+    there is no headline. Normalized columns (normalization.py) are included
+    next to title/company. Company-level fields (industry, size) are not;
+    they come from the companies table.
+
+    Returns:
+        Dict of column -> value (only columns with a value)
+    """
+    person = person or {}
+    history = (person.get('positions') or {}).get('positionHistory') or []
+    current = history[0] if history and isinstance(history[0], dict) else {}
+
+    title = person.get('headline') or person.get('jobTitle') or current.get('title')
+    company = person.get('company')
+    if isinstance(company, dict):
+        company = company.get('name')
+    company = company or current.get('companyName')
+
+    fields = {"title": title, "location": person.get('location'), "company": company}
+    if title:
+        fields.update(normalize_title(title))
+    if company:
+        fields["company_normalized"] = normalize_company(company)
+    return {column: value for column, value in fields.items() if value}
+
+
+def _same_value(old, new) -> bool:
+    """Stored vs new value; numbers compare numerically (NUMERIC comes back as text/Decimal)"""
+    if old is None or new is None:
+        return old is None and new is None
+    if isinstance(new, float):
+        try:
+            return round(float(old), 3) == round(new, 3)
+        except (TypeError, ValueError):
+            return False
+    return str(old) == str(new)
+
+
+def field_diff(record: Dict, updates: Dict) -> Dict:
+    """
+    Columns of `updates` whose value differs from the record's current one
+
+    Columns the record wasn't selected with count as changed.
+    """
+    return {
+        column: value for column, value in updates.items()
+        if column not in record or not _same_value(record[column], value)
+    }
+
+
+class WriteBuffer:
+    """
+    Changed CRM columns queued by write_back, written in batches
+
+    Rows are grouped by the set of columns they change; each group becomes
+    one UPDATE ... FROM (VALUES ...) and every flush sends all groups in
+    one transaction. Changed rows also get enriched_at / enrich_updated_at;
+    unchanged ("touched") rows only get enriched_at, with one UPDATE for all.
+
+    A failed write never reaches the worker that triggered it: the rows stay
+    queued and the next attempt waits out a backoff instead of retrying on
+    every add(). Rows still queued after the final flush() are unwritten().
+    """
+
+    def __init__(self, client, flush_every: int = WRITE_FLUSH_EVERY):
+        self.client = client
+        self.flush_every = flush_every
+        self.pending: List[Dict] = []
+        self.touched: List[int] = []
+        self.stats = {"rows": 0, "touched": 0, "statements": 0, "round_trips": 0, "failed_round_trips": 0}
+        self.last_error: Optional[str] = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, crm_id: int, changed: Dict):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            self.pending.append({"id": int(crm_id), **changed, "enriched_at": now, "enrich_updated_at": now})
+            self._flush_if_due()
+
+    def touch(self, crm_id: int):
+        """Mark an unchanged row as checked now"""
+        with self._lock:
+            self.touched.append(int(crm_id))
+            self._flush_if_due()
+
+    def flush(self) -> bool:
+        """Write everything queued, ignoring any backoff; False if the write failed"""
+        with self._lock:
+            return self._try_flush(log=False)
+
+    def unwritten(self) -> List[int]:
+        """CRM ids still queued (their writes failed)"""
+        with self._lock:
+            return sorted({row["id"] for row in self.pending} | set(self.touched))
+
+    def _flush_if_due(self):
+        if len(self.pending) + len(self.touched) >= self.flush_every and time.monotonic() >= self._retry_at:
+            self._try_flush()
+
+    def _try_flush(self, log: bool = True) -> bool:
+        try:
+            self._flush()
+        except Exception as e:
+            self._failures += 1
+            self.stats["failed_round_trips"] += 1
+            self.last_error = str(e)
+            delay = min(WRITE_RETRY_SECONDS * 2 ** (self._failures - 1), WRITE_RETRY_MAX_SECONDS)
+            self._retry_at = time.monotonic() + delay
+            if log:
+                tqdm.write(f"❌ Writing {len(self.pending) + len(self.touched)} CRM rows failed "
+                           f"(retrying in {delay:.0f}s): {e}")
+            return False
+        self._failures = 0
+        self._retry_at = 0.0
+        return True
+
+    def _flush(self):
+        if not self.pending and not self.touched:
+            return
+        groups: Dict[tuple, List[Dict]] = {}
+        for row in self.pending:
+            groups.setdefault(tuple(sorted(c for c in row if c != "id")), []).append(row)
+        statements = [
+            build_values_update("crm", "id", list(columns), rows, WRITE_CASTS)
+            for columns, rows in groups.items()
+        ]
+        if self.touched:
+            statements.append(
+                f"UPDATE crm SET enriched_at = NOW() WHERE id = ANY(ARRAY[{', '.join(map(str, self.touched))}])"
+            )
+        run_sql_transaction(self.client, statements)
+        self.stats["rows"] += len(self.pending)
+        self.stats["touched"] += len(self.touched)
+        self.stats["statements"] += len(statements)
+        self.stats["round_trips"] += 1
+        self.pending = []
+        self.touched = []
+
+
+# --- Stages -----------------------------------------------------------------
+
+def known_profile(engine: "EnrichmentEngine", state: RecordState):
+    """Accept the stored linkedin_url of an earlier match, so a refresh only re-fetches the profile"""
+    url = state.record.get('linkedin_url')
+    if state.accepted or not url or state.record.get('enrich_source') == "not_found":
+        return
+    engine.log(state, f"[Step 2] Refreshing stored profile {url}")
+    state.accepted = True
+    state.result.source = "known_url"
+    state.result.linkedin_url = url
+
+
+def direct_search(engine: "EnrichmentEngine", state: RecordState):
+    """Datagen search_linkedin_person; validated runs only accept confident matches with a URL"""
+    if state.accepted:
+        return
+    engine.log(state, "[Step 2.1] Trying Datagen Search...")
+    params = {}
+    if state.record.get('email'): params['email'] = state.record['email']
+    if state.first_name: params['firstName'] = state.first_name
+    if state.last_name: params['lastName'] = state.last_name
+    if state.company: params['companyName'] = state.company
+
+    try:
+        found = state.client.execute_tool("search_linkedin_person", params)
+    except Exception as e:
+        state.result.error = f"search_linkedin_person: {e}"
+        engine.log(state, f"  Datagen search failed: {e}")
+        return
+    person = (found or {}).get('person')
+    if not person:
+        engine.log(state, "  No person found.")
+        return
+
+    if engine.validate:
+        if not person.get('linkedInUrl'):
+            return
+        state.result.confidence = direct_match_confidence(person, state.ctx)
+        engine.log(state, f"  Found URL via Datagen: {person['linkedInUrl']} "
+                          f"(confidence {state.result.confidence})")
+        if classify(state.result.confidence, True) == "not_found":
+            return
+
+    state.person = person
+    state.accepted = True
+    state.via_direct_search = True
+    state.result.source = "direct_search"
+    state.result.linkedin_url = person.get('linkedInUrl')
+
+
+def web_search(engine: "EnrichmentEngine", state: RecordState):
+    """Linkup + Exa fan-out over the top name x location queries, validating only the best candidates"""
+    if state.accepted:
+        return
+    engine.log(state, "[Step 2.2] Fanning out Linkup/Exa searches...")
+    email = state.record.get('email')
+    names = [" ".join(filter(None, [state.first_name, state.last_name]))]
+    names += [" ".join(filter(None, [c['first_name'], c['last_name']])) for c in name_candidates(email, limit=3)]
+    names = list(dict.fromkeys(n for n in names if n))
+
+    try:
+        search = search_linkedin_candidates(state.client, names, state.company, state.geo, ctx=state.ctx)
+        engine.log(state, f"  {search['searches']} searches, {len(search['candidates'])} candidates"
+                          f"{' (stopped early)' if search['stopped_early'] else ''}")
+        match = validate_candidates(state.client, search['candidates'], state.ctx)
+    except Exception as e:
+        state.result.error = f"web search: {e}"
+        engine.log(state, f"  Search fan-out failed: {e}")
+        return
+
+    if match['confidence'] is not None:
+        state.result.confidence = match['confidence']
+    if match['url']:
+        state.person = match['person']
+        state.accepted = True
+        state.profile_fetched = True
+        state.result.source = "web_search"
+        state.result.linkedin_url = match['url']
+        engine.log(state, f"  Validated {match['url']} (confidence {match['confidence']}, "
+                          f"{match['fetched']} profiles fetched)")
+
+
+def deep_profile(engine: "EnrichmentEngine", state: RecordState):
+    """
+    get_linkedin_person_data for the accepted URL, unless a stage already fetched it
+
+    If the fetch fails, the search payload is written instead; a stored URL
+    with no payload to fall back on is left for the next run.
+    """
+    if not state.accepted or state.profile_fetched or not state.result.linkedin_url:
+        return
+    engine.log(state, f"[Step 3] Enriching profile from {state.result.linkedin_url}...")
+    try:
+        profile = state.client.execute_tool("get_linkedin_person_data", {"linkedin_url": state.result.linkedin_url})
+    except Exception as e:
+        state.result.error = f"get_linkedin_person_data: {e}"
+        if state.person:
+            engine.log(state, f"  Profile fetch failed, using the search result: {e}")
+        else:
+            engine.log(state, f"  Profile fetch failed: {e}")
+            state.accepted = False
+            state.result.source = None
+        return
+    # The tool might return the person object directly or wrapped.
+    state.person = profile.get('person') if isinstance(profile, dict) and 'person' in profile else profile
+    state.profile_fetched = True
+
+
+def provenance(engine: "EnrichmentEngine", state: RecordState) -> Dict:
+    """
+    enrich_source (and enrich_confidence for validated runs) to record for a record
+
+    A profile refreshed from its stored URL keeps its provenance (rows
+    stored before provenance was recorded get "known_url"), and a miss
+    doesn't overwrite an earlier match.
+    """
+    confidence = state.result.confidence
+    if state.result.source == "known_url":
+        return {} if state.record.get('enrich_source') else {"enrich_source": "known_url"}
+    if state.accepted:
+        if engine.validate:
+            return {"enrich_source": classify(confidence, state.via_direct_search), "enrich_confidence": confidence}
+        return {"enrich_source": state.result.source}
+    if state.record.get('enrich_source') in MATCH_SOURCES:
+        return {}
+    return {"enrich_source": "not_found", "enrich_confidence": confidence} if engine.validate \
+        else {"enrich_source": "not_found"}
+
+
+def write_back(engine: "EnrichmentEngine", state: RecordState):
+    """Queue the record's changed columns plus provenance; unchanged rows are only stamped as checked"""
+    record_id = int(state.record['id'])
+    if not state.accepted and state.result.error:
+        # Lookup failed rather than missed: leave the row as is, so it's retried (not stamped not_found)
+        return
+    updates: Dict = {}
+
+    if state.accepted:
+        updates.update(extract_person_fields(state.person))
+        if state.result.linkedin_url and engine.validate:
+            updates["linkedin_url"] = state.result.linkedin_url
+        engine.companies.add(record_id, state.person)
+    updates.update(provenance(engine, state))
+
+    changed = field_diff(state.record, updates)
+    if not changed:
+        engine.writes.touch(record_id)
+        if state.accepted:
+            engine.log(state, "  CRM already up to date.")
+        return
+    engine.writes.add(record_id, changed)
+    state.result.updated = list(changed)
+    if state.accepted:
+        engine.log(state, f"  ✅ CRM update queued ({', '.join(changed)}).")
+
+
+STAGES: Dict[str, Callable] = {
+    "known_profile": known_profile,
+    "direct_search": direct_search,
+    "web_search": web_search,
+    "deep_profile": deep_profile,
+    "write_back": write_back,
+}
+
+
+# --- Executors --------------------------------------------------------------
+
+def run_serial(records: List[Dict], process: Callable, on_result: Callable, max_workers: int):
+    for record in records:
+        on_result(process(record))
+
+
+def run_threaded(records: List[Dict], process: Callable, on_result: Callable, max_workers: int):
+    in_flight = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for record in records:
+            # Keep at most 2x max_workers records queued
+            while len(in_flight) >= max_workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    on_result(future.result())
+            in_flight.add(executor.submit(process, record))
+        for future in wait(in_flight).done:
+            on_result(future.result())
+
+
+EXECUTORS: Dict[str, Callable] = {
+    "serial": run_serial,
+    "threaded": run_threaded,
+}
+
+
+def summarize(results: List[EnrichResult], elapsed: float, companies: Dict = None) -> Dict:
+    """Counts, throughput, latency percentiles and errors for a run"""
+    latencies = sorted(r.latency for r in results)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else None
+
+    return {
+        "records": len(results),
+        "found": sum(1 for r in results if r.status == "found"),
+        "not_found": sum(1 for r in results if r.status == "not_found"),
+        "error": sum(1 for r in results if r.status == "error"),
+        "tool_calls": sum(r.tool_calls for r in results),
+        "elapsed_seconds": round(elapsed, 3),
+        "records_per_second": round(len(results) / elapsed, 2) if elapsed else None,
+        "latency_seconds": {
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "max": latencies[-1] if latencies else None,
+        },
+        "companies": companies or {"companies": 0, "contacts": 0},
+        "errors": [{"id": r.id, "email": r.email, "error": r.error} for r in results if r.status == "error"],
+    }
+
+
+def pending_records_sql(condition: str, limit: int, recheck_days: float = RECHECK_DAYS) -> str:
+    """
+    Rows matching `condition` that no run checked in the last `recheck_days`
+    days, never-checked and stalest first
+
+    Misses are stamped too, so each run moves on to new rows instead of
+    searching the same first N again.
+    """
+    return f"""
+        SELECT {', '.join(RECORD_COLUMNS)} FROM crm
+        WHERE ({condition})
+          AND COALESCE(enriched_at, '-infinity') < NOW() - INTERVAL '{float(recheck_days)} days'
+        ORDER BY enriched_at NULLS FIRST, id
+        LIMIT {int(limit)}
+    """
+
+
+def refresh_records_sql(older_than_days: float, limit: int) -> str:
+    """
+    Already-enriched rows not checked for `older_than_days` days (or never
+    stamped), highest priority first
+    """
+    return f"""
+        SELECT {', '.join(RECORD_COLUMNS)} FROM crm
+        WHERE COALESCE(enriched_at, '-infinity') < NOW() - INTERVAL '{float(older_than_days)} days'
+          AND (linkedin_url IS NOT NULL OR title IS NOT NULL OR enrich_source IS NOT NULL)
+        ORDER BY priority_score DESC NULLS LAST, enriched_at NULLS FIRST
+        LIMIT {int(limit)}
+    """
+
+
+class EnrichmentEngine:
+    """
+    Runs a stage pipeline over CRM records with a chosen executor
+
+    Args:
+        client: DatagenClient instance
+        stages: Stage names (STAGES) or callables, run in order
+        executor: "serial" or "threaded"
+        max_workers: Records in flight for threaded
+        validate: Score matches (candidate_scoring) and only accept
+            confident ones; also writes linkedin_url, enrich_source and
+            enrich_confidence, including for misses
+        use_geo: Prefetch PostHog locations for the batch (geo_prefetch)
+        use_domain_companies: Seed searches with the company resolved
+            from corporate email domains (company_resolver)
+        verbose: Print per-record step logs instead of a progress bar
+        limiter: ToolLimiter to share (defaults to TOOL_LIMITS/TOOL_RATES)
+    """
+
+    def __init__(self, client, stages: Sequence[Union[str, Callable]] = LIGHT_STAGES,
+                 executor: str = "serial", max_workers: int = MAX_WORKERS, validate: bool = False,
+                 use_geo: bool = False, use_domain_companies: bool = False, verbose: bool = False,
+                 limiter: ToolLimiter = None):
+        self.client = client
+        self.stages = [STAGES[stage] if isinstance(stage, str) else stage for stage in stages]
+        self.executor = EXECUTORS[executor]
+        self.max_workers = 1 if executor == "serial" else max_workers
+        self.validate = validate
+        self.use_geo = use_geo
+        self.use_domain_companies = use_domain_companies
+        self.verbose = verbose
+        self.limiter = limiter or ToolLimiter()
+        # Batch-level calls (prefetches, CRM and company writes) share the limiter with the stages
+        self.limited_client = LimitedClient(client, self.limiter)
+        self.companies = CompanyBatch()
+        self.writes = WriteBuffer(self.limited_client)
+        self.geo_by_email: Dict[str, Dict] = {}
+        self.companies_by_domain: Dict[str, Dict] = {}
+
+    def log(self, state: Optional[RecordState], message: str):
+        if self.verbose:
+            tqdm.write(f"  {message}" if state else message)
+
+    def prepare_batch(self, records: List[Dict]):
+        """Batch-level lookups shared by every record: PostHog geo, email-domain companies"""
+        if self.use_geo:
+            # SOP step 2 for the whole batch: one PostHog query instead of one per user
+            try:
+                self.geo_by_email = prefetch_geo(self.limited_client, [r.get('email') for r in records])
+                located = sum(1 for geo in self.geo_by_email.values() if format_location(geo))
+                self.log(None, f"Prefetched PostHog location for {located}/{len(records)} users.")
+            except Exception as e:
+                self.log(None, f"PostHog geo prefetch failed, continuing without location: {e}")
+
+        if self.use_domain_companies:
+            # Corporate email domains -> company, for records without one
+            try:
+                self.companies_by_domain = resolve_companies(
+                    self.limited_client, [r.get('email') for r in records if not r.get('company')]
+                )
+                resolved = sum(1 for c in self.companies_by_domain.values() if c['company'])
+                self.log(None, f"Resolved {resolved} companies from email domains.")
+            except Exception as e:
+                self.log(None, f"Company resolution failed, continuing without it: {e}")
+
+    def new_state(self, record: Dict) -> RecordState:
+        """Name inference, search company seed, geo and match context for one record"""
+        email = record.get('email')
+        result = EnrichResult(id=record['id'], email=email)
+        state = RecordState(record=record, result=result,
+                            client=CountingClient(self.client, self.limiter, result))
+
+        state.first_name = record.get('first_name')
+        state.last_name = record.get('last_name')
+        if email and (not state.first_name or not state.last_name):
+            fn, ln = infer_name_from_email(email)
+            state.first_name = state.first_name or fn
+            state.last_name = state.last_name or ln
+
+        # Resolved company only seeds the searches; crm.company comes from the profile
+        state.company = record.get('company') or company_for_email(self.companies_by_domain, email)
+        state.geo = self.geo_by_email.get((email or '').lower()) or {}
+        if self.validate:
+            names = [" ".join(filter(None, [state.first_name, state.last_name]))]
+            state.ctx = match_context(email, names, state.geo, state.company)
+        return state
+
+    def process(self, record: Dict) -> EnrichResult:
+        """Run every stage for one record; never raises (stages after a failed lookup still run)"""
+        started = time.monotonic()
+        state = None
+        try:
+            state = self.new_state(record)
+            self.log(None, f"\nProcessing ID {record['id']} ({record.get('email')})")
+            if format_location(state.geo):
+                self.log(state, f"PostHog location: {format_location(state.geo)}")
+            if state.company and not record.get('company'):
+                self.log(state, f"Company from email domain: {state.company}")
+
+            for stage in self.stages:
+                stage(self, state)
+            # A failed stage only counts as an error if nothing after it found the person
+            if state.accepted:
+                state.result.status = "found"
+                state.result.error = None
+            else:
+                state.result.status = "error" if state.result.error else "not_found"
+            if not state.accepted:
+                self.log(state, "❌ Could not find LinkedIn profile.")
+        except Exception as e:
+            state = state or RecordState(record=record, client=None,
+                                         result=EnrichResult(id=record['id'], email=record.get('email')))
+            state.result.status = "error"
+            state.result.error = str(e)
+            self.log(state, f"❌ Error: {e}")
+
+        state.result.latency = round(time.monotonic() - started, 3)
+        return state.result
+
+    def run(self, records: List[Dict]) -> Dict:
+        """
+        Enrich records, then link their companies
+
+        Returns:
+            summarize() dict, plus the per-record results under `results`
+        """
+        started = time.monotonic()
+        self.prepare_batch(records)
+        results: List[EnrichResult] = []
+
+        with tqdm(total=len(records), desc="Enriching", unit="record", disable=self.verbose) as pbar:
+            def on_result(result: EnrichResult):
+                results.append(result)
+                if result.status == "error" and not self.verbose:
+                    tqdm.write(f"❌ {result.id} ({result.email}): {result.error}")
+                pbar.set_postfix(found=sum(r.status == "found" for r in results),
+                                 errors=sum(r.status == "error" for r in results))
+                pbar.update(1)
+
+            self.executor(records, self.process, on_result, self.max_workers)
+
+        if not self.writes.flush():
+            print(f"❌ Could not write {len(self.writes.unwritten())} CRM rows: {self.writes.last_error}")
+
+        # Industry/size once per unique company, then one UPDATE ... FROM for all contacts
+        company_stats = None
+        try:
+            company_stats = self.companies.flush(self.limited_client)
+        except Exception as e:
+            print(f"❌ Could not write companies: {e}")
+
+        results.sort(key=lambda r: r.id)
+        summary = summarize(results, time.monotonic() - started, company_stats)
+        unwritten = self.writes.unwritten()
+        summary["writes"] = dict(self.writes.stats, unchanged=sum(
+            1 for r in results if r.status != "error" and not r.updated
+        ), unwritten=len(unwritten), unwritten_ids=unwritten)
+        # Queued columns that never reached the CRM aren't reported as updated
+        unwritten_ids = set(unwritten)
+        for result in results:
+            if result.id in unwritten_ids:
+                result.updated = []
+        summary["results"] = [asdict(r) for r in results]
+        return summary
@@ -2,9 +2,10 @@ import os
 import sys
 import json
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datagen_sdk import DatagenClient
+from pending_batch import PendingBatch
+from profile_store import ProfileStoreWriter, STORE_DIR
 
 try:
     from tqdm import tqdm
@@ -35,21 +36,29 @@ if not api_key:
 
 client = DatagenClient()
 
-def fetch_new_profiles_from_db():
-    """Fetch LinkedIn URLs from CRM where profile hasn't been fetched yet"""
-    print("Fetching new LinkedIn URLs from CRM (not yet processed)...")
+OUTPUT_FILE = "linkedin_profiles_latest_batch.ndjson"
+SUMMARY_FILE = "linkedin_profiles_latest_batch.summary.json"
+
+MAX_WORKERS = 5  # Adjust based on API rate limits
+MAX_IN_FLIGHT = MAX_WORKERS * 4  # Bound on submitted-but-unwritten fetches
+PAGE_SIZE = 500  # CRM rows read per query
+
+PENDING_MARKS_FILE = ".linkedin_profiles_pending_marks"
+MARK_FLUSH_EVERY = 100  # Fetched ids per linkedin_profile_fetched_at UPDATE
+
+def count_new_profiles_in_db():
+    """Count CRM rows whose LinkedIn profile hasn't been fetched yet (drives the progress bar)"""
     try:
         result = client.execute_tool(
             "mcp_Neon_run_sql",
             {
                 "params": {
                     "sql": """
-                        SELECT id, email, linkedin_url, company, title, location, enrich_source
+                        SELECT COUNT(*) AS total
                         FROM crm
                         WHERE linkedin_url IS NOT NULL
                           AND linkedin_url != ''
                           AND linkedin_profile_fetched_at IS NULL
-                        ORDER BY id DESC
                     """,
                     "projectId": "rough-base-02149126",
                     "databaseName": "datagen"
@@ -58,11 +67,58 @@ def fetch_new_profiles_from_db():
         )
 
         if result and result[0]:
-            return result[0]
-        return []
+            return int(result[0][0].get('total') or 0)
+        return 0
     except Exception as e:
-        print(f"Error fetching from database: {e}")
-        return []
+        print(f"Error counting new profiles: {e}")
+        return None
+
+def iter_new_profiles_from_db(page_size=PAGE_SIZE):
+    """
+    Yield LinkedIn URLs from CRM where profile hasn't been fetched yet.
+
+    Rows are read one page at a time using keyset pagination on id, so only
+    a single page is held in memory regardless of how many rows are pending.
+    """
+    print("Fetching new LinkedIn URLs from CRM (not yet processed)...")
+    last_id = None
+
+    while True:
+        keyset = f"AND id < {int(last_id)}" if last_id is not None else ""
+        try:
+            result = client.execute_tool(
+                "mcp_Neon_run_sql",
+                {
+                    "params": {
+                        "sql": f"""
+                            SELECT id, email, linkedin_url, company, title, location, enrich_source
+                            FROM crm
+                            WHERE linkedin_url IS NOT NULL
+                              AND linkedin_url != ''
+                              AND linkedin_profile_fetched_at IS NULL
+                              {keyset}
+                            ORDER BY id DESC
+                            LIMIT {int(page_size)}
+                        """,
+                        "projectId": "rough-base-02149126",
+                        "databaseName": "datagen"
+                    }
+                }
+            )
+        except Exception as e:
+            print(f"Error fetching from database: {e}")
+            return
+
+        rows = result[0] if result and result[0] else []
+        if not rows:
+            return
+
+        for row in rows:
+            yield row
+
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['id']
 
 def fetch_linkedin_profile(linkedin_url):
     """Fetch detailed LinkedIn profile data"""
@@ -76,14 +132,22 @@ def fetch_linkedin_profile(linkedin_url):
         print(f"  Error fetching profile: {e}")
         return None
 
-def mark_profile_as_fetched(crm_id):
-    """Update the linkedin_profile_fetched_at timestamp"""
+def mark_profiles_as_fetched(crm_ids):
+    """Update the linkedin_profile_fetched_at timestamp for a batch of CRM ids in one statement"""
+    ids = sorted({int(crm_id) for crm_id in crm_ids})
+    if not ids:
+        return True
     try:
         client.execute_tool(
             "mcp_Neon_run_sql",
             {
                 "params": {
-                    "sql": f"UPDATE crm SET linkedin_profile_fetched_at = NOW() WHERE id = {crm_id}",
+                    "sql": f"""
+                        UPDATE crm
+                        SET linkedin_profile_fetched_at = NOW()
+                        WHERE id = ANY(ARRAY[{', '.join(str(i) for i in ids)}])
+                          AND linkedin_profile_fetched_at IS NULL
+                    """,
                     "projectId": "rough-base-02149126",
                     "databaseName": "datagen"
                 }
@@ -91,9 +155,28 @@ def mark_profile_as_fetched(crm_id):
         )
         return True
     except Exception as e:
-        print(f"  Warning: Failed to mark profile as fetched: {e}")
+        print(f"  Warning: Failed to mark {len(ids)} profiles as fetched: {e}")
         return False
 
+class FetchedMarkBuffer(PendingBatch):
+    """
+    Fetched CRM ids, marked in batches (see pending_batch.py)
+
+    Ids are only added once their profiles are in a closed profile store
+    part file (closed every ROWS_PER_FILE rows and at the end of the run),
+    and ids left in PENDING_MARKS_FILE by a crashed run are marked at the
+    start of the next one instead of being re-fetched.
+    """
+
+    def __init__(self, flush_every=MARK_FLUSH_EVERY, pending_file=PENDING_MARKS_FILE):
+        super().__init__(pending_file, flush_every)
+
+    def add(self, crm_id):
+        super().add(int(crm_id))
+
+    def write(self, crm_ids):
+        return mark_profiles_as_fetched(crm_ids)
+
 def process_single_profile(record):
     """Process a single profile fetch (for parallel execution)"""
     linkedin_url = record.get('linkedin_url')
@@ -106,9 +189,7 @@ def process_single_profile(record):
     profile_data = fetch_linkedin_profile(linkedin_url)
 
     if profile_data and profile_data.get('person'):
-        # Mark as fetched in database
-        mark_profile_as_fetched(crm_id)
-
+        # Marked as fetched in database by the caller, in batches
         return {
             "crm_id": crm_id,
             "email": email,
@@ -136,73 +217,109 @@ def process_single_profile(record):
             "success": False
         }
 
-def run():
-    # Fetch CRM records that haven't been processed yet
-    crm_records = fetch_new_profiles_from_db()
+def write_summary(summary):
+    """Write the batch summary sidecar (atomic replace so readers never see a partial file)"""
+    tmp_file = f"{SUMMARY_FILE}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp_file, SUMMARY_FILE)
+
+def _write_done(done, in_flight, out, pbar, counts, store):
+    """Write completed fetches to the NDJSON output and profile store, and release their slots"""
+    for future in done:
+        record = in_flight.pop(future)
+        try:
+            result = future.result()
+        except Exception as e:
+            counts['failed'] += 1
+            tqdm.write(f"❌ Exception for {record.get('email')}: {e}")
+            result = None
+
+        if result:
+            success = result.pop('success', False)
+            out.write(json.dumps(result, default=str) + "\n")
+            out.flush()
+            if success:
+                counts['success'] += 1
+                # Marked fetched by the store once its part file is closed
+                store.append(result)
+            else:
+                counts['failed'] += 1
 
-    if not crm_records:
+        pbar.set_postfix({'✅': counts['success'], '❌': counts['failed']})
+        pbar.update(1)
+
+def run(max_workers=MAX_WORKERS, max_in_flight=MAX_IN_FLIGHT):
+    # Flush marks left over from a run that crashed before its final flush,
+    # so those profiles aren't fetched again
+    marks = FetchedMarkBuffer()
+    if marks.pending:
+        print(f"Marking {len(marks.pending)} profiles left pending by a previous run...")
+        marks.flush()
+
+    # Count CRM records that haven't been processed yet
+    total = count_new_profiles_in_db()
+
+    if total == 0:
+        marks.close()
         print("✅ No new profiles to fetch. All profiles are up to date!")
         return
 
-    print(f"Found {len(crm_records)} NEW profiles to fetch")
-    print(f"Fetching profiles in parallel with progress bar...\n")
+    if total is not None:
+        print(f"Found {total} NEW profiles to fetch")
+    print(f"Streaming profiles to {OUTPUT_FILE} with progress bar...\n")
 
-    all_profiles = []
-    success_count = 0
-    failed_count = 0
+    summary = {
+        "batch_date": datetime.now().isoformat(),
+        "status": "running",
+        "total_in_batch": total,
+        "profiles_fetched": 0,
+        "profiles_failed": 0,
+        "output_file": OUTPUT_FILE
+    }
+    write_summary(summary)
 
-    # Use ThreadPoolExecutor for parallel processing
-    max_workers = 5  # Adjust based on API rate limits
+    counts = {'success': 0, 'failed': 0}
+    in_flight = {}
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_record = {
-            executor.submit(process_single_profile, record): record
-            for record in crm_records
-        }
+    # Each profile is written as one NDJSON line as soon as it lands, so memory
+    # stays bounded by max_in_flight and a crash keeps everything fetched so far.
+    # The output file is overwritten per run (latest batch only); the profile
+    # store keeps every run for history.
+    try:
+        with open(OUTPUT_FILE, 'w') as out, \
+                ProfileStoreWriter(row_group_size=MARK_FLUSH_EVERY, on_written=marks.add_many) as store, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                tqdm(total=total, desc="Fetching profiles", unit="profile") as pbar:
+            for record in iter_new_profiles_from_db():
+                # Backpressure: stop reading new rows until a slot frees up
+                while len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    _write_done(done, in_flight, out, pbar, counts, store)
+
+                in_flight[executor.submit(process_single_profile, record)] = record
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                _write_done(done, in_flight, out, pbar, counts, store)
+    finally:
+        # Final flush; anything that fails stays in the pending file for the next run
+        if not marks.close():
+            print(f"⚠️  {len(marks.pending)} fetched ids left in {PENDING_MARKS_FILE}, will retry next run")
+
+    summary.update({
+        "status": "complete",
+        "completed_at": datetime.now().isoformat(),
+        "profiles_fetched": counts['success'],
+        "profiles_failed": counts['failed']
+    })
+    write_summary(summary)
 
-        # Process completed tasks with progress bar
-        with tqdm(total=len(crm_records), desc="Fetching profiles", unit="profile") as pbar:
-            for future in as_completed(future_to_record):
-                record = future_to_record[future]
-                try:
-                    result = future.result()
-                    if result:
-                        all_profiles.append(result)
-                        if result.get('success'):
-                            success_count += 1
-                            pbar.set_postfix({'✅': success_count, '❌': failed_count})
-                        else:
-                            failed_count += 1
-                            pbar.set_postfix({'✅': success_count, '❌': failed_count})
-                except Exception as e:
-                    failed_count += 1
-                    pbar.set_postfix({'✅': success_count, '❌': failed_count})
-                    tqdm.write(f"❌ Exception for {record.get('email')}: {e}")
-
-                pbar.update(1)
-
-    # Sort profiles by crm_id to maintain consistent order
-    all_profiles.sort(key=lambda x: x['crm_id'], reverse=True)
-
-    # Remove 'success' flag before saving (internal use only)
-    for profile in all_profiles:
-        profile.pop('success', None)
-
-    # Save ONLY the latest batch to file (overwrite previous)
-    output_file = "linkedin_profiles_latest_batch.json"
-    with open(output_file, 'w') as f:
-        json.dump({
-            "batch_date": datetime.now().isoformat(),
-            "total_in_batch": len(crm_records),
-            "profiles_fetched": success_count,
-            "profiles_failed": failed_count,
-            "profiles": all_profiles
-        }, f, indent=2)
-
-    print(f"\n✅ Saved {len(all_profiles)} NEW profiles to {output_file}")
-    print(f"   Successfully fetched: {success_count}")
-    print(f"   Failed to fetch: {failed_count}")
+    print(f"\n✅ Saved {counts['success'] + counts['failed']} NEW profiles to {OUTPUT_FILE}")
+    print(f"   Batch summary: {SUMMARY_FILE}")
+    print(f"   Appended {counts['success']} profiles to {STORE_DIR}/")
+    print(f"   Successfully fetched: {counts['success']}")
+    print(f"   Failed to fetch: {counts['failed']}")
     print(f"\n💡 Next step: Run generate_icp.py to update ICP analysis")
 
 if __name__ == "__main__":
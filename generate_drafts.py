@@ -0,0 +1,292 @@
+"""
+Bulk Draft Generation
+
+Generates outreach drafts for the top of today's priority queue
+(priority_queue.py) and stores them as new versions in email_drafts.
+
+- Generators are pluggable: the built-in local template, Claude, or any
+  `module:function` that takes a contact dict and returns (subject, body)
+- Contacts are processed on a bounded thread pool (--max-workers)
+- Drafts are written in batches with one INSERT per DRAFT_FLUSH_EVERY
+  drafts. Each generated draft is appended to PENDING_DRAFTS_FILE first, so
+  a crashed run resumes by writing those before generating anything new.
+  Contacts that already have a draft are skipped (unless --overwrite), so
+  a re-run only generates what is missing.
+
+Usage:
+    python generate_drafts.py                          # Top 50, template generator
+    python generate_drafts.py --limit 200 --generator claude --max-workers 8
+    python generate_drafts.py --generator my_module:write_draft
+    python generate_drafts.py --dry-run                # Print drafts, don't store them
+"""
+
+import os
+import re
+import sys
+import json
+import importlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Tuple
+
+from crm_sql import run_sql
+from email_drafts import build_draft_insert, load_latest_drafts
+from normalization import normalize_title
+from pending_batch import PendingBatch
+from priority_queue import get_priority_queue
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    print("Installing tqdm for progress bar...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "tqdm"])
+    from tqdm import tqdm
+
+
+MAX_WORKERS = 4  # Concurrent generator calls
+DRAFT_FLUSH_EVERY = 25  # Drafts per INSERT
+PENDING_DRAFTS_FILE = ".generate_drafts_pending.ndjson"
+CLAUDE_MODEL = "claude-sonnet-4-5"
+
+Generator = Callable[[Dict], Tuple[str, str]]
+
+# role_family -> the team the template asks about; Founder, Executive,
+# Consulting, Student / Academic and Other just get "your team"
+ROLE_TEAMS = {
+    "Engineering": "engineering team",
+    "Data / AI": "data team",
+    "Sales / GTM": "sales team",
+    "Marketing": "marketing team",
+    "Product": "product team",
+    "Design": "design team",
+    "Operations": "operations team",
+}
+
+
+class TemplateGenerator:
+    """Local, deterministic drafts built from the contact's CRM fields"""
+
+    source = "template"
+
+    def __call__(self, contact: Dict) -> Tuple[str, str]:
+        first_name = (contact.get('first_name') or '').strip() or "there"
+        company = (contact.get('company') or '').strip()
+        team = ROLE_TEAMS.get(normalize_title(contact.get('title'))['role_family'], "team")
+
+        subject = f"Quick question about {company}" if company else "Quick question"
+        at_company = f" at {company}" if company else ""
+        focus = f"how your {team}"
+
+        body = (
+            f"Hi {first_name},\n\n"
+            f"Thanks for signing up for DataGen! I'm curious {focus}{at_company} "
+            f"is planning to use it - what made you try it out?\n\n"
+            f"Happy to share a few workflows other teams are running, if useful.\n\n"
+            f"Best,"
+        )
+        return subject, body
+
+
+class ClaudeGenerator:
+    """Drafts written by Claude from the contact's CRM fields (needs ANTHROPIC_API_KEY)"""
+
+    source = "claude"
+
+    def __init__(self, model: str = CLAUDE_MODEL):
+        import anthropic
+        self.client = anthropic.Anthropic()
+        self.model = model
+
+    def __call__(self, contact: Dict) -> Tuple[str, str]:
+        fields = {k: contact.get(k) for k in ('first_name', 'last_name', 'company', 'title', 'location')}
+        message = self.client.messages.create(
+            model=self.model,
+            max_tokens=600,
+            messages=[{
+                "role": "user",
+                "content": (
+                    "Write a short, friendly first outreach email to a new DataGen signup. "
+                    "Plain text, under 120 words, no placeholders. Reply with only a JSON object "
+                    f'{{"subject": ..., "body": ...}}.\n\nContact: {json.dumps(fields)}'
+                ),
+            }],
+        )
+        text = "".join(block.text for block in message.content if getattr(block, "type", "") == "text")
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        if not match:
+            raise ValueError(f"No JSON draft in response: {text[:200]}")
+        draft = json.loads(match.group(0))
+        return draft.get('subject', ''), draft.get('body', '')
+
+
+GENERATORS = {
+    "template": TemplateGenerator,
+    "claude": ClaudeGenerator,
+}
+
+
+def load_generator(spec: str) -> Generator:
+    """
+    Resolve --generator: a GENERATORS name or `module:function`
+
+    Returns:
+        Callable taking a contact dict and returning (subject, body)
+    """
+    if spec in GENERATORS:
+        return GENERATORS[spec]()
+    if ":" in spec:
+        module_name, attr = spec.split(":", 1)
+        return getattr(importlib.import_module(module_name), attr)
+    raise ValueError(f"Unknown generator '{spec}' (choose {', '.join(GENERATORS)} or module:function)")
+
+
+class PendingDraftBuffer(PendingBatch):
+    """
+    Generated drafts, stored in batches (see pending_batch.py)
+
+    Drafts left in PENDING_DRAFTS_FILE by a crashed run are stored at the
+    start of the next one instead of being generated again.
+    """
+
+    def __init__(self, client, flush_every=DRAFT_FLUSH_EVERY, pending_file=PENDING_DRAFTS_FILE):
+        self.client = client
+        super().__init__(pending_file, flush_every)
+
+    def write(self, drafts: List[Dict]) -> bool:
+        """One INSERT for the batch, keeping the last draft per contact"""
+        # A contact regenerated after a failed resume flush would otherwise appear twice
+        # and get the same version number twice, failing UNIQUE(contact_id, version)
+        latest = list({int(draft['contact_id']): draft for draft in drafts}.values())
+        try:
+            run_sql(self.client, build_draft_insert(latest))
+        except Exception as e:
+            tqdm.write(f"⚠️  Could not store {len(latest)} drafts: {e}")
+            return False
+        return True
+
+
+def generate_one(generator: Generator, contact: Dict) -> Dict:
+    """Run the generator for one contact"""
+    subject, body = generator(contact)
+    return {
+        "contact_id": contact['id'],
+        "email": contact.get('email'),
+        "subject": (subject or '').strip(),
+        "body": (body or '').strip(),
+        "source": getattr(generator, 'source', 'generator'),
+    }
+
+
+def run(client, generator: Generator, limit: int = 50, min_score: int = 1,
+        max_workers: int = MAX_WORKERS, overwrite: bool = False, dry_run: bool = False) -> Dict:
+    """
+    Generate and store drafts for the top `limit` contacts of today's queue
+
+    Returns:
+        Dict with generated, failed, skipped and resumed counts
+    """
+    stats = {"generated": 0, "failed": 0, "skipped": 0, "resumed": 0}
+
+    buffer = None if dry_run else PendingDraftBuffer(client)
+    if buffer and buffer.pending:
+        # Resume: store what a crashed run already generated
+        print(f"Storing {len(buffer.pending)} drafts left pending by a previous run...")
+        stats["resumed"] = len(buffer.pending)
+        buffer.flush()
+
+    contacts = [c for c in get_priority_queue(client, limit=limit, min_score=min_score) if c.get('email')]
+    if not overwrite and contacts:
+        existing = load_latest_drafts(client, [c['id'] for c in contacts])
+        stats["skipped"] = sum(1 for c in contacts if c['id'] in existing)
+        contacts = [c for c in contacts if c['id'] not in existing]
+
+    print(f"Generating {len(contacts)} drafts ({stats['skipped']} contacts already have one)")
+
+    in_flight = {}
+    contact_iter = iter(contacts)
+
+    def handle(done):
+        for future in done:
+            contact = in_flight.pop(future)
+            try:
+                draft = future.result()
+            except Exception as e:
+                stats["failed"] += 1
+                tqdm.write(f"❌ {contact.get('email')}: {e}")
+            else:
+                stats["generated"] += 1
+                if dry_run:
+                    tqdm.write(f"\n--- {draft['email']} ---\nSubject: {draft['subject']}\n\n{draft['body']}")
+                else:
+                    buffer.add(draft)
+            pbar.update(1)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                tqdm(total=len(contacts), desc="Generating drafts", unit="draft") as pbar:
+            for contact in contact_iter:
+                # Keep at most 2x max_workers generator calls queued
+                while len(in_flight) >= max_workers * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    handle(done)
+                in_flight[executor.submit(generate_one, generator, contact)] = contact
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                handle(done)
+    finally:
+        if buffer and not buffer.close():
+            print(f"⚠️  {len(buffer.pending)} drafts left in {PENDING_DRAFTS_FILE}, will retry next run")
+
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    from datagen_sdk import DatagenClient
+
+    # Load environment variables
+    try:
+        with open('.env') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    if (value.startswith('"') and value.endswith('"')) or \
+                       (value.startswith("'") and value.endswith("'")):
+                        value = value[1:-1]
+                    os.environ[key] = value
+    except FileNotFoundError:
+        print("Warning: .env file not found")
+
+    if not os.getenv('DATAGEN_API_KEY'):
+        print("Error: DATAGEN_API_KEY not set")
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description='Generate outreach drafts for the top priority contacts')
+    parser.add_argument('--limit', type=int, default=50,
+                        help='Contacts from the top of the queue (default: 50)')
+    parser.add_argument('--min-score', type=int, default=1,
+                        help='Minimum priority score (default: 1)')
+    parser.add_argument('--generator', default='template',
+                        help=f"{' | '.join(GENERATORS)} | module:function (default: template)")
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS,
+                        help=f'Concurrent generator calls (default: {MAX_WORKERS})')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='Also draft contacts that already have one (adds a new version)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print generated drafts without storing them')
+    args = parser.parse_args()
+
+    stats = run(
+        DatagenClient(),
+        load_generator(args.generator),
+        limit=args.limit,
+        min_score=args.min_score,
+        max_workers=args.max_workers,
+        overwrite=args.overwrite,
+        dry_run=args.dry_run,
+    )
+
+    print(f"\n✅ Generated {stats['generated']} drafts ({stats['failed']} failed, "
+          f"{stats['skipped']} skipped, {stats['resumed']} resumed from last run)")
@@ -0,0 +1,191 @@
+"""
+PostHog Geo Prefetch
+
+Batch version of Enrichment SOP step 2 (enrich_sop.md): looks up the
+GeoIP city/state/country of many signup emails with one
+`WHERE lower(properties.email) IN (...)` PostHog query per GEO_BATCH_SIZE
+emails, instead of one `mcp_Posthog_query_run` call per signup.
+
+Results (including emails PostHog doesn't know) are cached in
+GEO_CACHE_FILE for GEO_CACHE_TTL_DAYS, so a re-run or the webhook only
+queries emails it hasn't seen recently. The enrichment cascade
+(full_enrichment.py) and the agent prompt (webhook_app.py) take the
+prefetched location instead of running step 2 themselves.
+
+Usage:
+    python geo_prefetch.py              # Prefetch for all contacts without a LinkedIn URL
+    python geo_prefetch.py --limit 100
+"""
+
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from crm_sql import run_sql
+from json_cache import JsonTTLCache
+
+
+GEO_CACHE_FILE = ".posthog_geo_cache.json"
+GEO_CACHE_TTL_DAYS = 7
+GEO_BATCH_SIZE = 200  # Emails per PostHog query
+GEO_FIELDS = ("city", "state", "country")
+
+
+def _hogql_string(value: str) -> str:
+    """Quote a value as a HogQL string literal"""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def geo_batch_query(emails: Iterable[str]) -> str:
+    """HogQL query for the GeoIP location of many emails at once"""
+    in_list = ", ".join(_hogql_string(email) for email in emails)
+    return f"""
+        SELECT
+          lower(properties.email) as email,
+          properties.$geoip_city_name as city,
+          properties.$geoip_subdivision_1_name as state,
+          properties.$geoip_country_name as country
+        FROM persons
+        WHERE lower(properties.email) IN ({in_list})
+    """
+
+
+def _result_rows(result) -> List[Dict]:
+    """Normalize a query_run result ({columns, results}, or a list of rows) to row dicts"""
+    if isinstance(result, list) and len(result) == 1 and isinstance(result[0], dict) \
+            and 'results' in result[0]:
+        result = result[0]
+    if isinstance(result, dict):
+        columns = result.get('columns') or []
+        rows = result.get('results') or []
+        return [dict(zip(columns, row)) if isinstance(row, (list, tuple)) else row for row in rows]
+    if isinstance(result, list):
+        return [row for row in result if isinstance(row, dict)]
+    return []
+
+
+def format_location(geo: Optional[Dict]) -> Optional[str]:
+    """Render a geo dict as "City, State, Country" (None if nothing is known)"""
+    if not geo:
+        return None
+    parts = [geo.get(field) for field in GEO_FIELDS if geo.get(field)]
+    return ", ".join(parts) or None
+
+
+class GeoCache(JsonTTLCache):
+    """
+    Local JSON cache of PostHog geo lookups keyed by lowercase email.
+
+    Entries expire after ttl_days. Emails PostHog has no location for are
+    cached too (all fields None), so they aren't queried again until then.
+    """
+
+    stamp_field = "fetched_at"
+
+    def __init__(self, path: str = GEO_CACHE_FILE, ttl_days: int = GEO_CACHE_TTL_DAYS):
+        super().__init__(path, ttl_days)
+
+    def get(self, email: str) -> Optional[Dict]:
+        """Cached entry for an email, or None if missing or expired"""
+        return super().get(email.lower())
+
+    def put(self, email: str, geo: Optional[Dict]):
+        geo = geo or {}
+        self._store(email.lower(), {field: geo.get(field) or None for field in GEO_FIELDS})
+
+
+def prefetch_geo(client, emails: Iterable[str], cache: Optional[GeoCache] = None) -> Dict[str, Dict]:
+    """
+    GeoIP location for many emails, querying PostHog only for cache misses
+
+    Args:
+        client: DatagenClient instance
+        emails: Signup emails
+        cache: GeoCache to use (defaults to GEO_CACHE_FILE)
+
+    Returns:
+        Dict of lowercase email -> {city, state, country}; emails PostHog
+        doesn't know map to all-None fields
+    """
+    cache = cache or GeoCache()
+    emails = sorted({email.strip().lower() for email in emails if email and '@' in email})
+    missing = [email for email in emails if not cache.get(email)]
+
+    try:
+        for start in range(0, len(missing), GEO_BATCH_SIZE):
+            batch = missing[start:start + GEO_BATCH_SIZE]
+            result = client.execute_tool("mcp_Posthog_query_run", {
+                "query": {"kind": "HogQLQuery", "query": geo_batch_query(batch)}
+            })
+
+            found = {}
+            for row in _result_rows(result):
+                email = (row.get('email') or '').lower()
+                # persons can repeat an email; keep the first row that has a location
+                if email and not format_location(found.get(email)):
+                    found[email] = row
+            for email in batch:
+                cache.put(email, found.get(email))
+    finally:
+        # Keep the batches that succeeded even if a later one fails
+        if missing:
+            cache.save()
+
+    return {email: {field: cache.get(email)[field] for field in GEO_FIELDS} for email in emails}
+
+
+def geo_prompt_section(geo: Optional[Dict]) -> str:
+    """Agent prompt lines handing the prefetched location to the SOP (empty if unknown)"""
+    location = format_location(geo)
+    if not location:
+        return ""
+    return (
+        f"PostHog location (already fetched, skip SOP Step 2): {location}\n"
+        f"City: {geo.get('city') or 'unknown'} | State: {geo.get('state') or 'unknown'} | "
+        f"Country: {geo.get('country') or 'unknown'}\n"
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    from datagen_sdk import DatagenClient
+
+    # Load environment variables
+    try:
+        with open('.env') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    if (value.startswith('"') and value.endswith('"')) or \
+                       (value.startswith("'") and value.endswith("'")):
+                        value = value[1:-1]
+                    os.environ[key] = value
+    except FileNotFoundError:
+        print("Warning: .env file not found")
+
+    if not os.getenv('DATAGEN_API_KEY'):
+        print("Error: DATAGEN_API_KEY not set")
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description='Prefetch PostHog locations for contacts awaiting enrichment')
+    parser.add_argument('--limit', type=int, default=1000,
+                        help='Contacts without a LinkedIn URL to prefetch (default: 1000)')
+    args = parser.parse_args()
+
+    client = DatagenClient()
+    rows = run_sql(client, f"""
+        SELECT email FROM crm
+        WHERE linkedin_url IS NULL AND email IS NOT NULL
+        ORDER BY id DESC
+        LIMIT {int(args.limit)}
+    """)
+
+    cache = GeoCache()
+    emails = [row['email'] for row in rows]
+    to_query = sum(1 for email in {e.lower() for e in emails} if not cache.get(email))
+    geo = prefetch_geo(client, emails, cache)
+
+    located = sum(1 for g in geo.values() if format_location(g))
+    print(f"✅ {len(geo)} emails: {located} with a location, "
+          f"{to_query} queried from PostHog, {len(geo) - to_query} from cache")
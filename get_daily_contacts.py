@@ -2,6 +2,7 @@ import os
 import sys
 from datetime import datetime, timezone
 from datagen_sdk import DatagenClient
+from priority_queue import priority_queue_sql
 
 # Load environment variables
 try:
@@ -62,7 +63,7 @@ def time_ago(created_at):
 
 def get_top_contacts(limit=10, min_score=0):
     """
-    Fetch top priority contacts from CRM.
+    Fetch top contacts from today's priority queue (see priority_queue.py).
 
     Args:
         limit: Maximum number of contacts to return (default: 10)
@@ -76,25 +77,7 @@ def get_top_contacts(limit=10, min_score=0):
             "mcp_Neon_run_sql",
             {
                 "params": {
-                    "sql": f"""
-                        SELECT
-                            id,
-                            email,
-                            first_name,
-                            last_name,
-                            company,
-                            title,
-                            location,
-                            linkedin_url,
-                            priority_score,
-                            created_at,
-                            user_signup_date,
-                            priority_calculated_at
-                        FROM crm
-                        WHERE priority_score >= {min_score}
-                        ORDER BY priority_score DESC, user_signup_date DESC
-                        LIMIT {limit}
-                    """,
+                    "sql": priority_queue_sql(limit=limit, min_score=min_score),
                     "projectId": "rough-base-02149126",
                     "databaseName": "datagen"
                 }
@@ -0,0 +1,347 @@
+"""
+ICP Analytics
+
+Builds the Ideal Customer Profile metrics from every enriched CRM row plus
+the stored LinkedIn profiles (see profile_store.py), instead of counting
+only the current enrichment batch.
+
+Computes role and seniority (the stored role_family/seniority columns,
+normalizing titles via normalization.py only where those are NULL),
+industry, company size and geo distributions with vectorized pandas
+group-bys, including week-over-week share deltas, and writes them into an
+auto-generated block of icp_profile.md. The rest of icp_profile.md (the agent-written
+analysis) is left untouched.
+
+Usage:
+    python icp_analytics.py             # Update icp_profile.md
+    python icp_analytics.py --dry-run   # Print the metrics block only
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from profile_store import scan_profiles
+from normalization import normalize_title
+
+
+ICP_PROFILE_FILE = "icp_profile.md"
+BLOCK_START = "<!-- icp-metrics:start -->"
+BLOCK_END = "<!-- icp-metrics:end -->"
+
+PAGE_SIZE = 5000  # CRM rows read per query
+TOP_N = 10  # Rows shown per distribution table
+
+PERIODS = ['this_week', 'last_week', 'earlier']
+
+COMPANY_SIZE_BINS = [0, 10, 50, 200, 1000, 5000, np.inf]
+COMPANY_SIZE_LABELS = ["1-10", "11-50", "51-200", "201-1000", "1001-5000", "5000+"]
+
+GEO_ALIASES = {
+    "usa": "United States",
+    "us": "United States",
+    "united states of america": "United States",
+    "uk": "United Kingdom",
+    "england": "United Kingdom",
+}
+
+
+def load_crm_frame(client, page_size: int = PAGE_SIZE) -> pd.DataFrame:
+    """
+    Load every enriched CRM row (company or title set) using keyset pagination
+
+    Args:
+        client: DatagenClient instance
+        page_size: Rows per query
+
+    Returns:
+        DataFrame with id, title, role_family, seniority, company, industry,
+        location, signup_at
+    """
+    pages = []
+    last_id = 0
+
+    while True:
+        result = client.execute_tool(
+            "mcp_Neon_run_sql",
+            {
+                "params": {
+                    "sql": f"""
+                        SELECT id, title, role_family, seniority, company, industry, location,
+                               COALESCE(user_signup_date, created_at) AS signup_at
+                        FROM crm
+                        WHERE (company IS NOT NULL OR title IS NOT NULL)
+                          AND id > {int(last_id)}
+                        ORDER BY id
+                        LIMIT {int(page_size)}
+                    """,
+                    "projectId": "rough-base-02149126",
+                    "databaseName": "datagen"
+                }
+            }
+        )
+
+        rows = result[0] if result and result[0] else []
+        if not rows:
+            break
+
+        pages.append(pd.DataFrame.from_records(rows))
+        if len(rows) < page_size:
+            break
+        last_id = rows[-1]['id']
+
+    columns = ['id', 'title', 'role_family', 'seniority', 'company', 'industry', 'location', 'signup_at']
+    if not pages:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(pages, ignore_index=True)[columns]
+
+
+def load_profile_frame() -> pd.DataFrame:
+    """Latest stored LinkedIn profile per CRM id"""
+    table = scan_profiles(columns=[
+        'crm_id', 'fetched_at', 'headline', 'company', 'industry', 'location', 'company_size'
+    ])
+    profiles = table.to_pandas()
+    return (
+        profiles.sort_values('fetched_at')
+        .drop_duplicates('crm_id', keep='last')
+        .drop(columns='fetched_at')
+    )
+
+
+def _title_dimensions(title: pd.Series, role_family: pd.Series, seniority: pd.Series) -> pd.DataFrame:
+    """
+    Role family and seniority per row
+
+    Uses the stored columns (migrations/007); only rows where they are NULL
+    are normalized from the title, each distinct title once.
+    """
+    role = role_family.copy()
+    level = seniority.copy()
+    missing = role.isna() | level.isna()
+    if missing.any():
+        titles = title[missing].fillna("")
+        lookup = {t: normalize_title(t) for t in pd.unique(titles)}
+        role[missing] = role[missing].fillna(titles.map({t: v['role_family'] for t, v in lookup.items()}))
+        level[missing] = level[missing].fillna(titles.map({t: v['seniority'] for t, v in lookup.items()}))
+    return pd.DataFrame({'role': role.fillna("Unknown"), 'seniority': level.fillna("Unknown")})
+
+
+def build_icp_frame(
+    crm: pd.DataFrame,
+    profiles: pd.DataFrame,
+    now: Optional[pd.Timestamp] = None
+) -> pd.DataFrame:
+    """
+    Join CRM rows with stored profiles and derive the ICP dimensions
+
+    Args:
+        crm: Output of load_crm_frame
+        profiles: Output of load_profile_frame
+        now: Reference time for week buckets (default: current UTC time)
+
+    Returns:
+        DataFrame with role, seniority, industry, company_size, country and period
+    """
+    now = now if now is not None else pd.Timestamp.now(tz='UTC')
+
+    frame = crm.merge(
+        profiles.rename(columns={'crm_id': 'id'}),
+        on='id',
+        how='left',
+        suffixes=('', '_profile')
+    )
+
+    # CRM values win; stored profiles fill the gaps
+    title = frame['title'].fillna(frame['headline'])
+    industry = frame['industry'].fillna(frame['industry_profile'])
+    location = frame['location'].fillna(frame['location_profile'])
+
+    out = pd.DataFrame({'id': frame['id']})
+    out[['role', 'seniority']] = _title_dimensions(title, frame['role_family'], frame['seniority'])
+
+    industries = industry.fillna("").str.strip()
+    out['industry'] = industries.where(industries != "", "Unknown").str.title()
+
+    sizes = pd.to_numeric(frame['company_size'], errors='coerce')
+    out['company_size'] = (
+        pd.cut(sizes, bins=COMPANY_SIZE_BINS, labels=COMPANY_SIZE_LABELS)
+        .cat.add_categories("Unknown")
+        .fillna("Unknown")
+        .astype(str)
+    )
+
+    country = location.fillna("").str.rsplit(",", n=1).str[-1].str.strip()
+    country = country.str.lower().map(GEO_ALIASES).fillna(country)
+    out['country'] = country.where(country != "", "Unknown")
+
+    # ISO8601: each value parsed on its own, not coerced to the first row's format
+    signup = pd.to_datetime(frame['signup_at'], utc=True, errors='coerce', format='ISO8601')
+    out['period'] = np.select(
+        [signup >= now - pd.Timedelta(days=7), signup >= now - pd.Timedelta(days=14)],
+        ['this_week', 'last_week'],
+        default='earlier'
+    )
+    return out
+
+
+def distribution(frame: pd.DataFrame, column: str, top: int = TOP_N) -> pd.DataFrame:
+    """
+    Counts, overall share and week-over-week share delta for one dimension
+
+    Returns:
+        DataFrame indexed by value with count, share, this_week, last_week and
+        wow_delta (percentage points of this week's vs last week's signups)
+    """
+    counts = pd.crosstab(frame[column], frame['period']).reindex(columns=PERIODS, fill_value=0)
+    period_totals = counts.sum().replace(0, np.nan)
+
+    table = pd.DataFrame(index=counts.index)
+    table['count'] = counts.sum(axis=1)
+    table['share'] = table['count'] / max(len(frame), 1)
+    table['this_week'] = counts['this_week']
+    table['last_week'] = counts['last_week']
+    table['wow_delta'] = (
+        (counts['this_week'] / period_totals['this_week']).fillna(0)
+        - (counts['last_week'] / period_totals['last_week']).fillna(0)
+    ) * 100
+    return table.sort_values('count', ascending=False).head(top)
+
+
+def compute_icp_metrics(frame: pd.DataFrame) -> Dict:
+    """All ICP distributions plus headline totals"""
+    periods = frame['period'].value_counts()
+    return {
+        'contacts': len(frame),
+        'this_week': int(periods.get('this_week', 0)),
+        'last_week': int(periods.get('last_week', 0)),
+        'distributions': {
+            'Role': distribution(frame, 'role'),
+            'Seniority': distribution(frame, 'seniority'),
+            'Industry': distribution(frame, 'industry'),
+            'Company Size': distribution(frame, 'company_size'),
+            'Country': distribution(frame, 'country'),
+        }
+    }
+
+
+def render_metrics_markdown(metrics: Dict, profiles_count: int = 0) -> str:
+    """Render the auto-generated icp_profile.md block"""
+    lines = [
+        BLOCK_START,
+        "## ICP Metrics (auto-generated)",
+        "",
+        f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M')}  ",
+        f"**Enriched contacts:** {metrics['contacts']} "
+        f"({profiles_count} with stored LinkedIn profiles)  ",
+        f"**Signups this week:** {metrics['this_week']} | **Last week:** {metrics['last_week']}",
+        "",
+        "*Generated by `icp_analytics.py`; edits inside this block are overwritten.*",
+    ]
+
+    for name, table in metrics['distributions'].items():
+        lines += [
+            "",
+            f"### {name}",
+            "",
+            f"| {name} | Contacts | Share | This week | Last week | WoW Δ |",
+            "|---|---:|---:|---:|---:|---:|",
+        ]
+        for value, row in table.iterrows():
+            lines.append(
+                f"| {value} | {int(row['count'])} | {row['share']:.0%} | "
+                f"{int(row['this_week'])} | {int(row['last_week'])} | {row['wow_delta']:+.1f} pp |"
+            )
+
+    lines.append(BLOCK_END)
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_block(block: str, path: str = ICP_PROFILE_FILE):
+    """Replace the auto-generated block in icp_profile.md, or append it if missing"""
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            content = f.read()
+    else:
+        content = "# Ideal Customer Profile (ICP) Analysis\n"
+
+    start = content.find(BLOCK_START)
+    end = content.find(BLOCK_END)
+    if start != -1 and end != -1:
+        content = content[:start] + block + content[end + len(BLOCK_END):].lstrip("\n")
+    else:
+        content = content.rstrip("\n") + "\n\n---\n\n" + block
+
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def update_icp_profile(client, path: str = ICP_PROFILE_FILE, dry_run: bool = False) -> Dict:
+    """
+    Recompute ICP metrics over all enriched contacts and write icp_profile.md
+
+    Args:
+        client: DatagenClient instance
+        path: Markdown file to update
+        dry_run: Print the block instead of writing it
+
+    Returns:
+        Dict with contacts analyzed and the metrics
+    """
+    crm = load_crm_frame(client)
+    profiles = load_profile_frame()
+    frame = build_icp_frame(crm, profiles)
+    metrics = compute_icp_metrics(frame)
+    block = render_metrics_markdown(metrics, profiles_count=len(profiles))
+
+    if dry_run:
+        print(block)
+    else:
+        write_metrics_block(block, path)
+
+    return metrics
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+    from datagen_sdk import DatagenClient
+
+    # Load environment variables
+    try:
+        with open('.env') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    if (value.startswith('"') and value.endswith('"')) or \
+                       (value.startswith("'") and value.endswith("'")):
+                        value = value[1:-1]
+                    os.environ[key] = value
+    except FileNotFoundError:
+        print("Warning: .env file not found")
+
+    if not os.getenv('DATAGEN_API_KEY'):
+        print("Error: DATAGEN_API_KEY not set")
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description='Recompute ICP metrics and update icp_profile.md')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print the metrics block without writing icp_profile.md')
+    args = parser.parse_args()
+
+    from run_migration import migrate
+
+    client = DatagenClient()
+    # role_family / seniority columns (migrations/007)
+    result = migrate(client)
+    if result["error"]:
+        print(f"❌ Schema migration failed: {result['error']}")
+        sys.exit(1)
+
+    metrics = update_icp_profile(client, dry_run=args.dry_run)
+    if not args.dry_run:
+        print(f"✅ Updated {ICP_PROFILE_FILE} ({metrics['contacts']} enriched contacts analyzed)")
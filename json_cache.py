@@ -0,0 +1,91 @@
+"""
+JSON TTL Cache
+
+Small local caches of batch lookups (PostHog geo, email-domain companies)
+kept as one JSON object per file: key -> entry, where each entry carries an
+ISO timestamp field and expires ttl_days after it.
+
+save() is safe to call from concurrent threads (the webhook's background
+tasks) and other processes (a CLI prefetch next to the webhook): the
+read-merge-replace runs under a per-file thread lock plus an exclusive
+flock on a `<path>.lock` sidecar, merges with the file on disk (newest
+entry per key wins) and replaces the file atomically from a unique temp
+file.
+"""
+
+import os
+import json
+import fcntl
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _path_lock(path: str) -> threading.Lock:
+    """One lock per cache file for every cache instance in the process"""
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+class JsonTTLCache:
+    """
+    Local JSON cache whose entries expire ttl_days after their `stamp_field`
+
+    Subclasses add a put() that builds the entry and calls _store().
+    """
+
+    stamp_field = "cached_at"
+
+    def __init__(self, path: str, ttl_days: float):
+        self.path = path
+        self.ttl = timedelta(days=ttl_days)
+        self.entries = self._read()
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _fresh(self, entry: Optional[Dict]) -> bool:
+        try:
+            return datetime.now() - datetime.fromisoformat(entry[self.stamp_field]) <= self.ttl
+        except (TypeError, KeyError, ValueError):
+            return False
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached entry for a key, or None if missing or expired"""
+        entry = self.entries.get(key)
+        return entry if self._fresh(entry) else None
+
+    def _store(self, key: str, entry: Dict):
+        self.entries[key] = {**entry, self.stamp_field: datetime.now().isoformat()}
+
+    def save(self):
+        """Merge with the file on disk (newest entry per key wins), drop expired entries and write"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with _path_lock(self.path), open(f"{self.path}.lock", 'a') as lock_file:
+            # Other processes: held until the replace, so no writer merges a stale file
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            merged = self._read()
+            for key, entry in self.entries.items():
+                current = merged.get(key)
+                if not self._fresh(current) or current[self.stamp_field] <= entry.get(self.stamp_field, ""):
+                    merged[key] = entry
+            self.entries = {key: entry for key, entry in merged.items() if self._fresh(entry)}
+
+            with tempfile.NamedTemporaryFile('w', dir=directory, prefix=f".{os.path.basename(self.path)}.",
+                                             suffix=".tmp", delete=False) as f:
+                json.dump(self.entries, f)
+            try:
+                os.replace(f.name, self.path)
+            except OSError:
+                os.remove(f.name)
+                raise
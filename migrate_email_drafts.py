@@ -1,13 +1,28 @@
 #!/usr/bin/env python3
 """
 Migration script to:
-1. Add email_draft JSONB column to CRM table
+1. Apply pending schema migrations (creates the email_drafts table)
 2. Migrate existing .md email drafts to the database
+
+Draft files are matched to CRM records through DraftMatchIndex, built once
+from all records: exact `first_last` name, exact email local-part, then a
+prefix match on the local-part. A file matching more than one record at
+the first level that matches is reported as ambiguous and skipped. All
+matched drafts are written as new email_drafts versions with batched
+INSERTs (unchanged drafts are skipped, so re-running is safe).
+
+Usage:
+    python migrate_email_drafts.py            # Migrate schema and drafts, verify
+    python migrate_email_drafts.py --dry-run  # Report matches without writing
 """
 
 import os
-import json
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 from datagen_sdk import DatagenClient
+from crm_sql import run_sql
+from email_drafts import DRAFTS_DIR, build_draft_insert, parse_email_draft
+from run_migration import migrate
 
 # Load environment variables
 try:
@@ -25,200 +40,220 @@ except FileNotFoundError:
 
 client = DatagenClient()
 
-def add_email_draft_column():
-    """Add email_draft JSONB column to CRM table"""
-    print("Adding email_draft column to CRM table...")
-
-    result = client.execute_tool(
-        "mcp_Neon_run_sql",
-        {
-            "params": {
-                "sql": """
-                    ALTER TABLE crm
-                    ADD COLUMN IF NOT EXISTS email_draft JSONB;
-                """,
-                "projectId": "rough-base-02149126",
-                "databaseName": "datagen"
-            }
-        }
-    )
-    print("✓ Column added successfully")
-    return result
-
-def parse_email_draft(filepath):
-    """Parse .md file to extract subject and body"""
-    with open(filepath, 'r') as f:
-        content = f.read()
-
-    subject = ""
-    body = ""
-
-    # Extract subject
-    if "**Subject:**" in content:
-        subject_start = content.find("**Subject:**") + len("**Subject:**")
-        subject_end = content.find("\n", subject_start)
-        subject = content[subject_start:subject_end].strip()
-
-    # Extract body
-    if "**Body:**" in content:
-        body_start = content.find("**Body:**") + len("**Body:**")
-        # Find the end of the email draft section
-        body_end = content.find("\n---", body_start)
-        if body_end == -1:
-            body_end = content.find("\n##", body_start)
-        if body_end == -1:
-            body_end = len(content)
-
-        body = content[body_start:body_end].strip()
-
-    return subject, body
-
-def migrate_md_drafts():
-    """Migrate existing .md drafts to database"""
+def ensure_drafts_table():
+    """Apply pending migrations so the email_drafts table exists"""
+    print("Applying schema migrations...")
+    result = migrate(client)
+    if result["error"]:
+        raise SystemExit(f"✗ Schema migration failed: {result['error']}")
+    print("✓ Schema up to date")
+
+MIN_PREFIX_LENGTH = 3  # Shortest filename token allowed to prefix-match an email local-part
+INSERT_BATCH_SIZE = 500  # Drafts written per INSERT statement
+
+
+class PrefixTrie:
+    """Character trie mapping every prefix of the inserted keys to record ids"""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key: str, record_id):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+            node.setdefault(None, set()).add(record_id)
+
+    def ids_with_prefix(self, prefix: str) -> set:
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node.get(None, set())
+
+
+class DraftMatchIndex:
+    """
+    Lookup structure for matching draft filenames to CRM records
+
+    Built once per migration, so each file is matched with a few hash
+    lookups instead of a scan over every record.
+    """
+
+    def __init__(self, records: List[Dict]):
+        self.records = {}
+        self.by_name = defaultdict(set)
+        self.by_local_part = defaultdict(set)
+        self.local_part_prefixes = PrefixTrie()
+
+        for record in records:
+            record_id = record['id']
+            self.records[record_id] = record
+
+            first_name = (record.get('first_name') or '').strip().lower()
+            last_name = (record.get('last_name') or '').strip().lower()
+            if first_name and last_name:
+                self.by_name[f"{first_name}_{last_name}"].add(record_id)
+
+            local_part = (record.get('email') or '').split('@')[0].strip().lower()
+            if local_part:
+                self.by_local_part[local_part].add(record_id)
+                self.local_part_prefixes.insert(local_part, record_id)
+
+    def match(self, filename: str) -> Tuple[Optional[Dict], Optional[str], List[Dict]]:
+        """
+        Match a draft filename (without .md) to a CRM record
+
+        Returns:
+            (record, method, candidates): method is 'name', 'email' or
+            'prefix'. If the first level that matches finds several
+            records, record is None and candidates lists them (ambiguous).
+            Nothing matched gives (None, None, []).
+        """
+        key = filename.strip().lower()
+        first_token = key.split('_')[0]
+
+        levels = [
+            ('name', self.by_name.get(key, set())),
+            ('email', self.by_local_part.get(key, set())),
+            ('prefix', self.local_part_prefixes.ids_with_prefix(first_token)
+                if len(first_token) >= MIN_PREFIX_LENGTH else set()),
+        ]
+        for method, ids in levels:
+            if len(ids) == 1:
+                return self.records[next(iter(ids))], method, []
+            if ids:
+                return None, method, [self.records[i] for i in sorted(ids)]
+        return None, None, []
+
+
+def migrate_md_drafts(dry_run=False):
+    """
+    Migrate existing .md drafts to database
+
+    Args:
+        dry_run: Report matches and ambiguities without writing
+
+    Returns:
+        Dict with migrated, ambiguous and unmatched file lists
+    """
     print("\nMigrating .md files to database...")
+    summary = {"migrated": [], "ambiguous": [], "unmatched": []}
 
-    drafts_dir = "outreach_emails"
+    drafts_dir = DRAFTS_DIR
     if not os.path.exists(drafts_dir):
         print(f"No {drafts_dir} directory found, skipping migration")
-        return
+        return summary
 
     # Get all .md files
-    md_files = [f for f in os.listdir(drafts_dir) if f.endswith('.md')]
+    md_files = sorted(f for f in os.listdir(drafts_dir) if f.endswith('.md'))
 
     if not md_files:
         print("No .md files found to migrate")
-        return
+        return summary
 
     print(f"Found {len(md_files)} draft files to migrate")
 
-    # Get all CRM records
-    crm_records = client.execute_tool(
-        "mcp_Neon_run_sql",
-        {
-            "params": {
-                "sql": "SELECT id, first_name, last_name, email FROM crm",
-                "projectId": "rough-base-02149126",
-                "databaseName": "datagen"
-            }
-        }
-    )
-
-    if not crm_records or not crm_records[0]:
+    # Index all CRM records once
+    records = run_sql(client, "SELECT id, first_name, last_name, email FROM crm")
+    if not records:
         print("No CRM records found")
-        return
+        return summary
 
-    records = crm_records[0]
-    migrated_count = 0
+    index = DraftMatchIndex(records)
 
+    drafts = {}
     for md_file in md_files:
-        filename = md_file.replace('.md', '')
-        filepath = os.path.join(drafts_dir, md_file)
-
-        print(f"\nProcessing: {md_file}")
+        filename = md_file[:-len('.md')]
+        record, method, candidates = index.match(filename)
+
+        if candidates:
+            emails = ", ".join(c.get('email') or str(c['id']) for c in candidates[:5])
+            more = f" (+{len(candidates) - 5} more)" if len(candidates) > 5 else ""
+            print(f"⚠ Ambiguous {method} match for {md_file}: {emails}{more}")
+            summary["ambiguous"].append(md_file)
+            continue
+        if not record:
+            print(f"⚠ No matching CRM record found for {md_file}")
+            summary["unmatched"].append(md_file)
+            continue
+
+        try:
+            subject, body = parse_email_draft(os.path.join(drafts_dir, md_file))
+        except Exception as e:
+            print(f"✗ Error reading {md_file}: {e}")
+            continue
+        if not (subject or body):
+            continue
+
+        if record['id'] in drafts:
+            print(f"⚠ {md_file} matches {record.get('email')} again; keeping {drafts[record['id']]['file']}")
+            continue
+
+        print(f"  ✓ {md_file} -> {record.get('email')} ({method} match)")
+        drafts[record['id']] = {
+            "contact_id": record['id'],
+            "file": md_file,
+            "subject": subject,
+            "body": body,
+            "source": "migration"
+        }
 
-        # Find matching CRM record
-        matching_record = None
-        for record in records:
-            first_name = (record.get('first_name') or '').strip().lower()
-            last_name = (record.get('last_name') or '').strip().lower()
-            email = record.get('email', '')
-            email_username = email.split('@')[0] if email else ''
-
-            # Try to match by:
-            # 1. Full name format (firstname_lastname)
-            # 2. Email username
-            # 3. Partial match - filename contains part of email username or vice versa
-            name_match = (first_name and last_name and filename.lower() == f"{first_name}_{last_name}")
-            email_match = (email_username and filename.lower() == email_username.lower())
-            # Check if first part of filename matches first part of email
-            filename_first = filename.split('_')[0].lower()
-            partial_match = (email_username and filename_first in email_username.lower())
-
-            if name_match or email_match or partial_match:
-                print(f"  ✓ Matched with: {email} (name_match={name_match}, email_match={email_match}, partial_match={partial_match})")
-                matching_record = record
-                break
-
-        if matching_record:
+    rows = list(drafts.values())
+    if not dry_run:
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            batch = rows[start:start + INSERT_BATCH_SIZE]
             try:
-                # Parse the draft
-                subject, body = parse_email_draft(filepath)
-
-                if subject or body:
-                    # Create draft JSON
-                    draft_data = {
-                        "subject": subject,
-                        "body": body,
-                        "source": "migration",
-                        "created_at": "2025-11-29T23:31:00Z"
-                    }
-
-                    # Escape single quotes in JSON string for SQL
-                    json_str = json.dumps(draft_data).replace("'", "''")
-
-                    # Update CRM record
-                    result = client.execute_tool(
-                        "mcp_Neon_run_sql",
-                        {
-                            "params": {
-                                "sql": f"""
-                                    UPDATE crm
-                                    SET email_draft = '{json_str}'::jsonb
-                                    WHERE id = {matching_record['id']}
-                                """,
-                                "projectId": "rough-base-02149126",
-                                "databaseName": "datagen"
-                            }
-                        }
-                    )
-
-                    print(f"✓ Migrated draft for {matching_record.get('first_name', '')} {matching_record.get('last_name', '')} (ID: {matching_record['id']})")
-                    migrated_count += 1
-
+                run_sql(client, build_draft_insert(batch))
             except Exception as e:
-                print(f"✗ Error migrating {md_file}: {e}")
-        else:
-            print(f"⚠ No matching CRM record found for {md_file}")
+                print(f"✗ Error writing drafts {start + 1}-{start + len(batch)}: {e}")
+                continue
+            summary["migrated"].extend(row["file"] for row in batch)
+    else:
+        summary["migrated"] = [row["file"] for row in rows]
 
-    print(f"\n✓ Migration complete: {migrated_count}/{len(md_files)} drafts migrated")
+    action = "would be migrated" if dry_run else "migrated"
+    print(f"\n✓ Migration complete: {len(summary['migrated'])}/{len(md_files)} drafts {action}"
+          f" ({len(summary['ambiguous'])} ambiguous, {len(summary['unmatched'])} unmatched)")
+    return summary
 
 def verify_migration():
     """Verify the migration"""
     print("\nVerifying migration...")
 
-    result = client.execute_tool(
-        "mcp_Neon_run_sql",
-        {
-            "params": {
-                "sql": """
-                    SELECT
-                        id,
-                        email,
-                        first_name,
-                        last_name,
-                        email_draft->>'subject' as draft_subject
-                    FROM crm
-                    WHERE email_draft IS NOT NULL
-                """,
-                "projectId": "rough-base-02149126",
-                "databaseName": "datagen"
-            }
-        }
-    )
-
-    if result and result[0]:
-        print(f"\n✓ Found {len(result[0])} records with email drafts:")
-        for record in result[0]:
+    rows = run_sql(client, """
+        SELECT DISTINCT ON (d.contact_id)
+            c.email, c.first_name, c.last_name, d.version, d.subject AS draft_subject
+        FROM email_drafts d
+        JOIN crm c ON c.id = d.contact_id
+        ORDER BY d.contact_id, d.version DESC
+    """)
+
+    if rows:
+        print(f"\n✓ Found {len(rows)} contacts with email drafts:")
+        for record in rows:
             print(f"  - {record.get('first_name', '')} {record.get('last_name', '')} ({record.get('email', '')})")
-            print(f"    Subject: {record.get('draft_subject', 'N/A')}")
+            print(f"    Subject: {record.get('draft_subject', 'N/A')} (v{record.get('version')})")
     else:
         print("No records with email drafts found")
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Migrate outreach_emails/*.md drafts into the CRM')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Report matches and ambiguities without writing')
+    args = parser.parse_args()
+
     print("Starting email draft migration...\n")
 
-    # Step 1: Add column
-    add_email_draft_column()
+    if args.dry_run:
+        migrate_md_drafts(dry_run=True)
+        raise SystemExit(0)
+
+    # Step 1: Schema (email_drafts table)
+    ensure_drafts_table()
 
     # Step 2: Migrate drafts
     migrate_md_drafts()
@@ -0,0 +1,15 @@
+-- Email tracking columns
+-- Written by email_tracking.py (EmailTrackingService) and read by the
+-- dashboard and the daily priority queue.
+
+BEGIN;
+
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS email_status TEXT DEFAULT 'not_contacted';
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS last_email_sent_at TIMESTAMPTZ;
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS last_email_received_at TIMESTAMPTZ;
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS email_tracking_last_synced_at TIMESTAMPTZ;
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS emails_sent_count INTEGER DEFAULT 0;
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS emails_received_count INTEGER DEFAULT 0;
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS needs_followup BOOLEAN DEFAULT FALSE;
+
+COMMIT;
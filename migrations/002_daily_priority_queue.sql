@@ -0,0 +1,37 @@
+-- Daily priority queue
+-- Precomputes the contact ranking once a day (refreshed by daily_crm_routine.py
+-- via `python priority_queue.py --refresh`) so the dashboard and
+-- get_daily_contacts.py read the top N with an index scan on queue_rank.
+--
+-- Ranking: not contacted (by score) -> needs follow-up (longest waiting
+-- first) -> contacted/replied (by score), newest signups break ties.
+-- Only the rank lives here; readers join crm for live tracking columns.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS daily_priority_queue AS
+SELECT
+    ROW_NUMBER() OVER (
+        ORDER BY
+            CASE
+                WHEN email_status = 'not_contacted' THEN 1
+                WHEN email_status = 'needs_followup' THEN 2
+                WHEN email_status IN ('contacted', 'replied') THEN 3
+                ELSE 4
+            END,
+            CASE WHEN email_status = 'needs_followup' THEN NULL ELSE priority_score END DESC NULLS LAST,
+            CASE WHEN email_status = 'needs_followup' THEN last_email_sent_at END ASC NULLS FIRST,
+            user_signup_date DESC,
+            id
+    ) AS queue_rank,
+    id,
+    priority_score,
+    NOW() AS refreshed_at
+FROM crm
+WHERE priority_score IS NOT NULL;
+
+-- Unique index on id is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_priority_queue_id
+    ON daily_priority_queue (id);
+
+-- Top-N reads: ORDER BY queue_rank LIMIT n
+CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_priority_queue_rank
+    ON daily_priority_queue (queue_rank);
@@ -0,0 +1,36 @@
+-- Indexes for the hot CRM access paths
+-- Each index is named after the query it serves; `python run_migration.py --check`
+-- EXPLAINs those queries and reports whether the planner picks them up.
+
+-- Tracking column from get_icp.md, so the unfetched-profiles index can be built
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS linkedin_profile_fetched_at TIMESTAMP;
+
+-- Email sync: WHERE priority_score > 0 ORDER BY priority_score DESC LIMIT n
+CREATE INDEX IF NOT EXISTS idx_crm_priority_score
+    ON crm (priority_score DESC, id)
+    WHERE priority_score > 0;
+
+-- Dashboard metrics and follow-up lists: WHERE email_status = '...'
+CREATE INDEX IF NOT EXISTS idx_crm_email_status
+    ON crm (email_status, priority_score DESC);
+
+-- enrich_crm*.py: WHERE company IS NULL OR title IS NULL
+CREATE INDEX IF NOT EXISTS idx_crm_needs_enrichment
+    ON crm (id)
+    WHERE company IS NULL OR title IS NULL;
+
+-- full_enrichment.py: WHERE linkedin_url IS NULL
+CREATE INDEX IF NOT EXISTS idx_crm_missing_linkedin
+    ON crm (id)
+    WHERE linkedin_url IS NULL;
+
+-- fetch_linkedin_profiles.py keyset pages: ... AND linkedin_profile_fetched_at IS NULL ORDER BY id DESC
+CREATE INDEX IF NOT EXISTS idx_crm_linkedin_unfetched
+    ON crm (id DESC)
+    WHERE linkedin_url IS NOT NULL
+      AND linkedin_url != ''
+      AND linkedin_profile_fetched_at IS NULL;
+
+-- Contact lookups by address (sync_email_tracking.py --email, draft matching)
+CREATE INDEX IF NOT EXISTS idx_crm_email
+    ON crm (email);
@@ -0,0 +1,32 @@
+-- Versioned email drafts
+-- Each save adds a row (version = previous + 1) instead of overwriting
+-- crm.email_draft. The (contact_id, version) unique index doubles as the
+-- contact_id index: latest-draft lookups for many contacts are one
+-- DISTINCT ON (contact_id) ... ORDER BY contact_id, version DESC index scan.
+
+-- Legacy column read by the backfill below (added by migrate_email_drafts.py before)
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS email_draft JSONB;
+
+CREATE TABLE IF NOT EXISTS email_drafts (
+    id BIGSERIAL PRIMARY KEY,
+    contact_id INTEGER NOT NULL REFERENCES crm(id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    subject TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL DEFAULT '',
+    source TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE (contact_id, version)
+);
+
+-- Existing drafts become version 1
+INSERT INTO email_drafts (contact_id, version, subject, body, source, created_at)
+SELECT
+    id,
+    1,
+    COALESCE(email_draft->>'subject', ''),
+    COALESCE(email_draft->>'body', ''),
+    COALESCE(email_draft->>'source', 'crm'),
+    COALESCE((email_draft->>'updated_at')::timestamptz, (email_draft->>'created_at')::timestamptz, NOW())
+FROM crm
+WHERE email_draft IS NOT NULL
+ON CONFLICT (contact_id, version) DO NOTHING;
@@ -0,0 +1,7 @@
+-- Enrichment match confidence
+-- candidate_scoring.py scores every LinkedIn match 0-1 and classifies it into
+-- enrich_source (direct_search_validated / web_search_validated / not_found);
+-- both are written together by full_enrichment.py.
+
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS enrich_source VARCHAR(50);
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS enrich_confidence NUMERIC(4, 3);
@@ -0,0 +1,26 @@
+-- Company entities
+-- One row per company, keyed by the lowercased normalized name
+-- (normalization.normalize_company), so company-level fields are stored once
+-- however many signups work there. crm.company_id references it and
+-- crm.industry / crm.company_size are backfilled from it with one
+-- UPDATE ... FROM (company_entities.py).
+
+CREATE TABLE IF NOT EXISTS companies (
+    id BIGSERIAL PRIMARY KEY,
+    company_key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    domain TEXT,
+    industry TEXT,
+    company_size INTEGER,
+    linkedin_url TEXT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_companies_domain ON companies (domain) WHERE domain IS NOT NULL;
+
+-- Normalized company column (normalization.py) the backfill groups by
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS company_normalized TEXT;
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS company_size INTEGER;
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS company_id BIGINT REFERENCES companies (id);
+
+CREATE INDEX IF NOT EXISTS idx_crm_company_id ON crm (company_id);
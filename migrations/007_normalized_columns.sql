@@ -0,0 +1,8 @@
+-- Normalized title columns as a migration
+-- normalization.py used to add these on --backfill only; the enrichment
+-- engine now selects every column it writes (enrichment_engine.RECORD_COLUMNS)
+-- to diff against, so they must exist before any enrichment run.
+
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS title_normalized TEXT;
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS role_family TEXT;
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS seniority TEXT;
@@ -0,0 +1,15 @@
+-- Enrichment freshness
+-- Every enrichment path (enrichment_engine.py) stamps the rows it processes:
+--   enriched_at        last time a run checked the row (found, missed or unchanged)
+--   enrich_updated_at  last time a run changed one of its enriched columns
+-- and records enrich_source for every path: direct_search (unvalidated
+-- Datagen match), direct_search_validated / web_search_validated (scored,
+-- see 005) or not_found. `--refresh-older-than N` re-enriches rows whose
+-- enriched_at is older than N days (or unknown), highest priority first.
+
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS enriched_at TIMESTAMPTZ;
+ALTER TABLE crm ADD COLUMN IF NOT EXISTS enrich_updated_at TIMESTAMPTZ;
+
+-- Refresh mode: ORDER BY priority_score DESC NULLS LAST, enriched_at NULLS FIRST
+CREATE INDEX IF NOT EXISTS idx_crm_enrich_refresh
+    ON crm (priority_score DESC NULLS LAST, enriched_at NULLS FIRST);
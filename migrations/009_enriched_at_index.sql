@@ -0,0 +1,6 @@
+-- Default enrichment selection (enrichment_engine.pending_records_sql):
+-- WHERE enriched_at < NOW() - recheck window ORDER BY enriched_at NULLS FIRST, id
+-- enrich_source also takes 'known_url': a LinkedIn URL stored before
+-- provenance was recorded, re-fetched by a refresh run.
+
+CREATE INDEX IF NOT EXISTS idx_crm_enriched_at ON crm (enriched_at NULLS FIRST, id);
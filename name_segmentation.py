@@ -0,0 +1,369 @@
+"""
+Email Username Name Segmentation
+
+Turns signup email usernames into ranked first/last name candidates
+without a web search or an LLM turn (Enrichment SOP step 3):
+
+    ibraedusu@gmail.com  -> Ibrahim Edusu, Ibra Edusu, Edusu Ibrahim, ...
+    jsmith@acme.com      -> J Smith
+    maria.garcia@x.com   -> Maria Garcia, Garcia Maria
+
+The first/last name tables below are ordered by popularity; a name's
+log-frequency is derived from its rank (Zipf), so the tables stay plain
+lists. Usernames without separators are split with a dynamic program over
+character positions that keeps the best BEAM_WIDTH splits of every prefix:
+known names are cheap, unknown letters cost UNKNOWN_CHAR_COST each, and
+every extra piece costs SPLIT_COST. Abbreviated first names ("ibra",
+"alex") are expanded through NICKNAMES and unique-enough name prefixes;
+infer_name_from_email keeps the name as written. Role accounts (info@,
+sales@, support@, ...) get no candidates.
+
+The tables are compiled once into hash indexes (NameSegmenter), and results
+are memoized per username, so repeated lookups cost microseconds.
+
+Usage:
+    python name_segmentation.py ibraedusu@gmail.com jsmith
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+# Common first names, most frequent first
+FIRST_NAMES = """
+james john robert michael david william richard joseph thomas charles christopher daniel
+matthew anthony mark donald steven paul andrew joshua kenneth kevin brian george timothy
+ronald jason edward jeffrey ryan jacob gary nicholas eric jonathan stephen larry justin
+scott brandon benjamin samuel gregory alexander patrick frank raymond jack dennis jerry
+tyler aaron jose adam nathan henry zachary douglas peter kyle noah ethan jeremy walter
+christian keith roger terry austin sean gerald carl harold dylan arthur lawrence jordan
+jesse bryan billy bruce gabriel joe logan alan juan albert willie elijah wayne randy
+vincent mason roy ralph bobby russell bradley philip eugene mary patricia jennifer linda
+elizabeth barbara susan jessica sarah karen lisa nancy betty sandra margaret ashley
+kimberly emily donna michelle carol amanda melissa deborah stephanie dorothy rebecca
+sharon laura cynthia amy kathleen angela shirley brenda emma anna pamela nicole samantha
+katherine christine helen debra rachel carolyn janet maria catherine heather diane olivia
+julie joyce victoria ruth virginia lauren kelly christina joan evelyn judith andrea hannah
+jane megan cheryl jacqueline martha madison teresa gloria sara janice ann kathryn abigail
+sophia frances jean alice judy isabella julia grace amber denise danielle marilyn beverly
+charlotte natalie theresa diana brittany doris kayla alexis lori marie mohammed muhammad
+mohamed ahmed ali omar hassan ibrahim yusuf mustafa khalid abdullah fatima aisha mariam
+priya rahul amit ankit rohit vikram arjun sanjay raj ravi deepak suresh anil vijay neha
+pooja anjali divya kavya sneha aditya akash nikhil varun karan wei jing li ming hui yan
+xin lei jun hao chen yu hiroshi takashi kenji yuki haruto sakura min jae seo ji hyun
+carlos luis miguel jorge pedro diego alejandro javier fernando ricardo eduardo rafael
+manuel antonio francisco sergio andres pablo mateo santiago lucas gabriela valentina
+camila sofia lucia paula carmen ana isabel elena laura marco giuseppe giovanni luca
+francesco alessandro matteo lorenzo andrea stefan jan lukas felix maximilian tobias
+jonas leon paul hans klaus pierre jean louis antoine nicolas julien thomas hugo
+olga ivan dmitri sergei alexei vladimir natalia anastasia ekaterina irina tatiana
+oluwaseun chinedu emeka tunde kwame kofi ama ade segun bola nnamdi chioma ngozi
+""".split()
+
+# Common last names, most frequent first
+LAST_NAMES = """
+smith johnson williams brown jones garcia miller davis rodriguez martinez hernandez lopez
+gonzalez wilson anderson thomas taylor moore jackson martin lee perez thompson white harris
+sanchez clark ramirez lewis robinson walker young allen king wright scott torres nguyen
+hill flores green adams nelson baker hall rivera campbell mitchell carter roberts gomez
+phillips evans turner diaz parker cruz edwards collins reyes stewart morris morales murphy
+cook rogers gutierrez ortiz morgan cooper peterson bailey reed kelly howard ramos kim cox
+ward richardson watson brooks chavez wood james bennett gray mendoza ruiz hughes price
+alvarez castillo sanders patel myers long ross foster jimenez powell jenkins perry russell
+sullivan bell coleman butler henderson barnes gonzales fisher vasquez simmons romero jordan
+patterson alexander hamilton graham reynolds griffin wallace moreno west cole hayes bryant
+herrera gibson ellis tran medina aguilar stevens murray ford castro marshall owens harrison
+fernandez mcdonald woods washington kennedy wells vargas henry chen freeman webb tucker
+guzman burns crawford olson simpson porter hunter gordon mendez silva shaw snyder mason
+dixon munoz hunt hicks holmes palmer wagner black robertson boyd rose stone salazar fox
+warren mills meyer rice schmidt garza daniels ferguson nichols stephens soto weaver ryan
+gardner payne grant dunn kelley spencer hawkins arnold pierce vazquez hansen peters santos
+hart bradley knight elliott cunningham duncan armstrong hudson carroll lane riley andrews
+wang li zhang liu yang huang zhao wu zhou xu sun ma zhu hu guo lin he gao luo zheng
+singh kumar sharma gupta shah mehta reddy rao iyer nair joshi verma agarwal das khan
+ahmed ali hussain rahman malik qureshi siddiqui sato suzuki takahashi tanaka watanabe
+ito yamamoto nakamura kobayashi park choi jung kang cho yoon jang lim han
+muller schneider fischer weber schulz becker hoffmann schafer koch richter klein wolf
+rossi russo ferrari esposito bianchi romano colombo ricci marino greco bruno gallo
+dubois durand leroy moreau simon laurent lefebvre michel bernard petit
+ivanov smirnov kuznetsov popov sokolov lebedev novak kowalski nowak wisniewski
+okafor okonkwo adeyemi mensah owusu boateng oyelaran eze nwosu
+""".split()
+
+# Nicknames / short forms -> full first names (most likely first)
+NICKNAMES = {
+    "alex": ["alexander", "alexandra"], "al": ["albert", "alan"], "andy": ["andrew"],
+    "ben": ["benjamin"], "bill": ["william"], "bob": ["robert"], "brad": ["bradley"],
+    "chris": ["christopher", "christina"], "dan": ["daniel"], "danny": ["daniel"],
+    "dave": ["david"], "ed": ["edward", "eduardo"], "edu": ["eduardo"], "fred": ["frederick"],
+    "greg": ["gregory"], "ibra": ["ibrahim"], "jake": ["jacob"], "jim": ["james"],
+    "jimmy": ["james"], "joe": ["joseph"], "jon": ["jonathan"], "josh": ["joshua"],
+    "kate": ["katherine"], "katie": ["katherine"], "ken": ["kenneth"], "larry": ["lawrence"],
+    "liz": ["elizabeth"], "matt": ["matthew"], "max": ["maximilian"], "mike": ["michael"],
+    "nate": ["nathan"], "nick": ["nicholas"], "pat": ["patrick", "patricia"],
+    "rob": ["robert"], "ron": ["ronald"], "sam": ["samuel", "samantha"], "steve": ["steven"],
+    "sue": ["susan"], "ted": ["edward"], "tim": ["timothy"], "tom": ["thomas"],
+    "tony": ["anthony"], "vic": ["victoria", "vincent"], "will": ["william"],
+    "zach": ["zachary"], "mo": ["mohammed"], "mohd": ["mohammed"], "abdul": ["abdullah"],
+    "fer": ["fernando"], "pepe": ["jose"], "nacho": ["ignacio"], "paco": ["francisco"],
+    "sasha": ["alexander"], "dima": ["dmitri"], "misha": ["michael"],
+}
+
+# Shared mailboxes, not people: no name candidates
+ROLE_ACCOUNTS = {
+    "info", "sales", "support", "admin", "administrator", "contact", "hello", "hi", "team",
+    "office", "billing", "accounts", "accounting", "finance", "help", "helpdesk", "noreply",
+    "donotreply", "hr", "jobs", "careers", "recruiting", "marketing", "press", "media", "legal",
+    "security", "webmaster", "postmaster", "hostmaster", "abuse", "root", "dev", "devops",
+    "engineering", "it", "ops", "test", "demo", "enquiries", "inquiries", "orders", "service",
+    "customerservice", "feedback", "newsletter", "partners", "founders", "ceo", "mail", "email",
+}
+
+ZIPF_OFFSET = 10  # Flattens the head of the rank distribution
+UNKNOWN_CHAR_COST = 2.5  # Per letter not covered by a known name
+INITIAL_COST = 4.0  # Single-letter piece ("j" in "jsmith")
+SPLIT_COST = 0.5  # Per extra piece, so plain names aren't over-split
+EXPANSION_COST = 1.0  # Nickname expansion (ibra -> ibrahim)
+PREFIX_COST = 2.0  # Truncated name (eduar -> eduardo)
+SWAP_COST = 1.0  # Last name written first
+SURNAME_FROM_FIRST_COST = 1.5  # First name used as a last name ("Eduardo Ibrahim")
+MIDDLE_COST = 1.5  # Per middle piece, which the first/last reading drops
+MIN_PREFIX_LENGTH = 3
+MAX_PIECE_LENGTH = 15
+MAX_PIECES = 3
+BEAM_WIDTH = 6
+
+SEPARATORS = re.compile(r"[._\-]+")
+
+
+def _rank_log_freqs(names: List[str]) -> Dict[str, float]:
+    """Zipf log-frequency by popularity rank (first occurrence wins)"""
+    weights = {}
+    for rank, name in enumerate(names):
+        weights.setdefault(name, 1.0 / (rank + ZIPF_OFFSET))
+    total = sum(weights.values())
+    return {name: math.log(weight / total) for name, weight in weights.items()}
+
+
+class NameSegmenter:
+    """
+    Precomputed name indexes and the username split
+
+    first/last hold each name's log-frequency; expansions maps nicknames
+    and unambiguous-enough prefixes of first names to (full name, cost).
+    """
+
+    def __init__(self):
+        self.first = _rank_log_freqs(FIRST_NAMES)
+        self.last = _rank_log_freqs(LAST_NAMES)
+        self.unknown_first = min(self.first.values()) - 2.0
+        self.unknown_last = min(self.last.values()) - 2.0
+
+        self.expansions: Dict[str, List[Tuple[str, float]]] = {}
+        for short, names in NICKNAMES.items():
+            for i, name in enumerate(names):
+                self.expansions.setdefault(short, []).append((name, EXPANSION_COST + i))
+        for name in self.first:
+            for end in range(MIN_PREFIX_LENGTH, len(name)):
+                prefix = name[:end]
+                if prefix not in self.first:
+                    self.expansions.setdefault(prefix, []).append((name, PREFIX_COST))
+        for prefix, options in self.expansions.items():
+            options.sort(key=lambda option: option[1] - self.first.get(option[0], self.unknown_first))
+            del options[3:]
+
+    def _first_score(self, piece: str) -> Tuple[float, str]:
+        """Best log-score of a piece used as a first name, and the name it stands for"""
+        best = (self.first.get(piece, -math.inf), piece)
+        for name, cost in self.expansions.get(piece, []):
+            score = self.first[name] - cost
+            if score > best[0]:
+                best = (score, name)
+        return best
+
+    @staticmethod
+    def _unknown_score(piece: str) -> float:
+        return -INITIAL_COST if len(piece) == 1 else -UNKNOWN_CHAR_COST * len(piece)
+
+    def piece_score(self, piece: str) -> float:
+        """Cost-model score of one piece of a split, whatever its role"""
+        if len(piece) == 1:
+            return -INITIAL_COST
+        known = max(self._first_score(piece)[0], self.last.get(piece, -math.inf))
+        return max(known, self._unknown_score(piece))
+
+    def split(self, text: str) -> List[Tuple[float, Tuple[str, ...]]]:
+        """
+        Best splits of a letters-only string into up to MAX_PIECES pieces
+
+        best[i] keeps the top BEAM_WIDTH (score, pieces) for text[:i]; each
+        is extended by every piece text[i:j] up to MAX_PIECE_LENGTH.
+
+        Returns:
+            (score, pieces) tuples, best first
+        """
+        n = len(text)
+        best: List[List[Tuple[float, Tuple[str, ...]]]] = [[] for _ in range(n + 1)]
+        best[0] = [(0.0, ())]
+        for i in range(n):
+            if not best[i]:
+                continue
+            for j in range(i + 1, min(n, i + MAX_PIECE_LENGTH) + 1):
+                piece = text[i:j]
+                score = self.piece_score(piece)
+                for prev_score, pieces in best[i]:
+                    if len(pieces) >= MAX_PIECES:
+                        continue
+                    penalty = SPLIT_COST if pieces else 0.0
+                    best[j].append((prev_score + score - penalty, pieces + (piece,)))
+            for j in range(i + 1, min(n, i + MAX_PIECE_LENGTH) + 1):
+                if len(best[j]) > BEAM_WIDTH * 4:
+                    best[j] = sorted(best[j], reverse=True)[:BEAM_WIDTH]
+        # A whole string longer than MAX_PIECE_LENGTH has no split; keep it as one piece
+        return sorted(best[n], reverse=True)[:BEAM_WIDTH] or [(-UNKNOWN_CHAR_COST * n, (text,))]
+
+    def _role_candidates(self, pieces: Tuple[str, ...]) -> List[Dict]:
+        """
+        First/last name readings of one split, both orders, with expansions
+
+        A reading scores its first piece as a first name, its last piece as
+        a last name and any middle piece by piece_score, so a known name
+        only helps in the role it is known for.
+        """
+        if len(pieces) == 1:
+            return self._first_readings(pieces[0], None, 0.0, pieces)
+
+        middle = sum(self.piece_score(p) - MIDDLE_COST for p in pieces[1:-1]) - SPLIT_COST * (len(pieces) - 1)
+        candidates = []
+        for first, last, order_cost in [(pieces[0], pieces[-1], 0.0), (pieces[-1], pieces[0], SWAP_COST)]:
+            if len(last) == 1 < len(first):
+                continue  # An initial is only a first name ("j smith", not "smith j")
+            last_score = max(self.last.get(last, -math.inf),
+                             self.first.get(last, -math.inf) - SURNAME_FROM_FIRST_COST,
+                             self._unknown_score(last))
+            candidates.extend(self._first_readings(first, last, middle + last_score - order_cost, pieces))
+        return candidates
+
+    def _first_readings(self, first: str, last: Optional[str], base: float, pieces: Tuple[str, ...]) -> List[Dict]:
+        """The piece as written, plus its expansion if it abbreviates a first name"""
+        readings = [self._candidate(first, last, base + max(self.first.get(first, -math.inf),
+                                                            self._unknown_score(first)), pieces)]
+        expanded_score, expanded = self._first_score(first)
+        if expanded != first:
+            readings.append(self._candidate(expanded, last, base + expanded_score, pieces))
+        return readings
+
+    @staticmethod
+    def _candidate(first: str, last: Optional[str], score: float, pieces: Tuple[str, ...]) -> Dict:
+        return {
+            "first_name": first.capitalize(),
+            "last_name": last.capitalize() if last else None,
+            "score": score,
+            "split": "|".join(pieces),
+        }
+
+    def candidates(self, username: str, limit: int = 8) -> List[Dict]:
+        """
+        Ranked name candidates for an email username
+
+        Args:
+            username: Local part of the email (anything after "+" and digits are ignored)
+            limit: Maximum candidates to return
+
+        Returns:
+            List of dicts with first_name, last_name, split and confidence
+            (softmax of the candidate scores), best first
+        """
+        username = username.split('+', 1)[0].lower()
+        if re.sub(r"[^a-z]", "", username) in ROLE_ACCOUNTS:
+            return []
+        parts = [re.sub(r"[^a-z]", "", part) for part in SEPARATORS.split(username)]
+        parts = [part for part in parts if part]
+        if not parts:
+            return []
+
+        if len(parts) > 1:
+            # Separators already mark the pieces ("maria.garcia", "j_smith")
+            pieces = tuple(parts[:MAX_PIECES - 1] + parts[-1:]) if len(parts) > MAX_PIECES else tuple(parts)
+            splits = [pieces]
+        else:
+            splits = [pieces for _, pieces in self.split(parts[0])]
+
+        by_name = {}
+        for pieces in splits:
+            for candidate in self._role_candidates(pieces):
+                key = (candidate["first_name"], candidate["last_name"])
+                if key not in by_name or candidate["score"] > by_name[key]["score"]:
+                    by_name[key] = candidate
+
+        ranked = sorted(by_name.values(), key=lambda c: c["score"], reverse=True)[:limit]
+        if not ranked:
+            return []
+        top = ranked[0]["score"]
+        total = sum(math.exp(c["score"] - top) for c in ranked)
+        return [
+            {**{k: v for k, v in c.items() if k != "score"},
+             "confidence": round(math.exp(c["score"] - top) / total, 3)}
+            for c in ranked
+        ]
+
+
+SEGMENTER = NameSegmenter()
+
+
+@lru_cache(maxsize=100_000)
+def _candidates_cached(username: str, limit: int):
+    return tuple(tuple(c.items()) for c in SEGMENTER.candidates(username, limit))
+
+
+def name_candidates(email: Optional[str], limit: int = 8) -> List[Dict]:
+    """Memoized NameSegmenter.candidates for an email address (or bare username)"""
+    if not email:
+        return []
+    return [dict(c) for c in _candidates_cached(email.split('@')[0], limit)]
+
+
+def infer_name_from_email(email: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Most likely (first_name, last_name) for an email username, as written
+
+    Used by the enrichment scripts when the CRM row has no name, and sent
+    as firstName to search_linkedin_person, so nicknames and prefixes are
+    not expanded ("tom@" -> Tom, not Thomas); the expansions only appear in
+    name_candidates. Role accounts (info@, sales@) give (None, None).
+    """
+    if not email or '@' not in email:
+        return None, None
+    candidates = name_candidates(email)
+    if not candidates:
+        return None, None
+    top = candidates[0]
+    as_written = [c for c in candidates if c["first_name"].lower() in c["split"].split("|")]
+    # Same split and last name as the best reading, first name unexpanded ("ibra|edusu" -> Ibra Edusu)
+    same_reading = [c for c in as_written if (c["split"], c["last_name"]) == (top["split"], top["last_name"])]
+    best = (same_reading or as_written or candidates)[0]
+    return best["first_name"], best["last_name"]
+
+
+def name_prompt_section(email: Optional[str], limit: int = 5) -> str:
+    """Agent prompt lines with the ranked name candidates for SOP step 3"""
+    candidates = name_candidates(email, limit)
+    if not candidates:
+        return ""
+    names = ", ".join(
+        f"{c['first_name']}{' ' + c['last_name'] if c['last_name'] else ''} ({c['confidence']:.2f})"
+        for c in candidates
+    )
+    return f"Name candidates from the email username (SOP Step 3, most likely first): {names}\n"
+
+
+if __name__ == "__main__":
+    import sys
+
+    for arg in sys.argv[1:]:
+        print(f"{arg}:")
+        for candidate in name_candidates(arg):
+            last = candidate['last_name'] or ''
+            print(f"  {candidate['confidence']:.3f}  {candidate['first_name']} {last}  [{candidate['split']}]")
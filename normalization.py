@@ -0,0 +1,426 @@
+"""
+Title and Company Normalization
+
+Maps raw LinkedIn headlines ("Founder @ X | ex-Y", "Sr. Software Eng.")
+and company names ("Acme, Inc.") to canonical values so ICP and dashboard
+groupings aggregate properly.
+
+The lookup tables below are compiled once into hash indexes
+(NormalizationIndex), so each row costs a handful of dict lookups over its
+tokens, and repeated strings are memoized.
+
+Canonical values are stored in CRM columns:
+- title_normalized: cleaned canonical title ("Senior Software Engineer")
+- role_family: function family ("Engineering", "Founder", "Sales / GTM", ...)
+- seniority: level ("Founder", "C-Level", "VP", ..., "IC")
+- company_normalized: canonical company name ("Acme")
+
+The columns come from migrations (006, 007), which every enrichment script
+and the dashboard apply on start; --backfill only fills existing rows.
+
+Usage:
+    python normalization.py --backfill            # Backfill all CRM rows
+    python normalization.py --backfill --dry-run  # Show what would change
+    python normalization.py "Founder @ X | ex-Y"  # Normalize one headline
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from crm_sql import run_sql, sql_literal, build_values_update
+from run_migration import migrate
+
+
+NORMALIZED_COLUMNS = ['title_normalized', 'role_family', 'seniority', 'company_normalized']
+
+# Exact titles (after cleanup) -> canonical title
+TITLE_ALIASES = {
+    "ceo": "Chief Executive Officer",
+    "cto": "Chief Technology Officer",
+    "coo": "Chief Operating Officer",
+    "cfo": "Chief Financial Officer",
+    "cmo": "Chief Marketing Officer",
+    "cro": "Chief Revenue Officer",
+    "cpo": "Chief Product Officer",
+    "founder": "Founder",
+    "cofounder": "Co-Founder",
+    "co-founder": "Co-Founder",
+    "co founder": "Co-Founder",
+    "founder and ceo": "Founder & CEO",
+    "founder ceo": "Founder & CEO",
+    "ceo and founder": "Founder & CEO",
+    "ceo and co-founder": "Co-Founder & CEO",
+    "co-founder and ceo": "Co-Founder & CEO",
+    "swe": "Software Engineer",
+    "sde": "Software Engineer",
+    "software developer": "Software Engineer",
+    "ae": "Account Executive",
+    "pm": "Product Manager",
+    "sdr": "Sales Development Representative",
+    "bdr": "Business Development Representative",
+}
+
+# Token/phrase abbreviations expanded when building the canonical title
+TOKEN_EXPANSIONS = {
+    "sr": "senior",
+    "jr": "junior",
+    "mgr": "manager",
+    "eng": "engineer",
+    "engr": "engineer",
+    "dir": "director",
+    "dev": "developer",
+    "mktg": "marketing",
+    "ops": "operations",
+    "assoc": "associate",
+    "exec": "executive",
+    "vice-president": "vice president",
+}
+
+# Words kept upper-case in canonical titles
+ACRONYMS = {
+    "ceo", "cto", "coo", "cfo", "cmo", "cro", "cpo", "vp", "svp", "evp", "ai", "ml",
+    "gtm", "seo", "sdr", "bdr", "hr", "it", "ui", "ux", "qa", "b2b", "saas", "phd", "mba",
+}
+
+# Connector words kept lower-case in canonical titles
+SMALL_WORDS = {"of", "and", "for", "the", "in", "at", "to", "on"}
+
+# Keyword -> (role family, priority); lower priority wins
+ROLE_KEYWORDS = {
+    "founder": ("Founder", 0), "cofounder": ("Founder", 0), "co-founder": ("Founder", 0),
+    "owner": ("Founder", 0), "founding": ("Founder", 0),
+    "ceo": ("Executive", 1), "coo": ("Executive", 1), "cfo": ("Executive", 1),
+    "president": ("Executive", 1), "chief executive": ("Executive", 1),
+    "cto": ("Engineering", 2), "engineer": ("Engineering", 2), "engineering": ("Engineering", 2),
+    "developer": ("Engineering", 2), "software": ("Engineering", 2), "architect": ("Engineering", 2),
+    "programmer": ("Engineering", 2), "devops": ("Engineering", 2), "swe": ("Engineering", 2),
+    "sde": ("Engineering", 2),
+    "data": ("Data / AI", 3), "ai": ("Data / AI", 3), "ml": ("Data / AI", 3),
+    "machine learning": ("Data / AI", 3), "scientist": ("Data / AI", 3), "analytics": ("Data / AI", 3),
+    "analyst": ("Data / AI", 3),
+    "cro": ("Sales / GTM", 4), "sales": ("Sales / GTM", 4), "gtm": ("Sales / GTM", 4),
+    "business development": ("Sales / GTM", 4), "sdr": ("Sales / GTM", 4), "bdr": ("Sales / GTM", 4),
+    "account executive": ("Sales / GTM", 4), "revenue": ("Sales / GTM", 4), "growth": ("Sales / GTM", 4),
+    "partnerships": ("Sales / GTM", 4), "revops": ("Sales / GTM", 4), "ae": ("Sales / GTM", 4),
+    "cmo": ("Marketing", 5), "marketing": ("Marketing", 5), "brand": ("Marketing", 5),
+    "content": ("Marketing", 5), "seo": ("Marketing", 5), "demand generation": ("Marketing", 5),
+    "cpo": ("Product", 6), "product": ("Product", 6), "pm": ("Product", 6),
+    "designer": ("Design", 7), "design": ("Design", 7), "ux": ("Design", 7), "ui": ("Design", 7),
+    "operations": ("Operations", 8), "recruiter": ("Operations", 8), "hr": ("Operations", 8),
+    "finance": ("Operations", 8), "consultant": ("Consulting", 9), "advisor": ("Consulting", 9),
+    "fractional": ("Consulting", 9), "freelance": ("Consulting", 9), "freelancer": ("Consulting", 9),
+    "student": ("Student / Academic", 10), "professor": ("Student / Academic", 10),
+    "researcher": ("Student / Academic", 10), "phd": ("Student / Academic", 10),
+    "lecturer": ("Student / Academic", 10),
+}
+
+# Keyword -> (seniority, rank); lower rank wins
+SENIORITY_KEYWORDS = {
+    "founder": ("Founder", 0), "cofounder": ("Founder", 0), "co-founder": ("Founder", 0),
+    "owner": ("Founder", 0), "founding": ("Founder", 0),
+    "ceo": ("C-Level", 1), "cto": ("C-Level", 1), "coo": ("C-Level", 1), "cfo": ("C-Level", 1),
+    "cmo": ("C-Level", 1), "cro": ("C-Level", 1), "cpo": ("C-Level", 1), "chief": ("C-Level", 1),
+    "president": ("C-Level", 1), "partner": ("C-Level", 1),
+    "vp": ("VP", 2), "svp": ("VP", 2), "evp": ("VP", 2), "vice president": ("VP", 2),
+    "director": ("Director / Head", 3), "head": ("Director / Head", 3),
+    "manager": ("Manager / Lead", 4), "lead": ("Manager / Lead", 4),
+    "senior": ("Senior IC", 5), "staff": ("Senior IC", 5), "principal": ("Senior IC", 5),
+    "student": ("Student / Intern", 6), "intern": ("Student / Intern", 6),
+}
+
+# Legal suffixes stripped from company names
+COMPANY_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "company",
+    "plc", "gmbh", "ag", "sa", "sas", "bv", "pty", "srl", "oy", "ab", "as", "lp", "llp",
+}
+
+# Normalized company key -> canonical name
+COMPANY_ALIASES = {
+    "google": "Google", "alphabet": "Google",
+    "meta": "Meta", "facebook": "Meta", "meta platforms": "Meta",
+    "amazon": "Amazon", "amazon web services": "Amazon", "aws": "Amazon",
+    "microsoft": "Microsoft", "msft": "Microsoft",
+    "ibm": "IBM", "salesforce": "Salesforce", "hubspot": "HubSpot",
+    "linkedin": "LinkedIn", "openai": "OpenAI", "anthropic": "Anthropic",
+}
+
+# Headline segments are split on these separators; the first one that
+# classifies wins, so "Helping teams grow | Founder @ X" still maps to Founder
+SEGMENT_SPLIT = re.compile(r"\s*(?:\||•|·|/{2}|\s[-–—]\s|,|;)\s*")
+COMPANY_IN_HEADLINE = re.compile(r"\s(?:@|at)\s+(.+)$|@(\S.*)$", re.IGNORECASE)
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+\-]*")
+FORMER = ("ex-", "ex ", "former", "previously", "prev ")
+
+
+class NormalizationIndex:
+    """
+    Precomputed hash indexes over the lookup tables
+
+    Keywords are split into single-token and two-token indexes, so a title is
+    classified by probing each of its tokens and adjacent token pairs once.
+    """
+
+    def __init__(self):
+        self.title_aliases = {self._clean(k): v for k, v in TITLE_ALIASES.items()}
+        self.role_index = self._split_index(ROLE_KEYWORDS)
+        self.seniority_index = self._split_index(SENIORITY_KEYWORDS)
+        self.company_aliases = {self._company_key(k): v for k, v in COMPANY_ALIASES.items()}
+
+    @staticmethod
+    def _split_index(keywords: Dict) -> Dict[int, Dict]:
+        """Index keywords by their token count (1 or 2)"""
+        index = {1: {}, 2: {}}
+        for phrase, value in keywords.items():
+            index[len(phrase.split())][phrase] = value
+        return index
+
+    @staticmethod
+    def _clean(text: str) -> str:
+        """Lowercase, expand abbreviations, drop punctuation and extra spaces"""
+        tokens = TOKEN.findall(text.lower().replace("&", " and "))
+        return " ".join(TOKEN_EXPANSIONS.get(t, t) for t in tokens)
+
+    @staticmethod
+    def _company_key(name: str) -> str:
+        """Normalized key for company matching (no case, punctuation or legal suffix)"""
+        tokens = re.findall(r"[a-z0-9]+", name.lower().replace("&", " and "))
+        if tokens and tokens[0] == "the":
+            tokens = tokens[1:]
+        while tokens and tokens[-1] in COMPANY_SUFFIXES:
+            tokens = tokens[:-1]
+        return " ".join(tokens)
+
+    def _lookup(self, tokens: List[str], index: Dict[int, Dict]):
+        """Best (lowest priority) keyword hit among tokens and token pairs"""
+        best = None
+        for i, token in enumerate(tokens):
+            hits = [index[1].get(token)]
+            if i + 1 < len(tokens):
+                hits.append(index[2].get(f"{token} {tokens[i + 1]}"))
+            for hit in hits:
+                if hit and (best is None or hit[1] < best[1]):
+                    best = hit
+        return best[0] if best else None
+
+    def _display_title(self, cleaned: str) -> str:
+        """Canonical display form of a cleaned title"""
+        if cleaned in self.title_aliases:
+            return self.title_aliases[cleaned]
+        words = cleaned.replace(" and ", " & ").split()
+        return " ".join(
+            w.upper() if w in ACRONYMS else w if (i and w in SMALL_WORDS) else w.capitalize()
+            for i, w in enumerate(words)
+        )
+
+    def normalize_title(self, raw: Optional[str]) -> Dict[str, Optional[str]]:
+        """
+        Map a raw headline to canonical title, role family and seniority
+
+        Args:
+            raw: Headline or job title as written to crm.title
+
+        Returns:
+            Dict with title_normalized, role_family and seniority
+            (all None for an empty title)
+        """
+        if not raw or not raw.strip():
+            return {"title_normalized": None, "role_family": None, "seniority": None}
+
+        # Drop the "@ Company" part, then split into segments and skip
+        # former roles ("ex-Amazon")
+        segments = []
+        for segment in SEGMENT_SPLIT.split(raw):
+            segment = COMPANY_IN_HEADLINE.sub("", segment).strip()
+            if segment and not segment.lower().startswith(FORMER):
+                segments.append(segment)
+
+        title = role = seniority = None
+        for segment in segments:
+            cleaned = self._clean(segment)
+            tokens = cleaned.split()
+            segment_role = self._lookup(tokens, self.role_index)
+            if segment_role:
+                title = self._display_title(cleaned)
+                role = segment_role
+                seniority = self._lookup(tokens, self.seniority_index)
+                break
+
+        if title is None:
+            cleaned = self._clean(segments[0] if segments else raw)
+            title = self._display_title(cleaned) or None
+            seniority = self._lookup(cleaned.split(), self.seniority_index)
+
+        return {
+            "title_normalized": title,
+            "role_family": role or "Other",
+            "seniority": seniority or "IC",
+        }
+
+    def normalize_company(self, raw: Optional[str]) -> Optional[str]:
+        """
+        Map a raw company name to its canonical form
+
+        "Acme, Inc." and "acme inc" both become "Acme"; known aliases
+        ("AWS" -> "Amazon") resolve to the alias target.
+        """
+        if not raw or not raw.strip():
+            return None
+
+        key = self._company_key(raw)
+        if not key:
+            return None
+        if key in self.company_aliases:
+            return self.company_aliases[key]
+
+        # Original words minus the legal suffix; plain words are capitalized so
+        # "acme" and "Acme" agree, mixed-case brands ("SwiftDial.ai") are kept
+        words = re.findall(r"[^\s,]+", raw.strip())
+        while words and words[-1].lower().strip(".") in COMPANY_SUFFIXES:
+            words = words[:-1]
+        words = [w if any(c.isupper() for c in w[1:]) else w[:1].upper() + w[1:] for w in words]
+        return " ".join(words).strip(" ,.") or None
+
+
+INDEX = NormalizationIndex()
+
+
+@lru_cache(maxsize=100_000)
+def _normalize_title_cached(raw: str):
+    return tuple(INDEX.normalize_title(raw).items())
+
+
+def normalize_title(raw: Optional[str]) -> Dict[str, Optional[str]]:
+    """Memoized NormalizationIndex.normalize_title on the shared index"""
+    return dict(_normalize_title_cached(raw or ""))
+
+
+@lru_cache(maxsize=100_000)
+def normalize_company(raw: Optional[str]) -> Optional[str]:
+    """Memoized NormalizationIndex.normalize_company on the shared index"""
+    return INDEX.normalize_company(raw)
+
+
+def company_from_headline(headline: Optional[str]) -> Optional[str]:
+    """Extract the company from "Role @ Company" / "Role at Company" headlines"""
+    if not headline:
+        return None
+    for segment in SEGMENT_SPLIT.split(headline):
+        if segment.lower().startswith(FORMER):
+            continue
+        match = COMPANY_IN_HEADLINE.search(segment)
+        if match:
+            return normalize_company(match.group(1) or match.group(2))
+    return None
+
+
+def ensure_columns(client):
+    """
+    Apply pending migrations, which create the normalized columns
+    (company_normalized in 006, the title columns in 007)
+    """
+    result = migrate(client)
+    if result["error"]:
+        raise RuntimeError(f"Schema migration failed: {result['error']}")
+
+
+def backfill(client, batch_size: int = 500, dry_run: bool = False) -> Dict:
+    """
+    Recompute normalized columns for every CRM row with a title or company
+
+    Rows are read with keyset pagination and only rows whose normalized
+    values changed are written, one UPDATE ... FROM (VALUES ...) per page.
+
+    Returns:
+        Dict with scanned and updated counts
+    """
+    if not dry_run:
+        ensure_columns(client)
+        has_columns = True
+    else:
+        existing = run_sql(client, f"""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'crm'
+              AND column_name IN ({', '.join(sql_literal(c) for c in NORMALIZED_COLUMNS)})
+        """)
+        has_columns = len(existing) == len(NORMALIZED_COLUMNS)
+
+    # Before the columns exist every row counts as changed
+    normalized_select = ", ".join(NORMALIZED_COLUMNS) if has_columns else \
+        ", ".join(f"NULL AS {c}" for c in NORMALIZED_COLUMNS)
+
+    stats = {"scanned": 0, "updated": 0}
+    last_id = 0
+
+    while True:
+        rows = run_sql(client, f"""
+            SELECT id, title, company, {normalized_select}
+            FROM crm
+            WHERE (title IS NOT NULL OR company IS NOT NULL)
+              AND id > {int(last_id)}
+            ORDER BY id
+            LIMIT {int(batch_size)}
+        """)
+        if not rows:
+            break
+
+        changed = []
+        for row in rows:
+            values = normalize_title(row.get('title'))
+            values['company_normalized'] = normalize_company(row.get('company'))
+            if any(values[c] != row.get(c) for c in NORMALIZED_COLUMNS):
+                changed.append({"id": row['id'], **values})
+
+        stats["scanned"] += len(rows)
+        stats["updated"] += len(changed)
+
+        if changed and not dry_run:
+            run_sql(client, build_values_update("crm", "id", NORMALIZED_COLUMNS, changed))
+
+        if len(rows) < batch_size:
+            break
+        last_id = rows[-1]['id']
+
+    return stats
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Normalize CRM titles and companies')
+    parser.add_argument('headline', nargs='*', help='Headline(s) to normalize and print')
+    parser.add_argument('--backfill', action='store_true',
+                        help='Add normalized columns and backfill all CRM rows')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='With --backfill, count changes without writing')
+    args = parser.parse_args()
+
+    for headline in args.headline:
+        print(f"{headline!r} -> {normalize_title(headline)} | company: {company_from_headline(headline)}")
+
+    if args.backfill:
+        from datagen_sdk import DatagenClient
+
+        # Load environment variables
+        try:
+            with open('.env') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#') and '=' in line:
+                        key, value = line.split('=', 1)
+                        if (value.startswith('"') and value.endswith('"')) or \
+                           (value.startswith("'") and value.endswith("'")):
+                            value = value[1:-1]
+                        os.environ[key] = value
+        except FileNotFoundError:
+            print("Warning: .env file not found")
+
+        if not os.getenv('DATAGEN_API_KEY'):
+            print("Error: DATAGEN_API_KEY not set")
+            sys.exit(1)
+
+        stats = backfill(DatagenClient(), dry_run=args.dry_run)
+        prefix = "[DRY RUN] Would update" if args.dry_run else "✅ Updated"
+        print(f"{prefix} {stats['updated']} of {stats['scanned']} CRM rows")
@@ -0,0 +1,81 @@
+"""
+Pending Batches
+
+Items (fetched CRM ids, generated drafts) that are written to the CRM in
+batches, journaled to a local file until the write succeeds.
+
+Every item is appended to the pending file before it is buffered, and the
+file is only truncated after a successful write. If the process dies
+mid-batch, the next run loads the leftover items (`pending`) and writes
+them instead of redoing the work. A line cut short by the crash is skipped.
+"""
+
+import os
+import json
+from typing import Any, Iterable, List
+
+
+class PendingBatch:
+    """
+    Buffered, journaled batch writer
+
+    Subclasses implement write(items) -> bool. Items are stored one JSON
+    value per line.
+    """
+
+    def __init__(self, pending_file: str, flush_every: int):
+        self.pending_file = pending_file
+        self.flush_every = flush_every
+        self.pending: List[Any] = self._load_pending()
+        self.written = 0
+        self._log = open(self.pending_file, 'a')
+
+    def write(self, items: List[Any]) -> bool:
+        """Store one batch; False keeps the items pending"""
+        raise NotImplementedError
+
+    def _load_pending(self) -> List[Any]:
+        """Read items left over from a previous run that crashed before flushing"""
+        items = []
+        try:
+            with open(self.pending_file) as f:
+                for line in f:
+                    try:
+                        items.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return items
+
+    def add(self, item: Any):
+        """Buffer an item, flushing once flush_every items are pending"""
+        self._log.write(json.dumps(item, default=str) + "\n")
+        self._log.flush()
+        self.pending.append(item)
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def add_many(self, items: Iterable[Any]):
+        for item in items:
+            self.add(item)
+
+    def flush(self) -> bool:
+        """Write all pending items as one batch; keep them pending on failure"""
+        if not self.pending:
+            return True
+        if not self.write(self.pending):
+            return False
+        self.written += len(self.pending)
+        self.pending = []
+        self._log.seek(0)
+        self._log.truncate()
+        return True
+
+    def close(self) -> bool:
+        """Final flush; the pending file is removed only when nothing is left"""
+        flushed = self.flush()
+        self._log.close()
+        if flushed:
+            os.remove(self.pending_file)
+        return flushed
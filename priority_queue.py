@@ -0,0 +1,128 @@
+"""
+Daily Priority Queue
+
+Reads and refreshes the `daily_priority_queue` materialized view defined in
+migrations/002_daily_priority_queue.sql. The view stores the day's contact
+ranking (queue_rank) so the dashboard and get_daily_contacts.py share one
+ordering and read the top N with an index scan instead of re-ranking the
+whole CRM on every request.
+
+Only the rank is materialized; readers join crm so email tracking columns
+are always current.
+
+Usage:
+    python priority_queue.py --refresh   # Create the view if missing, then refresh it
+    python priority_queue.py             # Print the top 10 of the current queue
+"""
+
+import os
+from typing import Dict, List, Sequence
+
+from crm_sql import run_sql, run_sql_transaction
+from run_migration import split_statements
+
+
+VIEW_NAME = "daily_priority_queue"
+MIGRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "migrations", "002_daily_priority_queue.sql")
+
+QUEUE_COLUMNS = [
+    'id', 'email', 'first_name', 'last_name', 'company', 'title', 'location',
+    'linkedin_url', 'priority_score', 'created_at', 'user_signup_date',
+    'priority_calculated_at', 'email_status', 'last_email_sent_at',
+    'last_email_received_at', 'emails_sent_count', 'emails_received_count',
+    'needs_followup', 'email_tracking_last_synced_at'
+]
+
+
+def priority_queue_sql(limit: int = 10, min_score: int = 0, columns: Sequence[str] = QUEUE_COLUMNS) -> str:
+    """
+    SQL for the top of today's queue
+
+    Args:
+        limit: Number of contacts to return
+        min_score: Minimum priority score as of the last refresh
+        columns: crm columns to select (queue_rank is always included)
+
+    Returns:
+        SQL text ordered by queue_rank
+    """
+    select = ", ".join(f"c.{column}" for column in columns)
+    return f"""
+        SELECT {select}, q.queue_rank
+        FROM {VIEW_NAME} q
+        JOIN crm c ON c.id = q.id
+        WHERE q.priority_score >= {int(min_score)}
+        ORDER BY q.queue_rank
+        LIMIT {int(limit)}
+    """
+
+
+def get_priority_queue(client, limit: int = 10, min_score: int = 0) -> List[Dict]:
+    """Top `limit` contacts of today's queue with live CRM columns"""
+    return run_sql(client, priority_queue_sql(limit, min_score))
+
+
+def refresh_priority_queue(client) -> Dict:
+    """
+    Recompute the queue ranking
+
+    Creates the view from the migration on first run; afterwards refreshes it
+    concurrently so readers keep seeing yesterday's queue until it finishes.
+
+    Returns:
+        Dict with created flag and the number of ranked contacts
+    """
+    exists = run_sql(client, f"SELECT to_regclass('{VIEW_NAME}') IS NOT NULL AS exists")
+    created = not (exists and exists[0].get('exists'))
+
+    if created:
+        with open(MIGRATION_FILE, 'r') as f:
+            run_sql_transaction(client, split_statements(f.read()))
+    else:
+        run_sql(client, f"REFRESH MATERIALIZED VIEW CONCURRENTLY {VIEW_NAME}")
+
+    count = run_sql(client, f"SELECT COUNT(*) AS count FROM {VIEW_NAME}")
+    return {'created': created, 'contacts': int(count[0]['count']) if count else 0}
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+    from datagen_sdk import DatagenClient
+
+    # Load environment variables
+    try:
+        with open('.env') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    if (value.startswith('"') and value.endswith('"')) or \
+                       (value.startswith("'") and value.endswith("'")):
+                        value = value[1:-1]
+                    os.environ[key] = value
+    except FileNotFoundError:
+        print("Warning: .env file not found")
+
+    if not os.getenv('DATAGEN_API_KEY'):
+        print("Error: DATAGEN_API_KEY not set")
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description='Refresh or inspect the daily priority queue')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Create the view if needed and recompute the ranking')
+    parser.add_argument('--limit', type=int, default=10,
+                        help='Contacts to print (default: 10)')
+    args = parser.parse_args()
+
+    client = DatagenClient()
+
+    if args.refresh:
+        result = refresh_priority_queue(client)
+        action = "Created" if result['created'] else "Refreshed"
+        print(f"✅ {action} {VIEW_NAME}: {result['contacts']} contacts ranked")
+    else:
+        for row in get_priority_queue(client, limit=args.limit):
+            print(f"{row['queue_rank']:>4}. [{row.get('priority_score')}] "
+                  f"{row.get('email')} ({row.get('email_status')})")
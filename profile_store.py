@@ -0,0 +1,343 @@
+"""
+LinkedIn Profile Store
+
+Append-only local store for fetched LinkedIn profiles, so ICP analysis can
+look at history without re-fetching.
+
+Layout (Parquet, hive-partitioned by fetch date):
+    profile_store/fetch_date=2025-11-28/part-20251128T153000-1a2b3c4d-00001.parquet
+
+Each row keeps the fields we analyze as columns (headline, company,
+industry, location, company_size, positions) plus the raw `person`
+payload as a zstd-compressed JSON column. Files are never rewritten.
+
+A run keeps one open part file per partition, appends a row group per
+flush and starts a new file after ROWS_PER_FILE rows, so scans open a few
+large files instead of one per flush. Part files are written under a
+dot-prefixed temp name (ignored by readers) and renamed once closed, so
+readers only ever see complete files.
+"""
+
+import os
+import sys
+import json
+import uuid
+from datetime import datetime, date
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    print("Installing pyarrow for the profile store...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "pyarrow"])
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+
+STORE_DIR = "profile_store"
+ROWS_PER_FILE = 100_000  # Rows per part file before the writer starts a new one
+
+POSITION_TYPE = pa.struct([
+    ("title", pa.string()),
+    ("company", pa.string()),
+    ("start", pa.string()),
+    ("end", pa.string()),
+])
+
+SCHEMA = pa.schema([
+    ("crm_id", pa.int64()),
+    ("email", pa.string()),
+    ("linkedin_url", pa.string()),
+    ("fetched_at", pa.timestamp("us")),
+    ("headline", pa.string()),
+    ("company", pa.string()),
+    ("industry", pa.string()),
+    ("location", pa.string()),
+    ("company_size", pa.int64()),
+    ("positions", pa.list_(POSITION_TYPE)),
+    ("raw", pa.string()),
+])
+
+
+def _date_str(value) -> Optional[str]:
+    """Render a LinkedIn start/end date (dict, string or None) as text"""
+    if not value:
+        return None
+    if isinstance(value, dict):
+        parts = [str(value[k]) for k in ("year", "month", "day") if value.get(k)]
+        return "-".join(parts) or None
+    return str(value)
+
+
+def _int_or_none(value) -> Optional[int]:
+    """Coerce a headcount value to int, or None if it isn't numeric"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_profile_fields(person: Dict) -> Dict:
+    """
+    Pull the analyzed fields out of a `get_linkedin_person_data` person payload
+
+    Args:
+        person: The `person` object returned by get_linkedin_person_data
+
+    Returns:
+        Dict with headline, company, industry, location, company_size and positions
+    """
+    person = person or {}
+    history = (person.get('positions') or {}).get('positionHistory') or []
+
+    positions = []
+    for position in history:
+        if not isinstance(position, dict):
+            continue
+        positions.append({
+            "title": position.get('title'),
+            "company": position.get('companyName'),
+            "start": _date_str((position.get('startEndDate') or {}).get('start')),
+            "end": _date_str((position.get('startEndDate') or {}).get('end')),
+        })
+
+    company_info = person.get('company')
+    industry = person.get('industry')
+    company_size = None
+    if isinstance(company_info, dict):
+        company = company_info.get('name')
+        industry = industry or company_info.get('industry')
+        company_size = _int_or_none(
+            company_info.get('staffCount') or company_info.get('employeeCount')
+        )
+    else:
+        company = company_info
+
+    # Fallback to current position, same as the enrichment scripts
+    if not company and positions:
+        company = positions[0]['company']
+
+    return {
+        "headline": person.get('headline') or person.get('jobTitle'),
+        "company": company,
+        "industry": industry,
+        "location": person.get('location'),
+        "company_size": company_size,
+        "positions": positions,
+    }
+
+
+class ProfileStoreWriter:
+    """
+    Buffered, append-only writer for one run
+
+    Every `row_group_size` profiles are appended as a row group to the
+    partition's open part file, so memory stays flat for large batches; a
+    file is closed and renamed into place after `rows_per_file` rows and on
+    close(). `on_written` is called with the crm_ids of each part file once
+    it is closed and on disk; only then is it safe to mark them fetched (a
+    crash loses the open file, whose ids were never reported). Use as a
+    context manager or call close() to write the remaining rows.
+    """
+
+    def __init__(self, store_dir: str = STORE_DIR, row_group_size: int = 1000,
+                 rows_per_file: int = ROWS_PER_FILE,
+                 on_written: Optional[Callable[[List[int]], None]] = None):
+        self.store_dir = store_dir
+        self.row_group_size = row_group_size
+        self.rows_per_file = rows_per_file
+        self.on_written = on_written
+        self.run_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.rows_written = 0
+        self._parts = 0
+        self._buffers: Dict[str, List[Dict]] = {}
+        self._files: Dict[str, Dict] = {}  # Partition -> open part file
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, result: Dict):
+        """
+        Add one successfully fetched profile
+
+        Args:
+            result: A fetch_linkedin_profiles result dict (crm_id, email,
+                linkedin_url, profile, fetched_at)
+        """
+        person = result.get('profile')
+        if not person:
+            return
+
+        fetched_at = result.get('fetched_at') or datetime.now()
+        if isinstance(fetched_at, str):
+            fetched_at = datetime.fromisoformat(fetched_at)
+        if fetched_at.tzinfo is not None:
+            fetched_at = fetched_at.replace(tzinfo=None)
+
+        row = {
+            "crm_id": result.get('crm_id'),
+            "email": result.get('email'),
+            "linkedin_url": result.get('linkedin_url'),
+            "fetched_at": fetched_at,
+            "raw": json.dumps(person, default=str),
+        }
+        row.update(extract_profile_fields(person))
+
+        partition = fetched_at.date().isoformat()
+        buffer = self._buffers.setdefault(partition, [])
+        buffer.append(row)
+        if len(buffer) >= self.row_group_size:
+            self._flush(partition)
+
+    def _open_file(self, partition: str) -> Dict:
+        """Start a new part file for a partition under its temp name"""
+        part_dir = os.path.join(self.store_dir, f"fetch_date={partition}")
+        os.makedirs(part_dir, exist_ok=True)
+        self._parts += 1
+        name = f"part-{self.run_id}-{self._parts:05d}.parquet"
+        tmp_path = os.path.join(part_dir, f".{name}.tmp")  # Dot prefix: ignored by readers
+        handle = open(tmp_path, 'wb')
+        return {
+            "path": os.path.join(part_dir, name),
+            "tmp_path": tmp_path,
+            "handle": handle,
+            "writer": pq.ParquetWriter(handle, SCHEMA, compression="zstd"),
+            "crm_ids": [],
+            "rows": 0,
+        }
+
+    def _flush(self, partition: str):
+        """Append the buffered rows of one partition as a row group of its open part file"""
+        rows = self._buffers.get(partition)
+        if not rows:
+            return
+
+        if partition not in self._files:
+            self._files[partition] = self._open_file(partition)
+        part = self._files[partition]
+        part["writer"].write_table(pa.Table.from_pylist(rows, schema=SCHEMA))
+        part["crm_ids"].extend(row['crm_id'] for row in rows if row['crm_id'] is not None)
+        part["rows"] += len(rows)
+        self._buffers[partition] = []
+        if part["rows"] >= self.rows_per_file:
+            self._close_file(partition)
+
+    def _close_file(self, partition: str):
+        """Write the footer, sync and rename a partition's part file into place"""
+        part = self._files.pop(partition, None)
+        if not part:
+            return
+        part["writer"].close()
+        part["handle"].flush()
+        os.fsync(part["handle"].fileno())
+        part["handle"].close()
+        os.replace(part["tmp_path"], part["path"])
+
+        self.rows_written += part["rows"]
+        if self.on_written:
+            self.on_written(part["crm_ids"])
+
+    def close(self):
+        """Write the remaining buffered rows and close every open part file"""
+        for partition in list(self._buffers):
+            self._flush(partition)
+        for partition in list(self._files):
+            self._close_file(partition)
+
+
+def _complete_files(store_dir: str) -> List[str]:
+    """
+    Part files that end with the Parquet footer magic
+
+    A part file cut short (e.g. by a partial copy of the store) has no
+    footer and would make every read of the store fail; those are skipped.
+    """
+    files = []
+    for root, dirs, names in os.walk(store_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(('.', '_')))
+        for name in sorted(names):
+            if name.startswith(('.', '_')) or not name.endswith('.parquet'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(-4, os.SEEK_END)
+                    complete = f.read(4) == b"PAR1"
+            except OSError:
+                complete = False
+            if complete:
+                files.append(path)
+            else:
+                print(f"⚠️  Skipping incomplete profile store file {path}")
+    return files
+
+
+def _dataset(store_dir: str) -> ds.Dataset:
+    """Open the store's complete part files as a dataset with the fetch_date partition column"""
+    return ds.dataset(
+        _complete_files(store_dir),
+        schema=SCHEMA.append(pa.field("fetch_date", pa.string())),
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("fetch_date", pa.string())]), flavor="hive"),
+        partition_base_dir=store_dir,
+    )
+
+
+def scan_profiles(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    columns: Optional[Iterable[str]] = None,
+    store_dir: str = STORE_DIR
+) -> pa.Table:
+    """
+    Read stored profiles, pruning partitions outside the date range
+
+    Args:
+        since: First fetch date to include (inclusive)
+        until: Last fetch date to include (inclusive)
+        columns: Columns to read (default: all but `raw`)
+        store_dir: Store root directory
+
+    Returns:
+        pyarrow Table (empty if the store doesn't exist yet)
+    """
+    if columns is None:
+        columns = [name for name in SCHEMA.names if name != 'raw']
+    columns = list(columns)
+
+    if not os.path.isdir(store_dir):
+        return SCHEMA.empty_table().select(columns)
+
+    dataset = _dataset(store_dir)
+
+    condition = None
+    if since:
+        condition = ds.field("fetch_date") >= since.isoformat()
+    if until:
+        upper = ds.field("fetch_date") <= until.isoformat()
+        condition = upper if condition is None else condition & upper
+
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def load_raw_profile(crm_id: int, store_dir: str = STORE_DIR) -> Optional[Dict]:
+    """Return the most recently stored raw person payload for a CRM id"""
+    if not os.path.isdir(store_dir):
+        return None
+
+    table = _dataset(store_dir).to_table(
+        columns=["fetched_at", "raw"],
+        filter=ds.field("crm_id") == int(crm_id)
+    )
+    if table.num_rows == 0:
+        return None
+
+    latest = table.sort_by([("fetched_at", "descending")]).slice(0, 1).to_pylist()[0]
+    return json.loads(latest['raw'])
@@ -1,100 +1,364 @@
+"""
+Migration Runner
+
+Applies the numbered SQL files in migrations/ (001_*.sql, 002_*.sql, ...)
+in order and records each applied version with a checksum of its file in
+the `schema_migrations` table, so every migration runs once per database.
+
+Each migration is sent as one transaction (a single
+`mcp_Neon_run_sql_transaction` call) together with its schema_migrations
+row: it either applies completely and is recorded, or not at all. Because
+of that, migrations can't use statements that refuse to run in a
+transaction (e.g. CREATE INDEX CONCURRENTLY).
+
+An applied file whose checksum no longer matches stops the run; add a new
+numbered migration instead of editing an applied one.
+
+Usage:
+    python run_migration.py             # Apply pending migrations
+    python run_migration.py --dry-run   # Show the plan without changing anything
+    python run_migration.py --status    # List applied and pending migrations
+    python run_migration.py --check     # EXPLAIN the hot CRM queries and check their indexes
+"""
+
 import os
 import re
-from datagen_sdk import DatagenClient
+import json
+import hashlib
+from typing import Dict, List, Optional
 
-# Load env
-try:
-    with open('.env') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                key, value = line.split('=', 1)
-                value = value.strip('"').strip("'")
-                os.environ[key] = value
-except FileNotFoundError:
-    print("Warning: .env file not found")
+from crm_sql import run_sql, run_sql_transaction, sql_literal
 
-client = DatagenClient()
 
-print("Running migration: 001_add_email_tracking.sql")
-print("-" * 50)
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
 
-# Read migration file
-with open('migrations/001_add_email_tracking.sql', 'r') as f:
-    sql_content = f.read()
+# Comments, quoted text and statement ends, in the order split_statements checks them
+SQL_TOKEN = re.compile(r"""
+      (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<quoted>'(?:[^']|'')*'|"(?:[^"]|"")*"|(?P<tag>\$[A-Za-z_]*\$).*?(?P=tag))
+    | (?P<end>;)
+""", re.DOTALL | re.VERBOSE)
 
-# Remove comments and split by semicolon
-lines = []
-for line in sql_content.split('\n'):
-    line = line.strip()
-    if line and not line.startswith('--'):
-        lines.append(line)
+# Hot queries and the index each one should use (see migrations/003_hot_path_indexes.sql)
+HOT_QUERIES = [
+    (
+        "Email sync contacts",
+        "SELECT id, email, first_name, last_name FROM crm "
+        "WHERE priority_score > 0 AND email IS NOT NULL ORDER BY priority_score DESC LIMIT 50",
+        "idx_crm_priority_score",
+    ),
+    (
+        "Contacts by email status",
+        "SELECT id, email FROM crm WHERE email_status = 'needs_followup' "
+        "ORDER BY priority_score DESC LIMIT 50",
+        "idx_crm_email_status",
+    ),
+    (
+        "Contacts needing enrichment",
+        "SELECT id, first_name, last_name, email, linkedin_url FROM crm "
+        "WHERE company IS NULL OR title IS NULL LIMIT 20",
+        "idx_crm_needs_enrichment",
+    ),
+    (
+        "Contacts missing LinkedIn URL",
+        "SELECT id, email, first_name, last_name, company FROM crm WHERE linkedin_url IS NULL LIMIT 20",
+        "idx_crm_missing_linkedin",
+    ),
+    (
+        "Unfetched LinkedIn profiles",
+        "SELECT id, email, linkedin_url FROM crm WHERE linkedin_url IS NOT NULL AND linkedin_url != '' "
+        "AND linkedin_profile_fetched_at IS NULL ORDER BY id DESC LIMIT 500",
+        "idx_crm_linkedin_unfetched",
+    ),
+    (
+        "Contact by email",
+        "SELECT id FROM crm WHERE email = 'someone@example.com'",
+        "idx_crm_email",
+    ),
+]
 
-sql_text = ' '.join(lines)
 
-# Split into individual statements
-statements = [s.strip() for s in sql_text.split(';') if s.strip() and s.strip().upper() not in ('BEGIN', 'COMMIT')]
+def discover_migrations(directory: str = MIGRATIONS_DIR) -> List[Dict]:
+    """
+    Find numbered migration files
 
-print(f"Found {len(statements)} SQL statements to execute\n")
+    Returns:
+        List of dicts with version, name, path, checksum (sha256 of the
+        file) and statements, sorted by version
+    """
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        path = os.path.join(directory, filename)
+        with open(path, 'r') as f:
+            content = f.read()
+        migrations.append({
+            "version": int(match.group(1)),
+            "name": match.group(2),
+            "path": path,
+            "checksum": hashlib.sha256(content.encode('utf-8')).hexdigest(),
+            "statements": split_statements(content),
+        })
 
-# Execute each statement
-success_count = 0
-for i, stmt in enumerate(statements, 1):
-    if not stmt:
-        continue
+    migrations.sort(key=lambda m: m["version"])
+    versions = [m["version"] for m in migrations]
+    duplicates = sorted({v for v in versions if versions.count(v) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate migration versions: {duplicates}")
+    return migrations
 
-    print(f"Statement {i}/{len(statements)}:")
-    print(f"  {stmt[:80]}...")
 
-    try:
-        result = client.execute_tool("mcp_Neon_run_sql", {
-            "params": {
-                "sql": stmt,
-                "projectId": "rough-base-02149126",
-                "databaseName": "datagen"
-            }
-        })
-        print(f"  ✓ Success")
-        success_count += 1
-    except Exception as e:
-        error_msg = str(e)
-        if "already exists" in error_msg.lower():
-            print(f"  ⚠ Already exists (skipping)")
-            success_count += 1
+def split_statements(sql_content: str) -> List[str]:
+    """
+    Split a migration into statements, dropping comments and BEGIN/COMMIT
+
+    Semicolons only end a statement outside string literals, quoted
+    identifiers, $$-quoted bodies and comments (whole-line or inline).
+    """
+    statements, current, position = [], [], 0
+    for token in SQL_TOKEN.finditer(sql_content):
+        current.append(sql_content[position:token.start()])
+        position = token.end()
+        if token.group('quoted'):
+            current.append(token.group())
+        elif token.group('comment'):
+            current.append(" ")
         else:
-            print(f"  ✗ Failed: {e}")
-
-print(f"\n{'-' * 50}")
-print(f"Migration completed: {success_count}/{len(statements)} statements successful")
-
-# Verify columns were added
-print("\nVerifying new columns...")
-verify_sql = """
-SELECT column_name, data_type, column_default
-FROM information_schema.columns
-WHERE table_name = 'crm'
-  AND column_name IN ('email_status', 'last_email_sent_at', 'last_email_received_at',
-                      'email_tracking_last_synced_at', 'emails_sent_count',
-                      'emails_received_count', 'needs_followup')
-ORDER BY column_name
-"""
+            statements.append("".join(current))
+            current = []
+    statements.append("".join(current) + sql_content[position:])
+
+    statements = [s.strip() for s in statements]
+    return [s for s in statements if s and s.upper() not in ('BEGIN', 'COMMIT')]
+
+
+def ensure_tracking_table(client):
+    """Create schema_migrations (or add the checksum column to an older one)"""
+    run_sql_transaction(client, [
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+        """,
+        "ALTER TABLE schema_migrations ADD COLUMN IF NOT EXISTS checksum TEXT",
+    ])
+
+
+def applied_migrations(client) -> Dict[int, Optional[str]]:
+    """
+    Applied versions and their recorded checksums
+
+    Returns:
+        Dict of version -> checksum (None for versions recorded before
+        checksums were tracked); empty if schema_migrations doesn't exist
+    """
+    exists = run_sql(client, "SELECT to_regclass('schema_migrations') IS NOT NULL AS exists")
+    if not (exists and exists[0].get('exists')):
+        return {}
+
+    columns = {row['column_name'] for row in run_sql(client, """
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = 'schema_migrations'
+    """)}
+    checksum = "checksum" if "checksum" in columns else "NULL AS checksum"
+    rows = run_sql(client, f"SELECT version, {checksum} FROM schema_migrations")
+    return {int(row['version']): row.get('checksum') for row in rows}
+
+
+def plan_migrations(client) -> Dict:
+    """
+    Compare migrations/ against schema_migrations
+
+    Returns:
+        Dict with `pending` (migrations to apply, in order), `changed`
+        (applied files whose checksum differs) and `unverified` (applied
+        before checksums were recorded)
+    """
+    applied = applied_migrations(client)
+    plan = {"pending": [], "changed": [], "unverified": []}
+
+    for migration in discover_migrations():
+        if migration["version"] not in applied:
+            plan["pending"].append(migration)
+        elif applied[migration["version"]] is None:
+            plan["unverified"].append(migration)
+        elif applied[migration["version"]] != migration["checksum"]:
+            plan["changed"].append(migration)
+
+    return plan
+
+
+def print_plan(plan: Dict):
+    """Print what a run would do"""
+    for migration in plan["changed"]:
+        print(f"  ✗ {migration['version']:03d} {migration['name']}: file changed since it was applied")
+    for migration in plan["unverified"]:
+        print(f"  ~ {migration['version']:03d} {migration['name']}: applied, checksum will be recorded")
+    for migration in plan["pending"]:
+        print(f"  + {migration['version']:03d} {migration['name']} "
+              f"({len(migration['statements'])} statements, one transaction)")
+        for stmt in migration["statements"]:
+            print(f"      {stmt[:90]}{'...' if len(stmt) > 90 else ''}")
+    if not any(plan.values()):
+        print("  Nothing to do, database is up to date")
+
+
+def apply_migration(client, migration: Dict):
+    """
+    Apply one migration and record it in a single transaction
+
+    Raises:
+        Exception from the transaction tool if any statement fails (nothing
+        from this migration is kept)
+    """
+    record = f"""
+        INSERT INTO schema_migrations (version, name, checksum)
+        VALUES ({int(migration['version'])}, {sql_literal(migration['name'])}, {sql_literal(migration['checksum'])})
+    """
+    run_sql_transaction(client, migration["statements"] + [record])
+
+
+def migrate(client, dry_run: bool = False) -> Dict:
+    """
+    Apply all pending migrations in version order, stopping at the first failure
+
+    Args:
+        client: DatagenClient instance
+        dry_run: Only print the plan
+
+    Returns:
+        Dict with applied versions, failed version (or None) and error
+    """
+    plan = plan_migrations(client)
+    print_plan(plan)
+    result = {"applied": [], "failed": None, "error": None}
+
+    if plan["changed"]:
+        result["error"] = "Applied migrations were modified; add a new migration instead"
+        return result
+    if dry_run:
+        return result
+
+    ensure_tracking_table(client)
+
+    for migration in plan["unverified"]:
+        run_sql(client, f"""
+            UPDATE schema_migrations SET checksum = {sql_literal(migration['checksum'])}
+            WHERE version = {int(migration['version'])} AND checksum IS NULL
+        """)
+
+    for migration in plan["pending"]:
+        try:
+            apply_migration(client, migration)
+        except Exception as e:
+            result["failed"] = migration["version"]
+            result["error"] = str(e)
+            print(f"  ✗ {migration['version']:03d} {migration['name']} rolled back: {e}")
+            break
+        result["applied"].append(migration["version"])
+        print(f"  ✓ {migration['version']:03d} {migration['name']} applied")
+
+    return result
+
+
+def _plan_nodes(plan):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree"""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def explain_indexes(client, sql: str) -> Dict:
+    """
+    EXPLAIN a query and collect the indexes and scan types it uses
+
+    Returns:
+        Dict with index names and node types found in the plan
+    """
+    rows = run_sql(client, f"EXPLAIN (FORMAT JSON) {sql}")
+    plan = rows[0]["QUERY PLAN"] if rows else []
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    nodes = list(_plan_nodes(plan[0]["Plan"])) if plan else []
+    return {
+        "indexes": {node["Index Name"] for node in nodes if node.get("Index Name")},
+        "node_types": [node.get("Node Type") for node in nodes],
+    }
+
+
+def check_hot_queries(client) -> int:
+    """
+    Print whether each hot query's plan uses its index
+
+    Returns:
+        Number of queries not using their expected index
+    """
+    misses = 0
+    for description, sql, index in HOT_QUERIES:
+        plan = explain_indexes(client, sql)
+        if index in plan["indexes"]:
+            print(f"  ✓ {description}: {index}")
+        else:
+            misses += 1
+            used = ", ".join(sorted(plan["indexes"])) or " -> ".join(plan["node_types"])
+            print(f"  ⚠ {description}: expected {index}, plan uses {used}")
+
+    if misses:
+        print("\nNote: on a small crm table the planner may prefer a Seq Scan; re-check as it grows.")
+    return misses
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+    from datagen_sdk import DatagenClient
+
+    # Load env
+    try:
+        with open('.env') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    value = value.strip('"').strip("'")
+                    os.environ[key] = value
+    except FileNotFoundError:
+        print("Warning: .env file not found")
+
+    parser = argparse.ArgumentParser(description='Apply numbered migrations from migrations/')
+    parser.add_argument('--dry-run', action='store_true', help='Show the migration plan without applying it')
+    parser.add_argument('--status', action='store_true', help='List applied and pending migrations')
+    parser.add_argument('--check', action='store_true', help='EXPLAIN the hot queries and check index usage')
+    args = parser.parse_args()
+
+    client = DatagenClient()
+
+    if args.status:
+        applied = applied_migrations(client)
+        for migration in discover_migrations():
+            state = "applied" if migration["version"] in applied else "pending"
+            print(f"  {migration['version']:03d} {migration['name']}: {state}")
+        sys.exit(0)
+
+    if args.check:
+        print("Checking hot query plans")
+        print("-" * 50)
+        sys.exit(1 if check_hot_queries(client) else 0)
+
+    print(f"{'Migration plan (dry run)' if args.dry_run else 'Applying migrations'}")
+    print("-" * 50)
+    result = migrate(client, dry_run=args.dry_run)
 
-try:
-    verify_result = client.execute_tool("mcp_Neon_run_sql", {
-        "params": {
-            "sql": verify_sql,
-            "projectId": "rough-base-02149126",
-            "databaseName": "datagen"
-        }
-    })
-
-    print("\nEmail tracking columns in CRM table:")
-    if isinstance(verify_result, list) and len(verify_result) > 0:
-        for row in verify_result:
-            if isinstance(row, dict):
-                print(f"  - {row.get('column_name')}: {row.get('data_type')} (default: {row.get('column_default')})")
-    else:
-        print(verify_result)
-
-except Exception as e:
-    print(f"Verification failed: {e}")
+    print(f"\n{'-' * 50}")
+    if result["error"]:
+        print(f"✗ {result['error']}")
+        sys.exit(1)
+    if not args.dry_run:
+        print(f"Applied: {result['applied'] or 'none'}")
@@ -0,0 +1,237 @@
+"""
+LinkedIn Search Fan-out
+
+Web-search stage of the enrichment cascade (Enrichment SOP step 4): builds
+the top-K name x location queries for a contact, runs them against Linkup
+and Exa concurrently, and merges the `linkedin.com/in/` URLs from every
+result into one ranked candidate list.
+
+Candidates are deduplicated by profile slug across providers and queries,
+and scored with the same search-time score the validation step ranks by
+(candidate_scoring.prescore: name, slug, location and company signals). As
+soon as a candidate reaches STOP_SCORE the queued searches are cancelled
+and the call returns without waiting for the ones still running, so easy
+contacts cost one or two calls and hard ones at most 2 x max_queries.
+
+Usage:
+    python search_fanout.py "Ibrahim Edusu" --city Miami
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote
+
+from candidate_scoring import match_context, prescore
+
+MAX_QUERIES = 6  # Name x location queries per provider
+MAX_WORKERS = 6  # Concurrent search calls
+STOP_SCORE = 0.75  # Stop searching once the best candidate reaches this
+PROVIDERS = ("linkup", "exa")
+
+LINKEDIN_PROFILE = re.compile(r"https?://(?:[a-z]{2,3}\.)?(?:www\.)?linkedin\.com/in/([^/?#\s\"')\]]+)", re.IGNORECASE)
+
+
+def profile_slug(url: str) -> Optional[str]:
+    """Lowercase profile slug of a linkedin.com/in/ URL (None for other URLs)"""
+    match = LINKEDIN_PROFILE.search(url or "")
+    return unquote(match.group(1)).lower().rstrip('/') if match else None
+
+
+def canonical_profile_url(slug: str) -> str:
+    return f"https://www.linkedin.com/in/{slug}"
+
+
+def build_queries(names: Sequence[str], company: Optional[str] = None, geo: Optional[Dict] = None,
+                  max_queries: int = MAX_QUERIES) -> List[Tuple[str, str]]:
+    """
+    Top name x context pairs, most specific first
+
+    Args:
+        names: Full-name variations, most likely first
+        company: Known company, if any
+        geo: PostHog location dict (city/state/country)
+        max_queries: Number of pairs to return
+
+    Returns:
+        List of (name, context) tuples; context may be ""
+    """
+    geo = geo or {}
+    contexts = [c for c in (company, geo.get('city'), geo.get('state')) if c]
+    contexts = list(dict.fromkeys(contexts)) + [""]
+
+    # Diagonal order: the best name with its best context first, then the
+    # next-best pairs, so a weaker name still gets a specific query early
+    ranked = sorted(
+        ((i + j, i), name, context)
+        for i, name in enumerate(names) for j, context in enumerate(contexts)
+    )
+    pairs = [(name, context) for _, name, context in ranked]
+    return list(dict.fromkeys(pairs))[:max_queries]
+
+
+def _search_linkup(client, name: str, context: str) -> List[Dict]:
+    result = client.execute_tool("mcp_Linkup_search", {
+        "query": f"{name} {context} site:linkedin.com/in/".replace("  ", " ").strip(),
+        "depth": "standard",
+        "output_type": "searchResults",
+    })
+    items = result if isinstance(result, list) else (result or {}).get('items', []) or (result or {}).get('results', [])
+    return [
+        {"url": item.get('url', ''), "text": f"{item.get('name', '')} {item.get('content', '')}"}
+        for item in items if isinstance(item, dict)
+    ]
+
+
+def _search_exa(client, name: str, context: str) -> List[Dict]:
+    query = f"linkedin profile for {name}"
+    if context:
+        query += f" {context}"
+    result = client.execute_tool("mcp_Exa_web_search_exa", {
+        "query": query,
+        "num_results": 5,
+        "use_autoprompt": True,
+    })
+    items = result if isinstance(result, list) else (result or {}).get('results', [])
+    hits = []
+    for item in items:
+        # Exa sometimes returns strings formatted with content
+        if isinstance(item, str):
+            for match in LINKEDIN_PROFILE.finditer(item):
+                hits.append({"url": match.group(0), "text": item})
+        elif isinstance(item, dict):
+            hits.append({"url": item.get('url', ''), "text": f"{item.get('title', '')} {item.get('text', '')}"})
+    return hits
+
+
+SEARCHERS = {
+    "linkup": _search_linkup,
+    "exa": _search_exa,
+}
+
+
+def search_linkedin_candidates(client, names: Sequence[str], company: Optional[str] = None,
+                               geo: Optional[Dict] = None, max_queries: int = MAX_QUERIES,
+                               max_workers: int = MAX_WORKERS, stop_score: float = STOP_SCORE,
+                               providers: Sequence[str] = PROVIDERS, ctx: Optional[Dict] = None) -> Dict:
+    """
+    Run the query fan-out and rank the LinkedIn profiles it finds
+
+    Args:
+        client: DatagenClient instance
+        names: Full-name variations, most likely first
+        company: Known company, if any
+        geo: PostHog location dict
+        max_queries: Name x context queries per provider
+        max_workers: Concurrent search calls
+        stop_score: Cancel remaining searches once a candidate scores this high
+        providers: Keys of SEARCHERS to use
+        ctx: candidate_scoring.match_context() to score against (built
+            from names, geo and company if not given)
+
+    Returns:
+        Dict with `candidates` (best first: url, slug, score, hits, providers,
+        text), `searches` run, `failed` searches and `stopped_early`
+    """
+    ctx = ctx or match_context(None, names, geo, company)
+    queries = build_queries([n for n in names if n], company, geo, max_queries)
+    # Best queries first, alternating providers
+    tasks = [(provider, name, context) for name, context in queries for provider in providers]
+
+    merged: Dict[str, Dict] = {}
+    stats = {"candidates": [], "searches": 0, "failed": 0, "stopped_early": False}
+
+    def merge(provider, name, context, results):
+        for position, result in enumerate(results):
+            slug = profile_slug(result.get('url', ''))
+            if not slug:
+                continue
+            candidate = merged.setdefault(slug, {
+                "url": canonical_profile_url(slug), "slug": slug, "hits": set(),
+                "providers": [], "best_position": position, "text": "",
+            })
+            candidate["hits"].add((provider, name, context))
+            if provider not in candidate["providers"]:
+                candidate["providers"].append(provider)
+            candidate["best_position"] = min(candidate["best_position"], position)
+            candidate["text"] = f"{candidate['text']} {result.get('text') or ''}"[:4000]
+            candidate["score"] = prescore(candidate, ctx)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        in_flight = {}
+        pending = iter(tasks)
+
+        def submit_next():
+            task = next(pending, None)
+            if task:
+                in_flight[executor.submit(SEARCHERS[task[0]], client, task[1], task[2])] = task
+
+        for _ in range(max_workers):
+            submit_next()
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, name, context = in_flight.pop(future)
+                stats["searches"] += 1
+                try:
+                    merge(provider, name, context, future.result())
+                except Exception:
+                    stats["failed"] += 1
+
+            if merged and max(c["score"] for c in merged.values()) >= stop_score:
+                stats["stopped_early"] = bool(in_flight) or next(pending, None) is not None
+                break
+            for _ in done:
+                submit_next()
+    finally:
+        # Searches still running finish in the background; their results are dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    candidates = sorted(merged.values(), key=lambda c: c["score"], reverse=True)
+    for candidate in candidates:
+        candidate["hits"] = len(candidate["hits"])
+    stats["candidates"] = candidates
+    return stats
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import argparse
+    from datagen_sdk import DatagenClient
+
+    # Load environment variables
+    try:
+        with open('.env') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    if (value.startswith('"') and value.endswith('"')) or \
+                       (value.startswith("'") and value.endswith("'")):
+                        value = value[1:-1]
+                    os.environ[key] = value
+    except FileNotFoundError:
+        print("Warning: .env file not found")
+
+    if not os.getenv('DATAGEN_API_KEY'):
+        print("Error: DATAGEN_API_KEY not set")
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description='Fan out LinkedIn web searches for one person')
+    parser.add_argument('names', nargs='+', help='Name variations, most likely first')
+    parser.add_argument('--company')
+    parser.add_argument('--city')
+    parser.add_argument('--state')
+    args = parser.parse_args()
+
+    result = search_linkedin_candidates(
+        DatagenClient(), args.names, args.company, {"city": args.city, "state": args.state}
+    )
+    print(f"{result['searches']} searches ({result['failed']} failed, "
+          f"stopped early: {result['stopped_early']})")
+    for candidate in result["candidates"][:10]:
+        print(f"  {candidate['score']:.3f}  {candidate['url']}  "
+              f"({candidate['hits']} hits via {', '.join(candidate['providers'])})")
@@ -1,8 +1,16 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import sys
 from datagen_sdk import DatagenClient
+from crm_sql import run_sql, sql_literal
+from email_tracking import EmailSyncJob
+from priority_queue import priority_queue_sql, refresh_priority_queue
+from run_migration import migrate
+from email_drafts import (
+    drafts_by_contact, find_file_draft, latest_drafts_sql, load_file_drafts, load_latest_drafts, save_draft
+)
 
 st.set_page_config(layout="wide", page_title="DataGen CRM & ICP Dashboard", page_icon="📊")
 
@@ -30,85 +38,173 @@ if not api_key:
 
 client = DatagenClient()
 
-def get_crm_data():
-    try:
-        rows = client.execute_tool(
-            "mcp_Neon_run_sql",
-            {
-                "params": {
-                    "sql": "SELECT id, first_name, last_name, email, company, title, location, industry, linkedin_url, enrich_source, linkedin_profile_fetched_at FROM crm ORDER BY id DESC",
-                    "projectId": "rough-base-02149126",
-                    "databaseName": "datagen"
-                }
-            }
-        )
 
-        if not rows or not rows[0]:
-            return pd.DataFrame()
+@st.cache_resource(show_spinner="Checking CRM schema...")
+def ensure_schema():
+    """Apply pending migrations once per server process, so every column the dashboard reads exists"""
+    return migrate(client)
 
-        records = rows[0]
-        df = pd.DataFrame(records)
 
-        # Add enrichment status columns
-        df['Enrichment Status'] = df.apply(lambda row: 'Enriched' if pd.notna(row['company']) or pd.notna(row['title']) else 'Not Enriched', axis=1)
-        df['LinkedIn Fetched'] = df['linkedin_profile_fetched_at'].notna()
+schema = ensure_schema()
+if schema["error"]:
+    ensure_schema.clear()  # Retry on the next rerun instead of caching the failure
+    st.error(f"Schema migration failed: {schema['error']}")
+    st.stop()
 
-        return df
+QUERY_CACHE_TTL = 60  # Seconds a CRM query result is shared across sessions
+EMAIL_HISTORY_CACHE_TTL = 300  # Seconds a Gmail thread search is shared across sessions
+SYNC_LIMIT = 20  # Contacts synced by the "Sync Email Status" button
+SYNC_POLL_SECONDS = 2  # How often the dashboard checks a running sync
+
+
+@st.cache_data(ttl=QUERY_CACHE_TTL, max_entries=500, show_spinner=False)
+def cached_sql(sql):
+    """
+    Run a read-only CRM query through a process-wide cache keyed by the SQL text
+
+    All sessions share results for QUERY_CACHE_TTL seconds. Errors are not
+    cached. Call invalidate_query_cache() after writing to the CRM.
+    """
+    return run_sql(client, sql)
+
+
+@st.cache_data(ttl=EMAIL_HISTORY_CACHE_TTL, max_entries=500, show_spinner=False)
+def cached_email_history(email_address, max_results=5):
+    """Gmail search for the thread with a contact, shared across sessions"""
+    return client.execute_tool(
+        "mcp_Gmail_gmail_search_emails",
+        {"query": f"to:{email_address} OR from:{email_address}", "max_results": max_results}
+    )
+
+
+def invalidate_query_cache(email_history=False):
+    """Drop cached CRM queries (and Gmail searches) after a write"""
+    cached_sql.clear()
+    if email_history:
+        cached_email_history.clear()
+
+
+CRM_PAGE_SIZE = 50
+
+# Label -> (SQL sort expression, direction); id breaks ties for keyset pagination
+CRM_SORTS = {
+    "Newest first": ("id", "DESC"),
+    "Oldest first": ("id", "ASC"),
+    "Highest priority": ("COALESCE(priority_score, 0)", "DESC"),
+}
+
+CRM_STATUS_FILTERS = {
+    "All": None,
+    "Enriched": "(company IS NOT NULL OR title IS NOT NULL)",
+    "Not Enriched": "(company IS NULL AND title IS NULL)",
+    "LinkedIn Fetched": "linkedin_profile_fetched_at IS NOT NULL",
+}
+
+
+def _crm_conditions(status="All", search=""):
+    """SQL WHERE conditions for the CRM table filters"""
+    conditions = []
+    if CRM_STATUS_FILTERS.get(status):
+        conditions.append(CRM_STATUS_FILTERS[status])
+
+    search = (search or "").strip()
+    if search:
+        escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = sql_literal(f"%{escaped}%")
+        conditions.append(
+            f"(email ILIKE {pattern} OR first_name ILIKE {pattern} OR last_name ILIKE {pattern}"
+            f" OR company ILIKE {pattern} OR title ILIKE {pattern})"
+        )
+    return conditions
+
+
+def get_crm_page(status="All", search="", sort="Newest first", cursor=None, page_size=CRM_PAGE_SIZE):
+    """
+    Fetch one page of the CRM table (keyset pagination, filtered and sorted in SQL)
+
+    Args:
+        status: Key of CRM_STATUS_FILTERS
+        search: Case-insensitive substring matched against name, email, company and title
+        sort: Key of CRM_SORTS
+        cursor: (sort_key, id) of the last row on the previous page, None for the first page
+        page_size: Rows per page
+
+    Returns:
+        (DataFrame for the page, cursor for the next page or None on the last page)
+    """
+    sort_expr, direction = CRM_SORTS[sort]
+    conditions = _crm_conditions(status, search)
+    if cursor is not None:
+        op = "<" if direction == "DESC" else ">"
+        conditions.append(f"({sort_expr}, id) {op} ({sql_literal(cursor[0])}, {int(cursor[1])})")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    try:
+        rows = cached_sql(f"""
+            SELECT id, first_name, last_name, email, company, title, role_family, seniority,
+                   location, industry, linkedin_url, enrich_source,
+                   CASE WHEN company IS NOT NULL OR title IS NOT NULL
+                        THEN 'Enriched' ELSE 'Not Enriched' END AS enrichment_status,
+                   linkedin_profile_fetched_at IS NOT NULL AS linkedin_fetched,
+                   {sort_expr} AS sort_key
+            FROM crm
+            {where}
+            ORDER BY {sort_expr} {direction}, id {direction}
+            LIMIT {int(page_size) + 1}
+        """)
     except Exception as e:
         st.error(f"Error fetching CRM data: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None
+
+    # One extra row tells us whether there is a next page
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (rows[-1]['sort_key'], rows[-1]['id'])
+
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df = df.drop(columns='sort_key').rename(columns={
+            'enrichment_status': 'Enrichment Status',
+            'linkedin_fetched': 'LinkedIn Fetched'
+        })
+    return df, next_cursor
+
+
+def get_crm_count(status="All", search=""):
+    """Row count for the current filters (drives the pager)"""
+    conditions = _crm_conditions(status, search)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    try:
+        rows = cached_sql(f"SELECT COUNT(*) AS total FROM crm {where}")
+        return int(rows[0]['total']) if rows else 0
+    except Exception as e:
+        st.error(f"Error counting CRM records: {e}")
+        return 0
+
+
+def get_crm_metrics():
+    """Enrichment metrics over the whole CRM in one aggregate query"""
+    try:
+        rows = cached_sql("""
+            SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE company IS NOT NULL OR title IS NOT NULL) AS enriched,
+                   COUNT(linkedin_profile_fetched_at) AS linkedin_fetched
+            FROM crm
+        """)
+        if rows:
+            return {k: int(v or 0) for k, v in rows[0].items()}
+    except Exception as e:
+        st.error(f"Error fetching enrichment metrics: {e}")
+    return {"total": 0, "enriched": 0, "linkedin_fetched": 0}
 
 def get_top_priority_contacts(limit=10):
-    """Fetch top priority contacts from CRM"""
+    """Fetch the top of today's priority queue (see priority_queue.py)"""
     try:
-        result = client.execute_tool(
-            "mcp_Neon_run_sql",
-            {
-                "params": {
-                    "sql": f"""
-                        SELECT
-                            id,
-                            email,
-                            first_name,
-                            last_name,
-                            company,
-                            title,
-                            linkedin_url,
-                            priority_score,
-                            created_at,
-                            user_signup_date,
-                            email_status,
-                            last_email_sent_at,
-                            last_email_received_at,
-                            emails_sent_count,
-                            emails_received_count,
-                            needs_followup,
-                            email_tracking_last_synced_at
-                        FROM crm
-                        WHERE priority_score > 0
-                        ORDER BY
-                            CASE
-                                WHEN email_status = 'not_contacted' THEN 1
-                                WHEN email_status = 'needs_followup' THEN 2
-                                WHEN email_status IN ('contacted', 'replied') THEN 3
-                                ELSE 4
-                            END,
-                            CASE
-                                WHEN email_status = 'not_contacted' THEN priority_score
-                                WHEN email_status = 'needs_followup' THEN EXTRACT(EPOCH FROM (NOW() - last_email_sent_at))
-                                ELSE priority_score
-                            END DESC,
-                            user_signup_date DESC
-                        LIMIT {limit}
-                    """,
-                    "projectId": "rough-base-02149126",
-                    "databaseName": "datagen"
-                }
-            }
-        )
+        rows = cached_sql(priority_queue_sql(limit=limit, min_score=1))
 
-        if result and result[0]:
-            return pd.DataFrame(result[0])
+        if rows:
+            return pd.DataFrame(rows)
         return pd.DataFrame()
     except Exception as e:
         st.error(f"Error fetching priority contacts: {e}")
@@ -124,211 +220,264 @@ def get_icp_summary():
     except Exception as e:
         return f"Error reading ICP summary: {e}"
 
-def load_email_draft(first_name, last_name, email, contact_id=None, client_instance=None):
-    """Load email draft from CRM database, fallback to .md files"""
-    # Safely handle None or empty values
-    first_name = (first_name or '').strip()
-    last_name = (last_name or '').strip()
+@st.cache_data(ttl=QUERY_CACHE_TTL, show_spinner=False)
+def cached_file_drafts():
+    """outreach_emails/*.md drafts parsed in one pass, shared across sessions"""
+    return load_file_drafts()
+
+
+def get_visible_drafts():
+    """Latest draft for every contact on screen (priority list + CRM page), one query"""
+    ids = set()
+    for key in ('priority_df', 'crm_page'):
+        frame = st.session_state.get(key)
+        if frame is not None and not frame.empty and 'id' in frame.columns:
+            ids.update(int(i) for i in frame['id'].dropna())
+
+    sql = latest_drafts_sql(ids)
+    return drafts_by_contact(cached_sql(sql)) if sql else {}
+
 
+def load_email_draft(first_name, last_name, email, contact_id=None, client_instance=None):
+    """Load the latest email draft from the database, fallback to .md files"""
     # Use global client if not passed
     if client_instance is None:
         client_instance = client
 
-    # Try loading from database first
-    if contact_id or email:
+    if contact_id is not None:
         try:
-            # Query for draft from database
-            if contact_id:
-                query = f"SELECT email_draft FROM crm WHERE id = {contact_id}"
+            # Dashboard client: drafts for the visible contacts are loaded in bulk and cached
+            if client_instance is client:
+                drafts = get_visible_drafts()
+                if int(contact_id) not in drafts:
+                    drafts = drafts_by_contact(cached_sql(latest_drafts_sql([contact_id])))
             else:
-                query = f"SELECT email_draft FROM crm WHERE email = '{email}'"
-
-            result = client_instance.execute_tool(
-                "mcp_Neon_run_sql",
-                {
-                    "params": {
-                        "sql": query,
-                        "projectId": "rough-base-02149126",
-                        "databaseName": "datagen"
-                    }
-                }
-            )
-
-            if result and result[0] and len(result[0]) > 0:
-                draft_data = result[0][0].get('email_draft')
-                if draft_data and isinstance(draft_data, dict):
-                    subject = draft_data.get('subject', '')
-                    body = draft_data.get('body', '')
-                    if subject or body:
-                        return subject, body, True, 'database'
+                drafts = load_latest_drafts(client_instance, [contact_id])
+
+            draft = drafts.get(int(contact_id))
+            if draft and (draft.get('subject') or draft.get('body')):
+                return draft.get('subject') or '', draft.get('body') or '', True, 'database'
         except Exception as e:
             st.warning(f"Error loading draft from database: {e}")
 
-    # Fallback to .md files
-    possible_filenames = []
-    if first_name and last_name:
-        possible_filenames.extend([
-            f"{first_name.lower()}_{last_name.lower()}.md",
-            f"{first_name}_{last_name}.md"
-        ])
-    if email:
-        possible_filenames.append(f"{email.split('@')[0]}.md")
-
-    for filename in possible_filenames:
-        filepath = os.path.join("outreach_emails", filename)
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'r') as f:
-                    content = f.read()
-
-                # Parse subject and body from the markdown
-                subject = ""
-                body = ""
-
-                # Extract subject
-                if "**Subject:**" in content:
-                    subject_start = content.find("**Subject:**") + len("**Subject:**")
-                    subject_end = content.find("\n", subject_start)
-                    subject = content[subject_start:subject_end].strip()
-
-                # Extract body
-                if "**Body:**" in content:
-                    body_start = content.find("**Body:**") + len("**Body:**")
-                    # Find the end of the email draft section (next --- or ## section)
-                    body_end = content.find("\n---", body_start)
-                    if body_end == -1:
-                        body_end = content.find("\n##", body_start)
-                    if body_end == -1:
-                        body_end = len(content)
-
-                    body = content[body_start:body_end].strip()
-
-                return subject, body, True, 'file'
-            except Exception as e:
-                st.warning(f"Error reading email draft file: {e}")
+    # Fallback to .md files (indexed once, no per-contact file probes)
+    file_draft = find_file_draft(cached_file_drafts(), first_name, last_name, email)
+    if file_draft:
+        return file_draft['subject'], file_draft['body'], True, 'file'
 
     return "", "", False, None
 
 def save_email_draft(contact_id, subject, body, client_instance=None):
-    """Save email draft to CRM database"""
-    import json
-    from datetime import datetime
-
+    """Save email draft as a new version in email_drafts"""
     # Use global client if not passed
     if client_instance is None:
         client_instance = client
 
     try:
-        # Create draft JSON
-        draft_data = {
-            "subject": subject,
-            "body": body,
-            "updated_at": datetime.now().isoformat()
-        }
-
-        # Escape single quotes for SQL
-        json_str = json.dumps(draft_data).replace("'", "''")
-
-        # Update CRM record
-        result = client_instance.execute_tool(
-            "mcp_Neon_run_sql",
-            {
-                "params": {
-                    "sql": f"""
-                        UPDATE crm
-                        SET email_draft = '{json_str}'::jsonb
-                        WHERE id = {contact_id}
-                    """,
-                    "projectId": "rough-base-02149126",
-                    "databaseName": "datagen"
-                }
-            }
-        )
+        save_draft(client_instance, contact_id, subject, body, source="dashboard")
         return True
     except Exception as e:
         st.error(f"Error saving draft: {e}")
         return False
 
 
-# Email tracking formatter functions
-def format_email_status(row):
-    """Format email status with icons"""
-    status = row.get('email_status', 'not_contacted')
-    if status == 'not_contacted':
-        return "❌ Not Contacted"
-    elif status == 'replied':
-        return "✓ Replied"
-    elif status == 'needs_followup':
-        last_sent = row.get('last_email_sent_at')
-        if last_sent and pd.notna(last_sent):
-            days_waiting = (pd.Timestamp.now(tz='UTC') - pd.to_datetime(last_sent)).days
-            return f"⏳ Needs Follow-up ({days_waiting}d)"
-        return "⏳ Needs Follow-up"
-    elif status == 'contacted':
-        return "📤 Contacted"
-    return "❓ Unknown"
-
-
-def format_email_exchange(row):
-    """Format email exchange counts"""
-    sent = row.get('emails_sent_count', 0) or 0
-    received = row.get('emails_received_count', 0) or 0
-    if (sent + received) > 0:
-        return f"{sent}→ {received}←"
-    return "—"
+# Email tracking formatters (vectorized: one pass per column, one "now" per render)
+EMAIL_STATUS_LABELS = {
+    'not_contacted': "❌ Not Contacted",
+    'replied': "✓ Replied",
+    'needs_followup': "⏳ Needs Follow-up",
+    'contacted': "📤 Contacted",
+}
 
 
-def format_last_contact(row):
-    """Format last contact date"""
-    last_sent = row.get('last_email_sent_at')
-    last_received = row.get('last_email_received_at')
-
-    dates = []
-    if last_sent and pd.notna(last_sent):
-        dates.append(pd.to_datetime(last_sent))
-    if last_received and pd.notna(last_received):
-        dates.append(pd.to_datetime(last_received))
-
-    if not dates:
-        return "Never"
-
-    last_date = max(dates)
-    days_ago = (pd.Timestamp.now(tz='UTC') - last_date).days
-
-    if days_ago == 0:
-        return "Today"
-    elif days_ago == 1:
-        return "Yesterday"
-    elif days_ago < 7:
-        return f"{days_ago} days ago"
-    else:
-        return last_date.strftime('%Y-%m-%d')
+def _column(df, name, default=None):
+    """Column of df, or a Series of `default` if the query didn't return it"""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index, dtype=object)
+
+
+def _utc_column(df, name):
+    """
+    Parse a timestamp column once into tz-aware UTC (invalid/missing -> NaT)
+
+    format='ISO8601' parses each value on its own terms, so a column mixing
+    fractional seconds, date-only values and datetimes written back by the
+    sync is not coerced to the first value's format.
+    """
+    return pd.to_datetime(_column(df, name), utc=True, errors='coerce', format='ISO8601')
+
+
+def _days_since(dates, now):
+    """Whole days between each date and now (NaN where the date is missing)"""
+    return (now - dates).dt.days
+
+
+def format_email_status(df, now):
+    """Format email status with icons, adding days waiting for follow-ups"""
+    status = _column(df, 'email_status', 'not_contacted')
+    labels = status.map(EMAIL_STATUS_LABELS).fillna("❓ Unknown")
 
+    days_waiting = _days_since(_utc_column(df, 'last_email_sent_at'), now)
+    followup = (status == 'needs_followup') & days_waiting.notna()
+    waiting_labels = "⏳ Needs Follow-up (" + days_waiting.astype('Int64').astype(str) + "d)"
+    return labels.where(~followup, waiting_labels)
 
-if st.button("Refresh Data"):
-    st.session_state['crm_df'] = get_crm_data()
+
+def format_email_exchange(df):
+    """Format email exchange counts"""
+    sent = pd.to_numeric(_column(df, 'emails_sent_count', 0), errors='coerce').fillna(0).astype(int)
+    received = pd.to_numeric(_column(df, 'emails_received_count', 0), errors='coerce').fillna(0).astype(int)
+    exchange = sent.astype(str) + "→ " + received.astype(str) + "←"
+    return exchange.where((sent + received) > 0, "—")
+
+
+def format_last_contact(df, now):
+    """Format last contact date"""
+    last_date = pd.concat(
+        [_utc_column(df, 'last_email_sent_at'), _utc_column(df, 'last_email_received_at')],
+        axis=1
+    ).max(axis=1)
+    days_ago = _days_since(last_date, now)
+
+    return pd.Series(np.select(
+        [last_date.isna(), days_ago == 0, days_ago == 1, days_ago < 7],
+        ["Never", "Today", "Yesterday", days_ago.astype('Int64').astype(str) + " days ago"],
+        default=last_date.dt.date.astype(str)
+    ), index=df.index)
+
+
+def format_contact_name(df):
+    """Full name, falling back to the email local part"""
+    first = _column(df, 'first_name').fillna("").astype(str)
+    last = _column(df, 'last_name').fillna("").astype(str)
+    name = (first + " " + last).str.strip()
+    local_part = _column(df, 'email').fillna("").astype(str).str.split('@', n=1).str[0]
+    return name.where(name != "", local_part)
+
+
+def format_priority_score(scores):
+    """Priority score with a hot/high/normal icon"""
+    values = pd.to_numeric(scores, errors='coerce')
+    icons = np.select([values >= 90, values >= 75], ["🔥 ", "⭐ "], default="✓ ")
+    return icons + scores.astype(str)
+
+
+def format_priority_table(df, now=None):
+    """
+    Add the display columns for the priority contacts table
+
+    Args:
+        df: Rows from get_top_priority_contacts
+        now: Reference time for "days ago" labels (default: current UTC time)
+
+    Returns:
+        Copy of df with Name, Score, Email Status, Emails and Last Contact
+    """
+    now = now if now is not None else pd.Timestamp.now(tz='UTC')
+    df = df.copy()
+    df['Name'] = format_contact_name(df)
+    df['Score'] = format_priority_score(df['priority_score'])
+    df['Email Status'] = format_email_status(df, now)
+    df['Emails'] = format_email_exchange(df)
+    df['Last Contact'] = format_last_contact(df, now)
+    return df
+
+
+if st.button("Refresh Data", help="Re-run every CRM query, bypassing the shared query cache"):
+    # Drop the shared query cache (the CRM may have been written out of band), then the
+    # cached filters/metrics so the CRM section recounts and refetches
+    invalidate_query_cache()
+    st.session_state.pop('crm_filters', None)
+    st.session_state.pop('crm_metrics', None)
     st.session_state['priority_df'] = get_top_priority_contacts()
 
-if 'crm_df' not in st.session_state:
-    st.session_state['crm_df'] = get_crm_data()
+if 'priority_df' not in st.session_state:
     st.session_state['priority_df'] = get_top_priority_contacts()
 
 # Priority Contacts Section
 st.write("---")
 
+def apply_sync_results(df, results):
+    """Write finished sync results into the matching priority rows"""
+    synced = [r for r in results if r.get('success') and r.get('contact_id') is not None]
+    if df.empty or not synced:
+        return df
+
+    updates = pd.DataFrame({
+        'id': [r['contact_id'] for r in synced],
+        'email_status': [r['status'] for r in synced],
+        'emails_sent_count': [r['sent'] for r in synced],
+        'emails_received_count': [r['received'] for r in synced],
+        'needs_followup': [r.get('needs_followup', False) for r in synced],
+        'last_email_sent_at': [r.get('last_sent') for r in synced],
+        'last_email_received_at': [r.get('last_received') for r in synced],
+    }).drop_duplicates('id', keep='last').set_index('id')
+
+    df = df.copy()
+    rows = df['id'].isin(updates.index)
+    for column in updates.columns:
+        values = df.loc[rows, 'id'].map(updates[column])
+        df[column] = df[column].astype(object) if column in df.columns else None
+        df.loc[rows, column] = values
+    return df
+
+
+@st.fragment(run_every=SYNC_POLL_SECONDS)
+def email_sync_progress():
+    """Poll the background sync: progress bar, streamed rows, final reload"""
+    job = EmailSyncJob.current()
+    if job is None:
+        return
+
+    # Results already merged into this session's table, per job
+    seen_job, seen = st.session_state.get('sync_seen', (None, 0))
+    snapshot = job.snapshot(since=seen if seen_job == job.id else 0)
+    new_results = snapshot['new_results']
+    if new_results:
+        st.session_state['priority_df'] = apply_sync_results(
+            st.session_state.get('priority_df', pd.DataFrame()), new_results
+        )
+        st.session_state['sync_seen'] = (job.id, snapshot['done'])
+
+    if job.running:
+        st.session_state['sync_watching'] = job.id
+        total = snapshot['total']
+        if total:
+            st.progress(snapshot['done'] / total, text=f"Syncing {snapshot['done']}/{total}...")
+        else:
+            st.progress(0.0, text="Loading contacts to sync...")
+        if new_results:
+            st.rerun()  # Redraw the table with the rows that just landed
+        return
+
+    # Finished: sessions that watched it re-rank the queue and reload once
+    if st.session_state.get('sync_watching') == job.id:
+        st.session_state.pop('sync_watching')
+        try:
+            refresh_priority_queue(client)
+        except Exception as e:
+            st.warning(f"Could not refresh the priority queue: {e}")
+        invalidate_query_cache()
+        st.session_state['priority_df'] = get_top_priority_contacts()
+        st.rerun()
+
+    if snapshot['status'] == 'failed':
+        st.error(f"Sync failed: {snapshot['error']}")
+    else:
+        st.caption(f"✓ Synced {snapshot['synced']}, failed {snapshot['failed']}")
+
+
 # Add sync button
 col_sync, col_title = st.columns([1, 4])
 with col_sync:
-    if st.button("🔄 Sync Email Status"):
-        with st.spinner("Syncing email tracking..."):
-            import subprocess
-            subprocess.run(
-                ["python", "sync_email_tracking.py", "--limit", "20"],
-                capture_output=True
-            )
-            st.success("Synced!")
-            st.session_state['priority_df'] = get_top_priority_contacts()
-            st.rerun()
+    sync_job = EmailSyncJob.current()
+    if st.button("🔄 Sync Email Status", disabled=sync_job is not None and sync_job.running):
+        sync_job, started = EmailSyncJob.start(limit=SYNC_LIMIT)
+        st.session_state['sync_watching'] = sync_job.id
+        if not started:
+            st.info("A sync is already running")
+    email_sync_progress()
 
 with col_title:
     st.write("### 🔥 Top Priority Contacts Today")
@@ -336,19 +485,8 @@ with col_title:
 st.markdown("*Prioritized by contact status: Not contacted → Needs follow-up → Contacted*")
 
 if 'priority_df' in st.session_state and not st.session_state['priority_df'].empty:
-    priority_df = st.session_state['priority_df'].copy()
-
-    # Format the display
-    priority_df['Name'] = priority_df.apply(
-        lambda row: f"{row.get('first_name', '') or ''} {row.get('last_name', '') or ''}".strip() or row.get('email', '').split('@')[0],
-        axis=1
-    )
-    priority_df['Score'] = priority_df['priority_score'].apply(lambda x: f"🔥 {x}" if x >= 90 else f"⭐ {x}" if x >= 75 else f"✓ {x}")
-
-    # Add email tracking columns
-    priority_df['Email Status'] = priority_df.apply(format_email_status, axis=1)
-    priority_df['Emails'] = priority_df.apply(format_email_exchange, axis=1)
-    priority_df['Last Contact'] = priority_df.apply(format_last_contact, axis=1)
+    # Format the display, including email tracking columns
+    priority_df = format_priority_table(st.session_state['priority_df'])
 
     # Display columns
     display_cols = ['Email Status', 'Score', 'Name', 'email', 'company', 'title', 'Emails', 'Last Contact']
@@ -399,10 +537,7 @@ if 'priority_df' in st.session_state and not st.session_state['priority_df'].emp
                 with st.spinner("Fetching email history..."):
                     try:
                         # Search for emails to/from this address
-                        search_results = client.execute_tool(
-                            "mcp_Gmail_gmail_search_emails",
-                            {"query": f"to:{email_address} OR from:{email_address}", "max_results": 5}
-                        )
+                        search_results = cached_email_history(email_address)
 
                         messages = []
                         if isinstance(search_results, list) and len(search_results) > 0:
@@ -459,6 +594,7 @@ if 'priority_df' in st.session_state and not st.session_state['priority_df'].emp
                 with col1:
                     if st.button("💾 Save Draft", key=f"save_{contact_id}"):
                         if save_email_draft(contact_id, subject, body, client):
+                            invalidate_query_cache()
                             st.success("Draft saved to database!")
                         else:
                             st.error("Failed to save draft")
@@ -485,7 +621,8 @@ if 'priority_df' in st.session_state and not st.session_state['priority_df'].emp
                                     service = EmailTrackingService(client)
                                     service.update_after_send(contact_id, email_address)
 
-                                    # Refresh contact list
+                                    # Refresh contact list (tracking columns and thread changed)
+                                    invalidate_query_cache(email_history=True)
                                     st.session_state['priority_df'] = get_top_priority_contacts()
 
                                     st.balloons()
@@ -524,19 +661,65 @@ else:
     st.info("No priority contacts found. Run `python calculate_priority.py` to calculate scores.")
 
 st.write("---")
+st.write("### CRM Records with Enrichment Status:")
+
+col_status, col_search, col_sort = st.columns([1, 2, 1])
+with col_status:
+    crm_status = st.selectbox("Status", list(CRM_STATUS_FILTERS), key='crm_status')
+with col_search:
+    crm_search = st.text_input("Search", key='crm_search', placeholder="Name, email, company or title")
+with col_sort:
+    crm_sort = st.selectbox("Sort", list(CRM_SORTS), key='crm_sort')
+
+# Filters changed (or Refresh Data): back to the first page and recount
+crm_filters = (crm_status, crm_search.strip(), crm_sort)
+if st.session_state.get('crm_filters') != crm_filters:
+    st.session_state['crm_filters'] = crm_filters
+    st.session_state['crm_cursors'] = [None]
+    st.session_state['crm_total'] = get_crm_count(crm_status, crm_search)
+    st.session_state.pop('crm_page_key', None)
+
+# Only fetch when the visible page changes, not on every rerun
+crm_cursors = st.session_state['crm_cursors']
+crm_page_key = (crm_filters, crm_cursors[-1])
+if st.session_state.get('crm_page_key') != crm_page_key:
+    st.session_state['crm_page'], st.session_state['crm_next_cursor'] = get_crm_page(
+        crm_status, crm_search, crm_sort, cursor=crm_cursors[-1]
+    )
+    st.session_state['crm_page_key'] = crm_page_key
+
+
+def _crm_next_page():
+    st.session_state['crm_cursors'].append(st.session_state['crm_next_cursor'])
+
+
+def _crm_prev_page():
+    if len(st.session_state['crm_cursors']) > 1:
+        st.session_state['crm_cursors'].pop()
 
-if not st.session_state['crm_df'].empty:
-    st.write("### CRM Records with Enrichment Status:")
-    
+
+crm_df = st.session_state['crm_page']
+crm_total = st.session_state['crm_total']
+crm_pages = max(1, -(-crm_total // CRM_PAGE_SIZE))
+
+col_prev, col_pager, col_next = st.columns([1, 4, 1])
+with col_prev:
+    st.button("◀ Prev", on_click=_crm_prev_page, disabled=len(crm_cursors) == 1)
+with col_pager:
+    st.caption(f"Page {len(crm_cursors)} of {crm_pages} · {crm_total} records")
+with col_next:
+    st.button("Next ▶", on_click=_crm_next_page, disabled=st.session_state['crm_next_cursor'] is None)
+
+if not crm_df.empty:
     event = st.dataframe(
-        st.session_state['crm_df'],
+        crm_df,
         on_select="rerun",
         selection_mode="single-row"
     )
 
     if len(event.selection.rows) > 0:
         selected_row_index = event.selection.rows[0]
-        selected_record = st.session_state['crm_df'].iloc[selected_row_index]
+        selected_record = crm_df.iloc[selected_row_index]
         
         email = selected_record.get('email')
         first_name = selected_record.get('first_name', 'Contact')
@@ -560,10 +743,7 @@ if not st.session_state['crm_df'].empty:
                 with st.spinner("Fetching email history..."):
                     try:
                         # Search for emails to/from this address
-                        search_results = client.execute_tool(
-                            "mcp_Gmail_gmail_search_emails",
-                            {"query": f"to:{email_address} OR from:{email_address}", "max_results": 5}
-                        )
+                        search_results = cached_email_history(email_address)
 
                         messages = []
                         if isinstance(search_results, list) and len(search_results) > 0:
@@ -620,6 +800,7 @@ if not st.session_state['crm_df'].empty:
                 with col1:
                     if st.button("💾 Save Draft", key=f"save_crm_{contact_id}"):
                         if save_email_draft(contact_id, subject, body, client):
+                            invalidate_query_cache()
                             st.success("Draft saved to database!")
                         else:
                             st.error("Failed to save draft")
@@ -646,7 +827,8 @@ if not st.session_state['crm_df'].empty:
                                     service = EmailTrackingService(client)
                                     service.update_after_send(contact_id, email_address)
 
-                                    # Refresh contact list
+                                    # Refresh contact list (tracking columns and thread changed)
+                                    invalidate_query_cache(email_history=True)
                                     st.session_state['priority_df'] = get_top_priority_contacts()
 
                                     st.balloons()
@@ -664,10 +846,14 @@ st.write("### Enrichment Metrics:")
 
 col1, col2, col3, col4 = st.columns(4)
 
-total_records = len(st.session_state['crm_df'])
-enriched_records = st.session_state['crm_df']['Enrichment Status'].value_counts().get('Enriched', 0)
-not_enriched_records = st.session_state['crm_df']['Enrichment Status'].value_counts().get('Not Enriched', 0)
-linkedin_fetched = st.session_state['crm_df']['LinkedIn Fetched'].sum() if 'LinkedIn Fetched' in st.session_state['crm_df'].columns else 0
+if 'crm_metrics' not in st.session_state:
+    st.session_state['crm_metrics'] = get_crm_metrics()
+
+crm_metrics = st.session_state['crm_metrics']
+total_records = crm_metrics['total']
+enriched_records = crm_metrics['enriched']
+not_enriched_records = total_records - enriched_records
+linkedin_fetched = crm_metrics['linkedin_fetched']
 
 with col1:
     st.metric("Total Records", total_records)
@@ -6,6 +6,7 @@ from pathlib import Path
 
 from fastapi import BackgroundTasks, FastAPI
 from pydantic import BaseModel
+from typing import List, Optional
 import asyncio
 import httpx
 from claude_agent_sdk import (
@@ -15,6 +16,10 @@ from claude_agent_sdk import (
     ToolUseBlock,
     query,
 )
+from datagen_sdk import DatagenClient
+
+from geo_prefetch import geo_prompt_section, prefetch_geo
+from name_segmentation import name_prompt_section
 
 app = FastAPI()
 
@@ -34,9 +39,26 @@ class SignupPayload(BaseModel):
     # first_name: str | None = None
     # last_name: str | None = None
 
-def run_enrichment_task(email: str):
+
+class SignupBatchPayload(BaseModel):
+    emails: List[str]
+
+def lookup_geo(emails: List[str]) -> dict:
+    """
+    PostHog location for a batch of signups in one query (SOP step 2), or {} on failure.
+    """
+    try:
+        return prefetch_geo(DatagenClient(), emails)
+    except Exception as e:
+        log_event("geo_prefetch_error", emails=len(emails), error=str(e))
+        return {}
+
+def run_enrichment_task(email: str, geo: Optional[dict] = None):
     """
     Background task to enrich the user profile using Anthropic + Datagen MCP.
+
+    `geo` is the prefetched PostHog location; when missing it is looked up
+    here (served from the local cache if the batch endpoint already did).
     """
     request_id = str(uuid.uuid4())
     log_event("start", request_id=request_id, email=email)
@@ -51,13 +73,17 @@ def run_enrichment_task(email: str):
         log_event("config_error", request_id=request_id, error="DATAGEN_API_KEY not set")
         return
 
+    if geo is None:
+        geo = lookup_geo([email]).get(email.strip().lower())
+    log_event("geo", request_id=request_id, email=email, geo=geo)
+
     system_prompt = _load_prompt()
 
     user_message = f"""
 Run the Enrichment SOP for the single signup email below. Follow the SOP verbatim (7 steps, validation rules, and method classification). Use only Datagen MCP tools to execute the steps and to update CRM.
 
 Email: {email}
-
+{geo_prompt_section(geo)}{name_prompt_section(email)}
 Database update requirements:
 - Use mcp_Neon_run_sql against projectId "{PROJECT_ID}" and database "{DATABASE_NAME}".
 - Target table: crm. Match rows using the exact email value.
@@ -110,6 +136,18 @@ async def receive_signup(payload: SignupPayload, background_tasks: BackgroundTas
     background_tasks.add_task(run_enrichment_task, payload.email)
     return {"status": "accepted", "message": f"Enrichment queued for {payload.email}"}
 
+@app.post("/webhook/signups")
+async def receive_signup_batch(payload: SignupBatchPayload, background_tasks: BackgroundTasks):
+    """
+    Receives a batch of signups and queues one enrichment per email.
+    PostHog locations for the whole batch are fetched with a single query up front.
+    Expected JSON: {"emails": ["a@example.com", "b@example.com"]}
+    """
+    geo_by_email = await asyncio.to_thread(lookup_geo, payload.emails)
+    for email in payload.emails:
+        background_tasks.add_task(run_enrichment_task, email, geo_by_email.get(email.strip().lower(), {}))
+    return {"status": "accepted", "message": f"Enrichment queued for {len(payload.emails)} signups"}
+
 @app.get("/health")
 def health():
     return {"status": "ok"}